@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import itertools
+import threading
+import subprocess
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_worker.py")
+RESULT_PREFIX = "BLENDER_WORKER_RESULT "  # same as in blender_worker.py
+TAIL_LINES = 5  # output lines quoted in error messages
+CLOSE_TIMEOUT = 10
+MAX_WORKERS = 2  # Blender processes per executable at most
+IDLE_SECONDS = 300  # idle workers are closed after this, with the project they last had open
+
+
+class BlenderJobError(RuntimeError):
+    pass
+
+
+def run_process(command, on_line=None, on_process=None):
+    """Run one Blender command line and pass every output line to on_line.
+
+    on_process(process) gets the Popen, so the caller can terminate it.
+    Raises BlenderJobError with the last lines of output when it fails.
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, errors="replace", bufsize=1)
+    if on_process:
+        on_process(process)
+    tail = []
+    for line in process.stdout:
+        tail = (tail + [line.rstrip()])[-TAIL_LINES:]
+        if on_line:
+            on_line(line)
+    code = process.wait()
+    if code != 0:
+        raise BlenderJobError(f"Blender exited with {code}: " + " | ".join(tail))
+
+
+class BlenderWorker:
+    """One long lived Blender process running blender_worker.py.
+
+    Jobs go in as JSON lines on stdin; everything Blender prints is passed
+    on until the result line of the job comes back. A worker that died,
+    crashed or was terminated to cancel a job is started again with the
+    next job.
+    """
+
+    def __init__(self, blender_path):
+        self.blender_path = blender_path
+        self.process = None
+        self._ids = itertools.count(1)
+
+    def _read_result(self, on_line=None, tail=None):
+        # The next protocol line, or None when the process exited
+        for line in self.process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                return json.loads(line[len(RESULT_PREFIX):])
+            if tail is not None:
+                tail[:] = (tail + [line.rstrip()])[-TAIL_LINES:]
+            if on_line:
+                on_line(line)
+        return None
+
+    def _exited(self, what, tail):
+        code = self.process.wait()
+        self.process = None
+        return BlenderJobError(f"Blender worker {what} with {code}: " + " | ".join(tail))
+
+    def start(self):
+        self.process = subprocess.Popen([self.blender_path, "--background", "--python", WORKER_SCRIPT],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        text=True, errors="replace", bufsize=1)
+        tail = []
+        if self._read_result(tail=tail) is None:
+            raise self._exited("did not start, it exited", tail)
+
+    def run(self, script, args, blend_file=None, on_line=None, on_process=None):
+        """Run script in the worker, as with "blender -b blend_file --python script -- args"."""
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        if on_process:
+            on_process(self.process)
+        job_id = next(self._ids)
+        tail = []
+        try:
+            self.process.stdin.write(json.dumps({"id": job_id, "script": script, "args": list(args),
+                                                 "blend_file": blend_file}) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            raise self._exited("exited", tail)
+        result = self._read_result(on_line, tail)
+        if result is None:
+            raise self._exited("exited", tail)
+        if not result.get("ok"):
+            raise BlenderJobError(result.get("error") or "Blender job failed")
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()  # the worker's job loop ends and Blender exits
+            self.process.wait(CLOSE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def terminate(self):
+        # Stop a worker in the middle of a job; run() then raises BlenderJobError
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+
+class BlenderPool:
+    """At most max_workers Blender workers for one executable, so jobs skip Blender's startup.
+
+    run() takes an idle worker, starts a new one while there are fewer than
+    max_workers, or waits for one to become idle. Workers idle for
+    idle_seconds are closed, so a session does not keep Blender and its
+    last project in memory after the work is done.
+    """
+
+    def __init__(self, blender_path, max_workers=MAX_WORKERS, idle_seconds=IDLE_SECONDS):
+        self.blender_path = blender_path
+        self.max_workers = max(1, max_workers)
+        self.idle_seconds = idle_seconds
+        self.idle = []  # (worker, idle since), the most recently used last
+        self.busy = set()
+        self.closed = False
+        self._available = threading.Condition()
+
+    def _take(self):
+        with self._available:
+            while not self.closed and not self.idle and len(self.busy) >= self.max_workers:
+                self._available.wait()
+            if self.closed:
+                raise BlenderJobError("Blender workers are closed")
+            worker = self.idle.pop()[0] if self.idle else BlenderWorker(self.blender_path)
+            self.busy.add(worker)
+            return worker
+
+    def _give_back(self, worker):
+        with self._available:
+            self.busy.discard(worker)
+            if not self.closed:
+                self.idle.append((worker, time.monotonic()))
+            self._available.notify()
+        if self.closed:
+            worker.close()
+            return
+        timer = threading.Timer(self.idle_seconds, self.close_idle, args=(self.idle_seconds,))
+        timer.daemon = True
+        timer.start()
+
+    def run(self, script, args, blend_file=None, on_line=None, on_process=None):
+        worker = self._take()
+        try:
+            worker.run(script, args, blend_file, on_line, on_process)
+        finally:
+            if on_process:
+                on_process(None)  # the process moves on to other jobs, do not terminate it for this one
+            self._give_back(worker)
+
+    def close_idle(self, idle_seconds=0):
+        # Close the workers idle for at least idle_seconds
+        now = time.monotonic()
+        with self._available:
+            stale = [worker for worker, since in self.idle if now - since >= idle_seconds]
+            self.idle = [(worker, since) for worker, since in self.idle if worker not in stale]
+        for worker in stale:
+            worker.close()
+
+    def close(self):
+        # Close every worker; jobs still running are stopped and fail
+        with self._available:
+            self.closed = True
+            busy = list(self.busy)
+            self._available.notify_all()
+        for worker in busy:
+            worker.terminate()
+        self.close_idle()
@@ -1,7 +1,14 @@
 import bpy
 import sys
 import os
+import re
 import json
+import time
+from fractions import Fraction
+
+# strip_registry.py lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from strip_registry import save_registry, registered_strips, SENTENCE, WORD, BACKGROUND
 
 # --- VISUAL SETTINGS ---
 SAFE_MARGIN = 80
@@ -16,10 +23,18 @@ AUDIO_CHANNEL = 2
 SUBTITLE_BASE_CHANNEL = 4  # Start channel for subtitles
 WORD_BASE_CHANNEL = 7  # Start channel for subtitles
 
+# Keyframes live in the scene's action, one fcurve per strip property
+STRIP_PATH_RE = re.compile(r'^sequence_editor\.(?:sequences_all|strips_all)\["(.+?)"\]')
+
 argv = sys.argv
 argv = argv[argv.index("--") + 1:]
 
-video_path, audio_path, transcript_path, blend_out = argv
+# With --update, Blender opens the existing project and only the subtitles that differ are changed.
+# --per-strip builds with a keyframe_insert per keyframe, as before create_subtitles, to compare timings.
+FLAGS = {arg for arg in argv if arg.startswith("--")}
+UPDATE = "--update" in FLAGS
+PER_STRIP = "--per-strip" in FLAGS
+video_path, audio_path, transcript_path, blend_out = [arg for arg in argv if arg not in FLAGS]
 
 # Load transcript
 with open(transcript_path, "r", encoding="utf-8") as f:
@@ -29,8 +44,20 @@ with open(transcript_path, "r", encoding="utf-8") as f:
 scene = bpy.context.scene
 scene.render.resolution_x = transcript["resolution"]["width"]
 scene.render.resolution_y = transcript["resolution"]["height"]
-scene.render.fps = int(transcript["resolution"]["fps"])
-scene.render.fps_base = 1.0
+
+def scene_rate(resolution):
+    """(fps, fps_base) matching the video exactly, e.g. 24000/1001 -> (24, 1.001)
+
+    fps_rational is the exact rate from the API; transcripts from before it
+    only have fps, where 29.97 comes as 30 and 23.976 as a float.
+    """
+    rate = Fraction(resolution.get("fps_rational") or Fraction(resolution.get("fps", 24)).limit_denominator(1001))
+    fps = max(1, round(rate))
+    return fps, float(fps / rate)
+
+# Blender only takes whole fps, fractional rates are fps / fps_base
+scene.render.fps, scene.render.fps_base = scene_rate(transcript["resolution"])
+FPS = scene.render.fps / scene.render.fps_base  # frames per second for converting transcript times
 
 # Initialize sequence editor
 if not scene.sequence_editor:
@@ -90,46 +117,62 @@ def setbox(scene):
             Y_TOP = 0.85
             Y_BOTTOM = 0
 
-            for seq in scene.sequence_editor.sequences_all:
-                if seq.type == 'TEXT':
-                    seq.use_box = True
+            # Only the sentences, word strips and titles added by hand keep their look
+            for seq in registered_strips(scene, [SENTENCE]):
+                seq.use_box = True
+
+def record_registry():
+    """Record which strips are subtitles and which role they have, see strip_registry.py"""
+    roles = {SENTENCE: [], WORD: [], BACKGROUND: []}
+    for seq in scene.sequence_editor.sequences_all:
+        if seq.type == 'TEXT' and seq.channel == SUBTITLE_BASE_CHANNEL + 2:
+            roles[SENTENCE].append(seq)
+        elif seq.type == 'TEXT' and seq.channel == WORD_BASE_CHANNEL + 2:
+            roles[WORD].append(seq)
+        elif seq.type == 'TRANSFORM' and seq.channel in (SUBTITLE_BASE_CHANNEL + 1, WORD_BASE_CHANNEL + 1):
+            roles[BACKGROUND].append(seq)
+    save_registry(scene, roles)
 
 # --- SUBTITLE CREATION ---
+def create_subtitle_strips(text, start_frame, end_frame, channel):
+    """Create the text strip of a subtitle and the transform strip for its background, without keyframes"""
+    # Calculate dimensions
+    txt_width = scene.render.resolution_x - 2 * SAFE_MARGIN
+
+    # Text strip
+    txt_strip = scene.sequence_editor.sequences.new_effect(
+        name=f"TXT_{start_frame}",
+        type='TEXT',
+        channel=channel+2,
+        frame_start=start_frame,
+        frame_end=end_frame
+    )
+    txt_strip.text = text
+    txt_strip.font_size = FONT_SIZE
+    txt_strip.color = (1, 1, 1, 1)
+    
+    if hasattr(txt_strip, "text_box"):
+        txt_strip.text_box.width = txt_width
+        txt_strip.text_box.height = LINE_HEIGHT
+        txt_strip.text_box.align_x = 'CENTER'
+        txt_strip.text_box.align_y = 'BOTTOM'
+
+    # Transform for background
+    trans_bg = scene.sequence_editor.sequences.new_effect(
+        name=f"TRANS_{start_frame}",
+        type='TRANSFORM',
+        channel=channel+1,
+        frame_start=start_frame,
+        frame_end=end_frame,
+        seq1=txt_strip
+    )
+    return txt_strip, trans_bg
+
 def create_subtitle(text, start_frame, end_frame, channel):
     """Create a single subtitle with proper fading"""
     try:
-        # Calculate dimensions
-        txt_width = scene.render.resolution_x - 2 * SAFE_MARGIN
-        y_position = 0.0
-
-        # Text strip
-        txt_strip = scene.sequence_editor.sequences.new_effect(
-            name=f"TXT_{start_frame}",
-            type='TEXT',
-            channel=channel+2,
-            frame_start=start_frame,
-            frame_end=end_frame
-        )
-        txt_strip.text = text
-        txt_strip.font_size = FONT_SIZE
-        txt_strip.color = (1, 1, 1, 1)
-        
-        if hasattr(txt_strip, "text_box"):
-            txt_strip.text_box.width = txt_width
-            txt_strip.text_box.height = LINE_HEIGHT
-            txt_strip.text_box.align_x = 'CENTER'
-            txt_strip.text_box.align_y = 'BOTTOM'
-
-        # Transform for background
-        trans_bg = scene.sequence_editor.sequences.new_effect(
-            name=f"TRANS_{start_frame}",
-            type='TRANSFORM',
-            channel=channel+1,
-            frame_start=start_frame,
-            frame_end=end_frame,
-            seq1=txt_strip
-        )
-        
+        txt_strip, trans_bg = create_subtitle_strips(text, start_frame, end_frame, channel)
+
         # Add opactity Zero - This is for word layers, intentionally set the opacity to zero enable, disable to call to this function for word layer opacity aka alpha
         def zero_opacity(strip):
             strip.blend_alpha = 0.0
@@ -148,8 +191,7 @@ def create_subtitle(text, start_frame, end_frame, channel):
             strip.blend_alpha = 0.0
             strip.keyframe_insert("blend_alpha", frame=end_frame)
 
-        findWordsLen = len(text.split()) #checking whether it is a sentence or word, if sentence add fade effect, for words it is too short to have the effects
-        if findWordsLen != 1: 
+        if not is_word(text):
             add_fade(trans_bg) #enable if needed.
             add_fade(txt_strip)
         else:
@@ -162,8 +204,178 @@ def create_subtitle(text, start_frame, end_frame, channel):
         print(f"Error creating subtitle: {str(e)}")
         return False
 
+def is_word(text):
+    # Checking whether it is a sentence or word: sentences fade in and out, words are too short for the effects
+    # and their layers get zero opacity from start frame to end frame
+    return len(text.split()) == 1
+
+# --- BULK SUBTITLE CREATION ---
+def subtitle_keys(text, start_frame, end_frame):
+    """The (frame, blend_alpha) keyframes create_subtitle inserts, sorted by frame"""
+    if is_word(text):
+        keys = {start_frame: 0.0, end_frame: 0.0}
+    else:
+        # On short sentences the fade keys fall onto each other; like keyframe_insert, the later one wins
+        keys = {start_frame: 0.0, start_frame + FADE_DURATION: 1.0, end_frame - FADE_DURATION: 1.0, end_frame: 0.0}
+    return sorted((float(frame), value) for frame, value in keys.items())
+
+def write_keyframes(curves):
+    """Write [(data path, keys)] to the scene action, each fcurve filled in one foreach_set"""
+    if scene.animation_data is None:
+        scene.animation_data_create()
+    action = scene.animation_data.action
+    if action is None:
+        action = bpy.data.actions.new("SceneAction")
+        scene.animation_data.action = action
+    existing = {fcurve.data_path: fcurve for fcurve in action.fcurves}
+    for data_path, keys in curves:
+        if data_path in existing:  # left over from a removed strip of the same name
+            action.fcurves.remove(existing.pop(data_path))
+        fcurve = action.fcurves.new(data_path)
+        fcurve.keyframe_points.add(len(keys))
+        fcurve.keyframe_points.foreach_set("co", [number for key in keys for number in key])
+        fcurve.update()  # auto-clamped handles, as keyframe_insert leaves them
+
+def create_subtitles(subtitles, label):
+    """Create (text, start frame, end frame, channel) subtitles and return the (text, transform) strip pairs.
+
+    Gives the same strips and keyframes as create_subtitle for each one,
+    but all strips are created first and then every fcurve is written in
+    one go instead of a keyframe_insert per keyframe.
+    """
+    started = time.perf_counter()
+    pairs = []
+    curves = []
+    for text, start_frame, end_frame, channel in subtitles:
+        try:
+            txt_strip, trans_bg = create_subtitle_strips(text, start_frame, end_frame, channel)
+        except Exception as e:
+            print(f"Error creating subtitle: {str(e)}")
+            continue
+        keys = subtitle_keys(text, start_frame, end_frame)
+        # Same fcurve order as create_subtitle
+        for strip in ((txt_strip, trans_bg) if is_word(text) else (trans_bg, txt_strip)):
+            strip.blend_alpha = 0.0
+            curves.append((strip.path_from_id("blend_alpha"), keys))
+        pairs.append((txt_strip, trans_bg))
+    strips_done = time.perf_counter()
+    if curves:
+        write_keyframes(curves)
+    report_timing(label, 2 * len(pairs), time.perf_counter() - started, strips_done - started,
+                  sum(len(keys) for _, keys in curves))
+    return pairs
+
+def create_subtitles_per_strip(subtitles, label):
+    """create_subtitle for each subtitle, for comparing with create_subtitles; returns how many were created"""
+    started = time.perf_counter()
+    count = sum(create_subtitle(*subtitle) for subtitle in subtitles)
+    report_timing(label + " (per strip)", 2 * count, time.perf_counter() - started)
+    return count
+
+def report_timing(label, strips, seconds, strip_seconds=None, keyframes=None):
+    per_thousand = f", {1000 * seconds / strips:.2f}s per 1000 strips" if strips else ""
+    detail = f" (strips {strip_seconds:.2f}s, {keyframes} keyframes {seconds - strip_seconds:.2f}s)" if keyframes is not None else ""
+    print(f"{label}: {strips} strips in {seconds:.2f}s{per_thousand}{detail}")
+
+# --- INCREMENTAL UPDATE ---
+def wanted_subtitles():
+    """(base channel, start frame, end frame, text) of every sentence and word in the transcript"""
+    wanted = []
+    for base, key in ((SUBTITLE_BASE_CHANNEL, "sentences"), (WORD_BASE_CHANNEL, "words")):
+        for record in transcript[key]:
+            wanted.append((base, int(record["start"] * FPS), int(record["end"] * FPS), record["text"]))
+    return wanted
+
+def existing_subtitles():
+    """Map (base channel, start frame, end frame, text) to the (text, transform) strip pairs in the project"""
+    existing = {}
+    for trans_bg in registered_strips(scene, [BACKGROUND]):
+        txt_strip = trans_bg.input_1
+        if txt_strip is not None and txt_strip.type == 'TEXT' and txt_strip.channel - 2 in (SUBTITLE_BASE_CHANNEL, WORD_BASE_CHANNEL):
+            key = (txt_strip.channel - 2, txt_strip.frame_final_start, txt_strip.frame_final_end, txt_strip.text)
+            existing.setdefault(key, []).append((txt_strip, trans_bg))
+    return existing
+
+def remove_subtitle(pair, action, fcurves):
+    """Remove a text strip, its transform and their keyframes"""
+    for strip in reversed(pair):
+        for fcurve in fcurves.pop(strip.name, []):
+            action.fcurves.remove(fcurve)
+        scene.sequence_editor.sequences.remove(strip)
+
+def update_subtitles():
+    """Change only the subtitle strips that differ from the transcript.
+
+    Strips whose frames and text match are kept as they are. A strip with
+    the right frames but other text only gets the new text; everything
+    else left over is removed and the missing subtitles are created, which
+    is how changed timing is applied. Returns False when the project has
+    no video yet and needs a full build.
+    """
+    if not any(seq.type == 'MOVIE' for seq in scene.sequence_editor.sequences_all):
+        return False
+    started = time.perf_counter()
+    existing = existing_subtitles()
+    missing = []
+    kept = 0
+    for key in wanted_subtitles():
+        if existing.get(key):
+            existing[key].pop()
+            kept += 1
+        else:
+            missing.append(key)
+    # Left over strips by frames, for subtitles whose text was edited
+    stale = {}
+    for (base, start_frame, end_frame, text), pairs in existing.items():
+        for pair in pairs:
+            stale.setdefault((base, start_frame, end_frame), []).append((text, pair))
+    to_create = []
+    retexted = 0
+    for base, start_frame, end_frame, text in missing:
+        left = stale.get((base, start_frame, end_frame))
+        if left and is_word(left[-1][0]) == is_word(text):
+            _, (txt_strip, _) = left.pop()
+            txt_strip.text = text
+            retexted += 1
+        else:
+            to_create.append((base, start_frame, end_frame, text))
+
+    action = scene.animation_data.action if scene.animation_data else None
+    fcurves = {}
+    if action:
+        for fcurve in action.fcurves:
+            match = STRIP_PATH_RE.match(fcurve.data_path)
+            if match:
+                fcurves.setdefault(match.group(1), []).append(fcurve)
+    removed = 0
+    for left in stale.values():
+        for _, pair in left:
+            remove_subtitle(pair, action, fcurves)
+            removed += 1
+    created = create_subtitles([(text, start_frame, end_frame, base) for base, start_frame, end_frame, text in to_create],
+                               "Added subtitles")
+    added = len(created)
+    record_registry()
+    if added:
+        setbox(scene)
+    print(f"Updated subtitles in {time.perf_counter() - started:.2f}s: {kept} unchanged, {retexted} new text, "
+          f"{removed} removed, {added}/{len(to_create)} added")
+    return True
+
+def save_project():
+    # Set FPS again in case the imported video changed it, the video, audio and text will be out of sync otherwise
+    scene.render.fps, scene.render.fps_base = scene_rate(transcript["resolution"])
+
+    # Save blender project
+    bpy.ops.wm.save_as_mainfile(filepath=blend_out)
+    print(f"Project saved to {blend_out}")
+
 # --- MAIN EXECUTION ---
 def main():
+    if UPDATE and update_subtitles():
+        save_project()
+        return
+
     # Clear existing sequences
     clear_existing_sequences()
     
@@ -171,44 +383,29 @@ def main():
     if not setup_video_and_audio():
         return
 
-    # Process all sentences
-    success_count = 0
-    for i, sentence in enumerate(transcript["sentences"]):
-        start_frame = int(sentence["start"] * scene.render.fps)
-        end_frame = int(sentence["end"] * scene.render.fps)
-        
+    def subtitles(records, channel):
         # Use same channel group for all subtitles (they won't overlap in time)
-        if create_subtitle(sentence["text"], start_frame, end_frame, SUBTITLE_BASE_CHANNEL):
-            success_count += 1
-    
+        return [(record["text"], int(record["start"] * FPS), int(record["end"] * FPS), channel)
+                for record in records]
+    def create(records, channel, label):
+        if PER_STRIP:
+            return create_subtitles_per_strip(subtitles(records, channel), label)
+        return len(create_subtitles(subtitles(records, channel), label))
+
+    # Process all sentences
+    success_count = create(transcript["sentences"], SUBTITLE_BASE_CHANNEL, "Sentences")
     print(f"Successfully added {success_count}/{len(transcript['sentences'])} subtitles")
-    
-    # creates box for all text layer.
-    setbox(scene)
 
     #enable to create words
     # Process all words
-    success_count = 0
-    for i, sentence in enumerate(transcript["words"]):
-        start_frame = int(sentence["start"] * scene.render.fps)
-        end_frame = int(sentence["end"] * scene.render.fps)
-        
-        # Use same channel group for all subtitles (they won't overlap in time)
-        if create_subtitle(sentence["text"], start_frame, end_frame, WORD_BASE_CHANNEL):
-            success_count += 1
-
+    success_count = create(transcript["words"], WORD_BASE_CHANNEL, "Words")
     print(f"Successfully added {success_count}/{len(transcript['words'])} words")
-    
-    # Set FPS if not set to imported video fps, the video, audio and text will be out of sync
-    fps = transcript.get("resolution", {}).get("fps", 24)
-    if 29.1 < float(fps) < 29.99:
-        scene.render.fps = 30
-    else:
-        scene.render.fps = int(fps)
 
-    # Save blender project
-    bpy.ops.wm.save_as_mainfile(filepath=blend_out)
-    print(f"Project saved to {blend_out}")
+    record_registry()
+    # creates box for the sentence text layers.
+    setbox(scene)
+
+    save_project()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+# blender_worker.py
+# Runs inside a long lived "blender --background --python blender_worker.py" and
+# runs the other Blender scripts on request, see blender_pool.py
+import bpy
+import os
+import sys
+import json
+import runpy
+import ctypes
+import traceback
+
+RESULT_PREFIX = "BLENDER_WORKER_RESULT "  # marks the protocol lines among Blender's own output
+
+
+def flush_output():
+    # Blender's render progress is printed by C code, flush it before the result line
+    sys.stdout.flush()
+    try:
+        ctypes.CDLL(None).fflush(None)
+    except (OSError, AttributeError):
+        pass
+
+
+def reply(message):
+    flush_output()
+    print(RESULT_PREFIX + json.dumps(message), flush=True)
+
+
+def run_job(job):
+    """Start from a clean state, then run the script like "blender -b <blend> --python <script> -- <args>" would"""
+    blend_file = job.get("blend_file")
+    # The scripts add their folder to sys.path; put it back so it does not grow with every job.
+    # Modules they import from their folder (strip_registry, ...) are forgotten too, so an edited
+    # one is loaded fresh like in a new Blender; others stay, C extensions cannot be loaded twice.
+    path, argv, modules = list(sys.path), sys.argv, set(sys.modules)
+    folder = os.path.dirname(os.path.abspath(job["script"])) + os.sep
+    try:
+        if blend_file:
+            bpy.ops.wm.open_mainfile(filepath=blend_file)
+            sys.argv = [bpy.app.binary_path, "-b", blend_file, "--python", job["script"], "--"] + job["args"]
+        else:
+            bpy.ops.wm.read_homefile()
+            sys.argv = [bpy.app.binary_path, "--background", "--python", job["script"], "--"] + job["args"]
+        runpy.run_path(job["script"], run_name="__main__")
+    finally:
+        sys.path[:] = path
+        sys.argv = argv
+        for name in set(sys.modules) - modules:
+            module_file = getattr(sys.modules[name], "__file__", None)
+            if module_file and os.path.abspath(module_file).startswith(folder):
+                del sys.modules[name]
+
+
+def main():
+    reply({"ready": True})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        result = {"id": job["id"], "ok": True}
+        try:
+            run_job(job)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                result = {"id": job["id"], "ok": False, "error": f"Script exited with {e.code}"}
+        except Exception:
+            result = {"id": job["id"], "ok": False, "error": traceback.format_exc(limit=-3)}
+        reply(result)
+    # stdin closed: the client is gone, Blender exits with the script
+
+
+main()
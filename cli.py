@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+from pipeline import Pipeline
+from watcher import FolderWatcher, SeenRecord, SEEN_NAME, STABLE_SECONDS, POLL_SECONDS
+from strip_registry import ROLES, TEXT_ROLES
+from render_queue import RenderQueue, FINISHED, DONE
+from core import (
+    API_URL, OUTPUT_FOLDER, BATCH_TRANSCRIBE_WORKERS, BATCH_BUILD_WORKERS, BATCH_QUEUE_SIZE, RENDER_PARALLEL,
+    get_video_files, get_default_blender_path, video_stages, up_to_date, render_call, render_output_path,
+    text_position_call, reset_text_position_call, text_style_call, run_blender
+)
+
+PROGRESS_INTERVAL = 1.0  # at most one progress line per item and second, status changes always go out
+
+
+class Progress:
+    # Progress events on stderr, as JSON lines with --json; stdout is kept for the final report
+    def __init__(self, as_json):
+        self.as_json = as_json
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event, item, throttle=False, **fields):
+        now = time.monotonic()
+        with self._lock:
+            if throttle and now - self._last.get(item, 0.0) < PROGRESS_INTERVAL:
+                return
+            self._last[item] = now
+            if self.as_json:
+                line = json.dumps(dict(event=event, item=item, time=round(time.time(), 3), **fields), ensure_ascii=False)
+            else:
+                line = f"[{event}] {item} " + " ".join(f"{k}={v}" for k, v in fields.items() if v not in (None, ""))
+            print(line, file=sys.stderr, flush=True)
+
+
+def expand_videos(paths):
+    # Folders stand for the video files in them
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos.extend(os.path.join(path, name) for name in sorted(get_video_files(path)))
+        else:
+            videos.append(path)
+    return videos
+
+
+def run_videos(args, videos, steps, progress, on_finished=None):
+    # Transcribe and/or build videos through the shared pipeline; returns the report.
+    # videos may be a generator that keeps yielding, on_finished(video, state) is told when each is done or failed
+    def on_detail(video, status, detail):
+        progress.emit("progress", video, throttle=True, status=status, detail=detail)
+    def on_status(video, stage, state, detail):
+        progress.emit("status", video, stage=stage, state=state, detail=detail)
+        if on_finished and state in ("done", "failed"):
+            on_finished(video, state)
+    stages, skipped = video_stages(args.api_url, args.output, args.blender, steps, args.force,
+                                   args.transcribe_workers, args.build_workers, args.queue_size, on_detail)
+    pipeline = Pipeline(stages, on_status)
+    started = time.monotonic()
+    taken = []
+    def counted():
+        for video in videos:
+            taken.append(video)
+            yield video
+    failures = pipeline.run(counted())
+    return {
+        "command": args.command,
+        "total": len(taken),
+        "succeeded": len(taken) - len(failures),
+        "failed": [{"item": video, "stage": stage, "error": error} for video, stage, error in failures],
+        "up_to_date": sorted(up_to_date(skipped)),
+        "stages": [stage.stats() for stage in pipeline.stages],
+        "seconds": round(time.monotonic() - started, 1)
+    }
+
+
+def watch_videos(args, progress):
+    # Ingest every video that appears in the folders until SIGINT/SIGTERM; returns the report
+    seen = SeenRecord(args.seen or os.path.join(args.output, SEEN_NAME))
+    watcher = FolderWatcher(args.folders, seen, args.stable_seconds, args.poll_seconds,
+                            use_inotify=not args.poll, ignore=[args.output])
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    progress.emit("watching", ", ".join(watcher.folders), mode="polling" if watcher.inotify is None else "inotify")
+    def videos():
+        for video in watcher.videos(stop):
+            progress.emit("found", video)
+            yield video
+    # Whatever is in the pipeline when stopping is finished first
+    return run_videos(args, videos(), ("transcribe", "build"), progress, watcher.finished)
+
+
+def run_blender_jobs(args, jobs, progress):
+    # Run (BlenderCall, blend_file, task) jobs in persistent Blender workers; returns the report
+    def on_change(job):
+        percent = job.progress()
+        fields = {"task": job.task, "state": job.status,
+                  "progress": None if percent is None else round(percent, 3),
+                  "eta_seconds": None if job.eta() is None else round(job.eta(), 1), "error": job.error}
+        progress.emit("status", f"{job.blend_file}#{job.id}", throttle=job.status == "running" and job.frame is not None,
+                      **fields)
+    queue = RenderQueue(args.parallel, on_change, run_blender)
+    started = time.monotonic()
+    submitted = [queue.submit(command, blend_file, task) for command, blend_file, task in jobs]
+    while not all(job.status in FINISHED for job in submitted):
+        time.sleep(0.2)
+    failed = [job for job in submitted if job.status != DONE]
+    return {
+        "command": args.command,
+        "total": len(submitted),
+        "succeeded": len(submitted) - len(failed),
+        "failed": [{"item": job.blend_file, "stage": job.task, "error": job.error or job.status} for job in failed],
+        "jobs": [
+            {"item": job.blend_file, "task": job.task, "status": job.status,
+             "seconds": round(job.finished - job.started, 1) if job.started else None}
+            for job in submitted
+        ],
+        "seconds": round(time.monotonic() - started, 1)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe videos and build, edit and render Blender VSE projects without a GUI.",
+                                     epilog="The options above are also accepted after the subcommand.")
+    parser.add_argument("--api-url", default=API_URL, help="transcript API endpoint (default: %(default)s)")
+    parser.add_argument("--output", default=OUTPUT_FOLDER, help="output folder (default: %(default)s)")
+    parser.add_argument("--blender", default=get_default_blender_path(), help="Blender executable (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print progress as JSON lines on stderr")
+    # The same options after the subcommand; SUPPRESS keeps the values given before it unless repeated
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--api-url", default=argparse.SUPPRESS, help="transcript API endpoint")
+    common.add_argument("--output", default=argparse.SUPPRESS, help="output folder")
+    common.add_argument("--blender", default=argparse.SUPPRESS, help="Blender executable")
+    common.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="print progress as JSON lines on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def video_command(name, help_text, nargs="+"):
+        sub = commands.add_parser(name, help=help_text, parents=[common])
+        if nargs:
+            sub.add_argument("videos", nargs=nargs, help="video files or folders of videos")
+        sub.add_argument("--force", action="store_true", help="redo steps that are up to date")
+        sub.add_argument("--transcribe-workers", type=int, default=BATCH_TRANSCRIBE_WORKERS)
+        sub.add_argument("--build-workers", type=int, default=BATCH_BUILD_WORKERS)
+        sub.add_argument("--queue-size", type=int, default=BATCH_QUEUE_SIZE, help="transcripts waiting for Blender at most")
+        return sub
+
+    video_command("ingest", "transcribe every video in the folders and build their Blender projects")
+    video_command("transcribe", "only transcribe")
+    video_command("build", "only build Blender projects from existing transcripts")
+    watch = video_command("watch", "ingest new videos as they appear in the folders and their subfolders, until stopped",
+                          nargs=None)
+    watch.add_argument("folders", nargs="+", help="folders to watch")
+    watch.add_argument("--stable-seconds", type=float, default=STABLE_SECONDS,
+                       help="how long a file must stay unchanged before it counts as completely written")
+    watch.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    watch.add_argument("--poll", action="store_true", help="scan the folders instead of using inotify")
+    watch.add_argument("--seen", help=f"file recording the videos already ingested (default: <output>/{SEEN_NAME})")
+
+    def blend_command(name, help_text):
+        sub = commands.add_parser(name, help=help_text, parents=[common])
+        sub.add_argument("blend_files", nargs="+", help=".blend files")
+        sub.add_argument("--parallel", type=int, default=RENDER_PARALLEL, help="Blender processes at the same time")
+        return sub
+
+    position = blend_command("text-position", "move the text strips of projects")
+    where = position.add_mutually_exclusive_group(required=True)
+    where.add_argument("--position", help="top, bottom or a y value between 0 and 1")
+    where.add_argument("--reset", action="store_true", help="reset text strips to the default position")
+    position.add_argument("--roles", nargs="+", choices=ROLES, default=list(TEXT_ROLES),
+                          help="which subtitle strips to move (default: %(default)s)")
+    position.add_argument("--start", type=float, help="only subtitles from this second on")
+    position.add_argument("--end", type=float, help="only subtitles up to this second")
+    style = blend_command("text-style", "change the look or visibility of the subtitle strips of projects")
+    style.add_argument("--font-size", type=float, help="font size of the text strips")
+    style.add_argument("--color", type=float, nargs="+", metavar="V",
+                       help="text color, r g b or r g b a between 0 and 1")
+    style.add_argument("--box", choices=("on", "off"), help="box behind the text")
+    visibility = style.add_mutually_exclusive_group()
+    visibility.add_argument("--show", dest="visible", action="store_const", const=True, help="unmute the strips")
+    visibility.add_argument("--hide", dest="visible", action="store_const", const=False, help="mute the strips")
+    style.add_argument("--roles", nargs="+", choices=ROLES, default=list(TEXT_ROLES),
+                       help="which subtitle strips to change (default: %(default)s)")
+    style.add_argument("--start", type=float, help="only subtitles from this second on")
+    style.add_argument("--end", type=float, help="only subtitles up to this second")
+    blend_command("render", "render projects to <name>_bps.mp4 next to each .blend")
+    args = parser.parse_args(argv)
+    if args.command == "text-style":
+        if args.color is not None and len(args.color) not in (3, 4):
+            style.error("--color takes 3 or 4 values")
+        if args.font_size is None and args.color is None and args.box is None and args.visible is None:
+            style.error("nothing to change, give --font-size, --color, --box, --show or --hide")
+    return args
+
+
+def main(argv=None):
+    """Run one subcommand and print a JSON report on stdout.
+
+    The exit status is 0 when everything succeeded and 1 when any item failed.
+    """
+    args = parse_args(argv)
+    progress = Progress(args.json)
+    if args.command in ("ingest", "transcribe", "build"):
+        steps = {"ingest": ("transcribe", "build"), "transcribe": ("transcribe",), "build": ("build",)}[args.command]
+        report = run_videos(args, expand_videos(args.videos), steps, progress)
+    elif args.command == "watch":
+        report = watch_videos(args, progress)
+    elif args.command == "text-position":
+        jobs = []
+        for blend_file in args.blend_files:
+            if args.reset:
+                jobs.append((reset_text_position_call(args.blender, blend_file, args.roles), blend_file,
+                             "reset text position"))
+            else:
+                call = text_position_call(args.blender, blend_file, args.position, args.roles, args.start, args.end)
+                jobs.append((call, blend_file, f"text position {args.position}"))
+        report = run_blender_jobs(args, jobs, progress)
+    elif args.command == "text-style":
+        box = None if args.box is None else args.box == "on"
+        jobs = [(text_style_call(args.blender, blend_file, args.font_size, args.color, box, args.visible, args.roles,
+                                 args.start, args.end), blend_file, "text style") for blend_file in args.blend_files]
+        report = run_blender_jobs(args, jobs, progress)
+    else:
+        jobs = [(render_call(args.blender, blend_file, render_output_path(blend_file)), blend_file,
+                 f"render {os.path.basename(render_output_path(blend_file))}") for blend_file in args.blend_files]
+        report = run_blender_jobs(args, jobs, progress)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
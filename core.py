@@ -0,0 +1,617 @@
+import io
+import os
+import json
+import uuid
+import random
+import atexit
+import platform
+import threading
+import time
+import bisect
+from collections import namedtuple
+import requests
+from requests.adapters import HTTPAdapter
+from pipeline import Stage
+from manifest import BuildManifest
+from blender_pool import BlenderPool, run_process
+
+# Load config, next to this file so the CLI can run from any directory
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"), "r", encoding="utf-8") as f:
+    CFG = json.load(f)
+
+SOURCE_FOLDER = "videos"
+OUTPUT_FOLDER = "output"
+API_URL = CFG.get("default_api_url", "http://localhost:8000/transcribe/")
+MAX_BUSY_RETRIES = 10  # how often to retry when the API answers 429
+MAX_RETRY_AFTER = 300  # never wait longer than this between retries (seconds)
+MAX_NETWORK_RETRIES = 5  # retries after connection errors and 502/503/504, with exponential backoff
+BACKOFF_SECONDS = 1.0  # first backoff delay, doubled on every retry
+MAX_BACKOFF = 60
+RETRY_STATUSES = (502, 503, 504)
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 3600  # a transcription can take a while before the API answers
+RESUMABLE_MIN_BYTES = 64 * 1024 * 1024  # larger videos are sent with the resumable upload protocol
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024  # chunk size for resumable uploads
+PROGRESS_STEP = 1024 * 1024  # report upload progress about every megabyte
+BLENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_vse_script.py")
+STRIP_REGISTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strip_registry.py")  # imported by BLENDER_SCRIPT
+TRANSCRIPT_MODEL = CFG.get("transcript_model") or None  # Whisper model asked for, None for the API's default
+# Batch mode: how many videos are transcribed and how many Blender projects are built at once
+BATCH_TRANSCRIBE_WORKERS = int(CFG.get("batch_transcribe_workers", 2))
+BATCH_BUILD_WORKERS = int(CFG.get("batch_build_workers", 1))
+BATCH_QUEUE_SIZE = int(CFG.get("batch_queue_size", 2))  # transcripts waiting for Blender at most
+RENDER_PARALLEL = int(CFG.get("render_parallel", 1))  # Blender renders running at the same time
+# Run Blender jobs in long lived Blender processes instead of starting Blender for every job
+BLENDER_PERSISTENT_WORKERS = bool(CFG.get("blender_persistent_workers", True))
+BLENDER_MAX_WORKERS = int(CFG.get("blender_max_workers", 2))  # per Blender executable, further jobs wait
+BLENDER_IDLE_SECONDS = float(CFG.get("blender_idle_seconds", 300))  # idle workers are closed after this
+
+def make_session():
+    # One pooled session for all API calls, so videos reuse connections instead of opening one each
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, 2 * BATCH_TRANSCRIBE_WORKERS))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+SESSION = make_session()
+
+def ensure_dirs():
+    os.makedirs(SOURCE_FOLDER, exist_ok=True)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.m4v', '.mts', '.webm')
+
+def is_video_file(name):
+    return name.lower().endswith(VIDEO_EXTENSIONS)
+
+def get_video_files(folder):
+    # List all video files in the folder
+    return [f for f in os.listdir(folder) if is_video_file(f)]
+
+# Client side of the columnar wire format: a copy of COLUMNAR_MEDIA_TYPE and from_columnar in
+# transcript_api/wire.py, which the client does not import. Change both together.
+COLUMNAR_MEDIA_TYPE = "application/vnd.transcript.columnar+json"
+
+def expand_columns(columns):
+    # {"text": [...], "start": [...], "end": [...]} -> [{"text", "start", "end"}, ...]
+    return [
+        {"text": text, "start": start, "end": end}
+        for text, start, end in zip(columns.get("text", []), columns.get("start", []), columns.get("end", []))
+    ]
+
+def expand_columnar(data):
+    # {"words": {"text": [...], "start": [...], "end": [...]}} -> {"words": [{"text", "start", "end"}, ...]}
+    transcript = {key: value for key, value in data.items() if key not in ("sentences", "words", "format")}
+    for key in ("sentences", "words"):
+        transcript[key] = expand_columns(data.get(key, {}))
+    return transcript
+
+def decode_transcript_response(resp):
+    # requests already undid gzip/zstd; only the columnar layout is left to expand
+    data = resp.json()
+    if resp.headers.get("Content-Type", "").startswith(COLUMNAR_MEDIA_TYPE) or data.get("format") == "columnar":
+        return expand_columnar(data)
+    return data
+
+def call_transcript_api(video_path, api_url, params=None, on_progress=None):
+    # Call the transcript API with the video file, asking for the compact columnar format
+    headers = {"Accept": f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.5"}
+    resp = post_video(api_url, video_path, on_progress, params=params, headers=headers)
+    resp.raise_for_status()
+    return decode_transcript_response(resp)
+
+def overlaps(record, start, end):
+    # Records without timing (e.g. added by hand) never overlap
+    return "start" in record and "end" in record and record["start"] < end and record["end"] > start
+
+def expand_range_to_sentences(transcript, start, end):
+    # Widen [start, end) to whole sentences, so re-transcribing it never cuts one in half
+    for sentence in transcript.get("sentences", []):
+        if isinstance(sentence, dict) and overlaps(sentence, start, end):
+            start = min(start, sentence["start"])
+            end = max(end, sentence["end"])
+    return start, end
+
+def merge_records(old, new, start, end):
+    # Drop old records overlapping the range and put the new ones where the range was
+    kept = [r for r in old if not (isinstance(r, dict) and overlaps(r, start, end))]
+    at = next((i for i, r in enumerate(kept) if isinstance(r, dict) and r.get("start", -1) >= start), len(kept))
+    return kept[:at] + list(new) + kept[at:]
+
+def merge_transcript_range(transcript, partial, start, end):
+    # Replace only the sentences and words of [start, end) with the re-transcribed ones
+    merged = dict(transcript)
+    for key in ("sentences", "words"):
+        merged[key] = merge_records(transcript.get(key, []), partial.get(key, []), start, end)
+    return merged
+
+def retranscribe_range(video_path, api_url, transcript_path, start, end, on_progress=None):
+    # Re-transcribe [start, end) seconds of the video and merge it into transcript.txt
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcript = json.load(f)
+    start, end = expand_range_to_sentences(transcript, start, end)
+    partial = call_transcript_api(video_path, api_url, params={"start": start, "end": end}, on_progress=on_progress)
+    merged = merge_transcript_range(transcript, partial, start, end)
+    write_json_atomic(transcript_path, merged)
+    return merged, (start, end)
+
+def retry_after_seconds(resp, default=5.0):
+    # Retry-After in seconds, capped; the API always sends seconds, not a date
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(resp.headers.get("Retry-After", default))))
+    except ValueError:
+        return default
+
+def backoff_delay(attempt):
+    # Exponential backoff with jitter, so clients that failed together do not retry together
+    return min(MAX_BACKOFF, BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+def request_with_retry(method, url, rewind=None, **kwargs):
+    # Send a request through the shared session. While the API is busy (429) wait as long as it
+    # asks; after a connection error, timeout or 502/503/504 back off exponentially.
+    # rewind() is called before every attempt to reset the body being uploaded.
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    busy = failed = 0
+    while True:
+        if rewind:
+            rewind()
+        try:
+            resp = SESSION.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if failed >= MAX_NETWORK_RETRIES:
+                raise
+            time.sleep(backoff_delay(failed))
+            failed += 1
+            continue
+        if resp.status_code == 429 and busy < MAX_BUSY_RETRIES:
+            wait = retry_after_seconds(resp)
+            busy += 1
+        elif resp.status_code in RETRY_STATUSES and failed < MAX_NETWORK_RETRIES:
+            wait = backoff_delay(failed)
+            failed += 1
+        else:
+            return resp
+        resp.close()
+        time.sleep(wait)
+
+def post_with_retry(url, rewind, **kwargs):
+    return request_with_retry("POST", url, rewind, **kwargs)
+
+class MultipartUpload:
+    """A multipart/form-data body that is read from the files while it is sent.
+
+    requests gets a file-like object of known length, so Content-Length is
+    set and the videos are never loaded into memory. files is a list of
+    (field name, path); on_progress(sent, total) is called about every
+    PROGRESS_STEP bytes.
+    """
+
+    def __init__(self, files, on_progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.on_progress = on_progress
+        self.parts = []  # bytes, or the path of a file to send
+        for field, path in files:
+            name = os.path.basename(path).replace('"', "%22")
+            head = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+                    f"Content-Type: application/octet-stream\r\n\r\n")
+            self.parts.extend([head.encode("utf-8"), path, b"\r\n"])
+        self.parts.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+        self.total = sum(len(p) if isinstance(p, bytes) else os.path.getsize(p) for p in self.parts)
+        self._current = None
+        self.rewind()
+
+    def rewind(self):
+        self.close()
+        self._index = 0
+        self.sent = 0
+        self._reported = 0
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        return iter(lambda: self.read(PROGRESS_STEP), b"")
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.total
+        out = []
+        while size > 0 and self._index < len(self.parts):
+            if self._current is None:
+                part = self.parts[self._index]
+                self._current = io.BytesIO(part) if isinstance(part, bytes) else open(part, "rb")
+            data = self._current.read(size)
+            if not data:
+                self.close()
+                self._index += 1
+                continue
+            out.append(data)
+            size -= len(data)
+        data = b"".join(out)
+        self.sent += len(data)
+        if self.on_progress and data and (self.sent - self._reported >= PROGRESS_STEP or self.sent == self.total):
+            self._reported = self.sent
+            self.on_progress(self.sent, self.total)
+        return data
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+def uploads_api_url(api_url):
+    # http://localhost:8000/transcribe/ -> http://localhost:8000/uploads/
+    return api_url.rstrip("/").rsplit("/", 1)[0] + "/uploads/"
+
+def resumable_upload(api_url, video_path, on_progress=None):
+    """Send a video with the API's resumable upload protocol and return the upload id.
+
+    The file goes up in UPLOAD_CHUNK_BYTES chunks. When a chunk fails, the
+    API is asked how far it got and the upload continues from there after a
+    backoff; only MAX_NETWORK_RETRIES failures in a row give up. A chunk
+    turned away while the API is busy (429) is sent again after Retry-After.
+    """
+    size = os.path.getsize(video_path)
+    uploads_url = uploads_api_url(api_url)
+    resp = request_with_retry("POST", uploads_url, json={"filename": os.path.basename(video_path), "size": size})
+    resp.raise_for_status()
+    upload_id = resp.json()["upload_id"]
+    upload_url = uploads_url + upload_id
+    headers = {"Content-Type": "application/offset+octet-stream"}
+    offset = failed = busy = 0
+    with open(video_path, "rb") as f:
+        while offset < size:
+            f.seek(offset)
+            chunk = f.read(UPLOAD_CHUNK_BYTES)
+            try:
+                resp = SESSION.patch(upload_url, data=chunk, headers=dict(headers, **{"Upload-Offset": str(offset)}),
+                                     timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+            except (requests.ConnectionError, requests.Timeout):
+                resp = None
+            if resp is not None and resp.status_code == 429 and busy < MAX_BUSY_RETRIES:
+                busy += 1
+                resp.close()
+                time.sleep(retry_after_seconds(resp))  # rejected before its body was read
+                continue
+            busy = 0
+            if resp is not None and resp.status_code not in RETRY_STATUSES:
+                if resp.status_code != 409:  # 409: out of step, the answer says where the API is
+                    resp.raise_for_status()
+                offset = resp.json()["offset"]
+                failed = 0
+            else:
+                if failed >= MAX_NETWORK_RETRIES:
+                    raise requests.ConnectionError(f"Upload of {video_path} failed at byte {offset} of {size}")
+                time.sleep(backoff_delay(failed))
+                failed += 1
+                # Part of the chunk may have arrived; continue from what the API has
+                resp = request_with_retry("GET", upload_url)
+                resp.raise_for_status()
+                offset = resp.json()["offset"]
+            if on_progress:
+                on_progress(offset, size)
+    return upload_id
+
+def model_params(params=None):
+    # Request parameters with the configured Whisper model added
+    params = dict(params or {})
+    if TRANSCRIPT_MODEL:
+        params.setdefault("model", TRANSCRIPT_MODEL)
+    return params
+
+def post_video(url, video_path, on_progress=None, params=None, **kwargs):
+    # POST one video to a transcribe endpoint. Large videos go up with the resumable protocol
+    # first and are passed by upload_id; smaller ones are streamed as multipart.
+    params = model_params(params)
+    if os.path.getsize(video_path) >= RESUMABLE_MIN_BYTES:
+        upload_id = resumable_upload(url, video_path, on_progress)
+        return post_with_retry(url, None, params=dict(params, upload_id=upload_id), **kwargs)
+    body = MultipartUpload([("file", video_path)], on_progress)
+    headers = dict(kwargs.pop("headers", None) or {}, **{"Content-Type": body.content_type})
+    try:
+        return post_with_retry(url, body.rewind, data=body, headers=headers, params=params, **kwargs)
+    finally:
+        body.close()
+
+def upload_progress_text(sent, total):
+    return f"uploading {100.0 * sent / max(total, 1):.0f}% of {total / 1e6:.0f} MB"
+
+def write_json_atomic(path, data):
+    # Write to a temp file and swap it in, so readers never see a half-written transcript
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, indent=2, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+def record_text(record):
+    # Records are {"text", "start", "end"}; very old transcripts have plain strings
+    return record["text"] if isinstance(record, dict) else record
+
+def has_timing(record):
+    return isinstance(record, dict) and "start" in record and "end" in record
+
+def sentence_word_ranges(transcript):
+    # (first, end) index range into words for every sentence, found by time with bisect
+    words = transcript.get("words", [])
+    starts = [w["start"] if has_timing(w) else float("-inf") for w in words]
+    ranges = []
+    for sentence in transcript.get("sentences", []):
+        if not has_timing(sentence):
+            ranges.append((0, 0))
+            continue
+        first = bisect.bisect_left(starts, sentence["start"])
+        ranges.append((first, bisect.bisect_left(starts, sentence["end"], first)))
+    return ranges
+
+def find_record(records, index, original):
+    # The record at index if it is still the one that was edited, otherwise the same record by its timing
+    if index < len(records) and records[index] == original:
+        return index
+    if has_timing(original):
+        for i, record in enumerate(records):
+            if has_timing(record) and (record["start"], record["end"]) == (original["start"], original["end"]):
+                return i
+    return None
+
+def apply_transcript_edits(transcript_path, edits):
+    """Write edited texts into a transcript file and return the new transcript.
+
+    edits maps (key, index) to {"record": the record as it was loaded,
+    "text": its new text}, key being "sentences" or "words". The file is read
+    again and only those records are changed, keeping their timing, so
+    changes made to other records meanwhile survive. Raises ValueError when
+    an edited record is no longer in the file.
+    """
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcript = json.load(f)
+    for (key, index), edit in edits.items():
+        records = transcript.get(key, [])
+        at = find_record(records, index, edit["record"])
+        if at is None:
+            raise ValueError(f"'{record_text(edit['record']).strip()}' is no longer in {transcript_path}, reload it.")
+        record = records[at]
+        records[at] = dict(record, text=edit["text"]) if isinstance(record, dict) else edit["text"]
+    write_json_atomic(transcript_path, transcript)
+    return transcript
+
+def save_transcript(transcript, out_folder, base_name):
+    # Save transcript as JSON in output folder
+    out_dir = os.path.join(out_folder, base_name)
+    os.makedirs(out_dir, exist_ok=True)
+    write_json_atomic(os.path.join(out_dir, "transcript.txt"), transcript)
+
+def stream_transcript_api(video_path, api_url, out_folder, base_name, on_sentence=None, flush_every=2.0, on_progress=None):
+    # Stream the transcript from the API sentence by sentence and keep transcript.txt
+    # up to date while it arrives; "partial" is set until the summary line is in.
+    # Words come as columns and the stream gzip/zstd compressed (requests undoes that).
+    out_dir = os.path.join(out_folder, base_name)
+    os.makedirs(out_dir, exist_ok=True)
+    transcript_path = os.path.join(out_dir, "transcript.txt")
+    transcript = {"resolution": {}, "sentences": [], "words": [], "partial": True}
+    last_flush = time.monotonic()
+    summary = None
+    headers = {"Accept": f"{COLUMNAR_MEDIA_TYPE}, application/x-ndjson;q=0.5"}
+    with post_video(api_url, video_path, on_progress, params={"stream": "true"}, headers=headers, stream=True) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "resolution":
+                transcript["resolution"] = event.get("resolution", {})
+                transcript["media"] = event.get("media")
+            elif event["type"] == "sentence":
+                transcript["sentences"].append(event["sentence"])
+                words = event["words"]
+                transcript["words"].extend(expand_columns(words) if isinstance(words, dict) else words)
+                if on_sentence:
+                    on_sentence(event["sentence"])
+                if time.monotonic() - last_flush >= flush_every:
+                    write_json_atomic(transcript_path, transcript)
+                    last_flush = time.monotonic()
+            elif event["type"] == "summary":
+                summary = event
+                if event["status"] != "done":
+                    raise RuntimeError(event.get("error") or f"Transcription {event['status']}")
+    if summary is None:
+        # The connection closed early; keep what arrived, still marked partial, and fail
+        write_json_atomic(transcript_path, transcript)
+        raise RuntimeError(f"Transcript stream ended after {len(transcript['sentences'])} sentences without a summary")
+    del transcript["partial"]
+    write_json_atomic(transcript_path, transcript)
+    return transcript
+
+def transcribe_step(video_path, api_url, out_folder, base_name, force=False, **callbacks):
+    # Transcribe unless transcript.txt was already made from this exact video by the same API and model.
+    # Returns (transcript, whether the API was called); callbacks go to stream_transcript_api.
+    out_dir = os.path.join(out_folder, base_name)
+    transcript_path = os.path.join(out_dir, "transcript.txt")
+    manifest = BuildManifest(out_dir)
+    inputs = {"video": video_path}
+    settings = {"api_url": api_url, "model": TRANSCRIPT_MODEL}
+    if not force and manifest.is_current("transcribe", inputs, settings, outputs=[transcript_path]):
+        with open(transcript_path, "r", encoding="utf-8") as f:
+            return json.load(f), False
+    manifest.forget("transcribe")  # transcript.txt is rewritten, partial until the stream completes
+    transcript = stream_transcript_api(video_path, api_url, out_folder, base_name, **callbacks)
+    manifest.record("transcribe", inputs, settings)
+    return transcript, True
+
+def batch_summary(total, failures):
+    # One line with the counts, then one line per failed (video, stage, error)
+    lines = [f"{total - len(failures)} of {total} videos processed, {len(failures)} failed."]
+    lines.extend(f"{video} ({stage}): {error}" for video, stage, error in failures)
+    return "\n".join(lines)
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def get_default_blender_path():
+    system = platform.system()
+    if system == "Windows":
+        return r"C:\Program Files\Blender Foundation\Blender 4.4\blender.exe"
+    elif system == "Darwin":  # MacOS
+        return "/Applications/Blender.app/Contents/MacOS/Blender"
+    else:  # Linux
+        return "/usr/bin/blender"
+
+def video_base_name(video):
+    return os.path.splitext(os.path.basename(video))[0]
+
+def script_path(name):
+    # The Blender scripts live next to this file
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+# One run of a Blender script: blender_path [-b blend_file] --python script -- args
+BlenderCall = namedtuple("BlenderCall", "blender_path script args blend_file")
+
+def blender_command(call):
+    # The command line running call in a Blender process of its own
+    if call.blend_file:
+        return [call.blender_path, "-b", call.blend_file, "--python", call.script, "--"] + list(call.args)
+    return [call.blender_path, "--background", "--python", call.script, "--"] + list(call.args)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def blender_pool(blender_path):
+    with _pools_lock:
+        if blender_path not in _pools:
+            _pools[blender_path] = BlenderPool(blender_path, BLENDER_MAX_WORKERS, BLENDER_IDLE_SECONDS)
+        return _pools[blender_path]
+
+@atexit.register
+def close_blender_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+def run_blender(call, on_line=None, on_process=None):
+    """Run a BlenderCall and raise BlenderJobError when it fails.
+
+    It runs in one of the persistent workers of its Blender executable,
+    or in a Blender process of its own when blender_persistent_workers is
+    off in config.json. on_line gets Blender's output line by line,
+    on_process the process running the call (None once it is done).
+    """
+    if BLENDER_PERSISTENT_WORKERS:
+        blender_pool(call.blender_path).run(call.script, call.args, call.blend_file, on_line, on_process)
+    else:
+        run_process(blender_command(call), on_line, on_process)
+
+def build_call(blender_path, video_path, audio_path, transcript_path, blend_out):
+    return BlenderCall(blender_path, BLENDER_SCRIPT, [video_path, audio_path, transcript_path, blend_out], None)
+
+def update_call(blender_path, blend_file, video_path, audio_path, transcript_path):
+    # Patch the subtitles of an existing project to match the transcript, see update_subtitles in BLENDER_SCRIPT
+    return BlenderCall(blender_path, BLENDER_SCRIPT, [video_path, audio_path, transcript_path, blend_file, "--update"],
+                       blend_file)
+
+def render_call(blender_path, blend_file, out_path):
+    return BlenderCall(blender_path, script_path("render_video.py"), [out_path], blend_file)
+
+def render_output_path(blend_file):
+    # render_video.py puts "/<name>_bps.mp4" next to the .blend file
+    return f"/{video_base_name(blend_file)}_bps.mp4"
+
+def strip_selection_args(roles=None, start=None, end=None):
+    # Which subtitle strips the text position scripts change: roles from strip_registry.py, a time window in seconds
+    args = ["--roles", ",".join(roles)] if roles else []
+    if start is not None:
+        args += ["--start", str(start)]
+    if end is not None:
+        args += ["--end", str(end)]
+    return args
+
+def text_position_call(blender_path, blend_file, pos, roles=None, start=None, end=None):
+    return BlenderCall(blender_path, script_path("update_text_position.py"),
+                       [pos] + strip_selection_args(roles, start, end), blend_file)
+
+def reset_text_position_call(blender_path, blend_file, roles=None):
+    return BlenderCall(blender_path, script_path("reset_text_position.py"), strip_selection_args(roles), blend_file)
+
+def text_style_call(blender_path, blend_file, font_size=None, color=None, box=None, visible=None, roles=None,
+                    start=None, end=None):
+    # Style and visibility of the subtitle strips, see update_text_style.py; None leaves a property alone.
+    # color is (r, g, b) or (r, g, b, a) between 0 and 1, box and visible are True or False.
+    args = []
+    if font_size is not None:
+        args += ["--font-size", str(font_size)]
+    if color is not None:
+        args += ["--color", ",".join(str(v) for v in color)]
+    if box is not None:
+        args += ["--box", "on" if box else "off"]
+    if visible is not None:
+        args.append("--show" if visible else "--hide")
+    return BlenderCall(blender_path, script_path("update_text_style.py"), args + strip_selection_args(roles, start, end),
+                       blend_file)
+
+def build_step(blender_path, video_path, out_folder, base_name, force=False):
+    # Build the .blend unless it is up to date with the video, transcript.txt, the Blender
+    # scripts and the Blender executable. When only the transcript changed, the existing
+    # project is patched instead of rebuilt. Returns whether Blender ran.
+    out_dir = os.path.join(out_folder, base_name)
+    inputs = {
+        "video": video_path,
+        "transcript": os.path.join(out_dir, "transcript.txt"),
+        "script": BLENDER_SCRIPT,
+        "strip_registry": STRIP_REGISTRY
+    }
+    if not os.path.exists(inputs["transcript"]):
+        raise FileNotFoundError(f"No transcript for {video_path}, transcribe it first: {inputs['transcript']}")
+    settings = {"blender": blender_path}
+    blend_file = os.path.join(out_dir, f"{base_name}.blend")
+    manifest = BuildManifest(out_dir)
+    changed = None if force or not os.path.exists(blend_file) else manifest.changed_inputs("build", inputs, settings)
+    if changed == set():
+        return False
+    if changed == {"transcript"}:
+        call = update_call(blender_path, blend_file, video_path, video_path, inputs["transcript"])
+    else:
+        call = build_call(blender_path, video_path, video_path, inputs["transcript"], blend_file)
+    # Call Blender in background mode
+    run_blender(call)
+    manifest.record("build", inputs, settings)
+    return True
+
+def video_stages(api_url, out_folder, blender_path, steps=("transcribe", "build"), force=False,
+                 transcribe_workers=BATCH_TRANSCRIBE_WORKERS, build_workers=BATCH_BUILD_WORKERS,
+                 queue_size=BATCH_QUEUE_SIZE, on_detail=None):
+    """Pipeline stages that turn video paths into transcripts and Blender projects.
+
+    Returns (stages, skipped), where skipped maps each step to the videos it
+    found up to date. on_detail(video_path, status, detail) is told about
+    upload and transcription progress.
+    """
+    skipped = {step: set() for step in steps}
+    def transcribe(video_path, _):
+        callbacks = {}
+        if on_detail:
+            callbacks["on_sentence"] = lambda sentence: on_detail(
+                video_path, "transcribing", f"{sentence.get('end', 0):.0f}s done")
+            callbacks["on_progress"] = lambda sent, total: on_detail(
+                video_path, "transcribing", upload_progress_text(sent, total))
+        _, ran = transcribe_step(video_path, api_url, out_folder, video_base_name(video_path), force, **callbacks)
+        if not ran:
+            skipped["transcribe"].add(video_path)
+    def build(video_path, _):
+        if not build_step(blender_path, video_path, out_folder, video_base_name(video_path), force):
+            skipped["build"].add(video_path)
+    stages = []
+    if "transcribe" in steps:
+        stages.append(Stage("transcribe", transcribe, transcribe_workers))
+    if "build" in steps:
+        stages.append(Stage("build", build, build_workers, queue_size=queue_size))
+    return stages, skipped
+
+def up_to_date(skipped):
+    # Videos that every step found up to date
+    sets = list(skipped.values())
+    return set.intersection(*sets) if sets else set()
@@ -1,57 +1,31 @@
 import os
 import sys
 import json
+import math
 import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog, scrolledtext
-import requests
+from tkinter import filedialog, messagebox, simpledialog, scrolledtext, ttk
 import subprocess
 import threading
 import platform
+from concurrent.futures import ThreadPoolExecutor
+from pipeline import Pipeline
+from render_queue import RenderQueue, FINISHED
+# Everything that does not need a window lives in core, shared with cli.py
+from core import (
+    CFG, SOURCE_FOLDER, OUTPUT_FOLDER, API_URL, RENDER_PARALLEL, ensure_dirs, get_video_files, retranscribe_range,
+    upload_progress_text, transcribe_step, build_step, video_stages, up_to_date, batch_summary, format_eta,
+    get_default_blender_path, render_call, render_output_path, text_position_call,
+    reset_text_position_call, run_blender, video_base_name, record_text, has_timing, sentence_word_ranges,
+    apply_transcript_edits
+)
 
-# Load config
-with open("config.json", "r", encoding="utf-8") as f:
-    CFG = json.load(f)
-
-SOURCE_FOLDER = "videos"
-OUTPUT_FOLDER = "output"
-API_URL = CFG.get("default_api_url", "http://localhost:8000/transcribe/")
 DEFAULT_VIDEO_DIR = os.path.abspath(SOURCE_FOLDER)
+# Steps whose inputs did not change are skipped; "python gui.py --force" runs everything again
+FORCE_REBUILD = "--force" in sys.argv[1:]
+BATCH_RUNNING = {"transcribe": "transcribing", "build": "building"}
+RENDER_REFRESH_MS = 500
+EDITOR_PAGE_SIZE = 100  # sentences per page in the transcript editor, so long transcripts stay responsive
 
-def ensure_dirs():
-    os.makedirs(SOURCE_FOLDER, exist_ok=True)
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-def get_video_files(folder):
-    # List all video files in the folder
-    return [f for f in os.listdir(folder) if f.lower().endswith(('.mp4', '.mov', '.avi'))]
-
-def call_transcript_api(video_path, api_url):
-    # Call the transcript API with the video file
-    with open(video_path, "rb") as f:
-        files = {'file': f}
-        resp = requests.post(api_url, files=files)
-    resp.raise_for_status()
-    return resp.json()
-
-def save_transcript(transcript, out_folder, base_name):
-    # Save transcript as JSON in output folder
-    out_dir = os.path.join(out_folder, base_name)
-    os.makedirs(out_dir, exist_ok=True)
-    with open(os.path.join(out_dir, "transcript.txt"), "w", encoding="utf-8") as f:
-        f.write(json.dumps(transcript, indent=2, ensure_ascii=False))
-
-
-
-
-def get_default_blender_path():
-    system = platform.system()
-    if system == "Windows":
-        return r"C:\Program Files\Blender Foundation\Blender 4.4\blender.exe"
-    elif system == "Darwin":  # MacOS
-        return "/Applications/Blender.app/Contents/MacOS/Blender"
-    else:  # Linux
-        return "/usr/bin/blender"
-    
 class App:
     def __init__(self, root):
         self.root = root
@@ -65,6 +39,13 @@ class App:
         self.create_widgets()
         self.video_list = []
         self.current_video_index = 0
+        # Interactive mode transcribes the next video while Blender builds the current one
+        self.transcribe_pool = ThreadPoolExecutor(max_workers=1)
+        self.prefetched = {}  # video -> (Future of its transcript, Event that stops it)
+        # Renders and text position edits run in the background, in persistent Blender workers
+        self.render_queue = RenderQueue(RENDER_PARALLEL, self.on_render_change, run_blender)
+        self.reported_jobs = set()
+        self.render_table = None
 
     def create_widgets(self):
         # Buttons
@@ -73,11 +54,14 @@ class App:
         self.blender_path_var = tk.StringVar(value=self.blender_path)
         self.blender_path_entry = tk.Entry(self.root, textvariable=self.blender_path_var, state="readonly")
         tk.Button(self.root, text=CFG["choose_video_folder"], command=self.choose_video_folder).pack(fill="x")
+        tk.Button(self.root, text=CFG["batch_video_folder"], command=self.choose_batch_folder).pack(fill="x")
         tk.Button(self.root, text=CFG["choose_transcript"], command=self.choose_transcript).pack(fill="x")
+        tk.Button(self.root, text=CFG["retranscribe_range"], command=self.retranscribe_range).pack(fill="x")
         tk.Button(self.root, text=CFG["select_blender_project"], command=self.select_blender_project).pack(fill="x")
         tk.Button(self.root, text=CFG["update_text_position"], command=self.update_text_position).pack(fill="x")
         tk.Button(self.root, text=CFG["reset_text_position"], command=self.reset_text_position).pack(fill="x")
         tk.Button(self.root, text=CFG["render_video"], command=self.render_video).pack(fill="x")
+        tk.Button(self.root, text=CFG["render_queue"], command=self.show_render_queue).pack(fill="x")
         # Status/Log area
         self.log = scrolledtext.ScrolledText(self.root, height=10, state="disabled")
         self.log.pack(fill="both", expand=True)
@@ -92,6 +76,10 @@ class App:
         self.log.config(state="disabled")
         self.status_text.set(msg)
 
+    def set_status(self, text):
+        # For worker threads: Tk variables must be set from the main loop
+        self.root.after(0, self.status_text.set, text)
+
     def choose_video_folder(self):
         folder = filedialog.askdirectory(initialdir=DEFAULT_VIDEO_DIR)
         if folder:
@@ -102,6 +90,7 @@ class App:
                 return
             self.log_message(f"choose_video_folder path={folder}")
             self.current_video_index = 0
+            self.cancel_prefetched()
             self.process_next_video()
 
     def process_next_video(self):
@@ -117,35 +106,139 @@ class App:
         def worker():
             try:
                 self.log_message(f"Transcribing {video} ...")
-                transcript = call_transcript_api(video_path, self.api_url)
-                save_transcript(transcript, self.output_folder, base_name)
-                self.import_to_blender(video_path, video_path, transcript, self.output_folder, base_name)
+                future, _ = self.prefetched.pop(video, None) or self.transcribe_in_background(video)
+                transcript, transcribed = future.result()
+                next_index = self.current_video_index + 1
+                if next_index < len(self.video_list):
+                    next_video = self.video_list[next_index]
+                    self.prefetched[next_video] = self.transcribe_in_background(next_video)
+                built = build_step(self.blender_path, video_path, self.output_folder, base_name, FORCE_REBUILD)
+                if not transcribed and not built:
+                    # Nothing to look at, go straight on
+                    self.log_message(f"{video} is up to date, skipping.")
+                    self.root.after(0, self.next_video)
+                    return
                 self.log_message(f"Blender project created for {video}. Click OK to process next video.")
                 self.root.after(0, self.show_ok_next)
             except Exception as e:
                 self.log_message(f"Failed processing {video}: {e}")
+                self.cancel_prefetched()  # the run stops here
         threading.Thread(target=worker).start()
 
+    def transcribe_in_background(self, video):
+        # Start transcribing a video of the current folder; returns the Future of its transcript
+        # and an Event that stops the upload or stream at its next progress update when set
+        base_name = os.path.splitext(os.path.basename(video))[0]
+        video_path = os.path.join(self.source_folder, video)
+        stop = threading.Event()
+        def check_stop():
+            if stop.is_set():
+                raise RuntimeError(f"Transcription of {video} cancelled")
+        def on_sentence(sentence):
+            check_stop()
+            self.set_status(f"Transcribing {video}: {sentence.get('end', 0):.0f}s done")
+        def on_progress(sent, total):
+            check_stop()
+            self.set_status(f"{video}: {upload_progress_text(sent, total)}")
+        future = self.transcribe_pool.submit(transcribe_step, video_path, self.api_url, self.output_folder, base_name,
+                                             FORCE_REBUILD, on_sentence=on_sentence, on_progress=on_progress)
+        return future, stop
+
+    def cancel_prefetched(self):
+        # Stop the transcriptions started ahead for videos that will not be processed now
+        for future, stop in self.prefetched.values():
+            stop.set()
+            future.cancel()
+        self.prefetched = {}
+
+    def next_video(self):
+        self.current_video_index += 1
+        self.process_next_video()
+
     def show_ok_next(self):
         # Show OK dialog, then process next video
         if messagebox.askokcancel("Continue", "Click OK to process the next video."):
-            self.current_video_index += 1
-            self.process_next_video()
+            self.next_video()
         else:
             self.current_video_index = len(self.video_list)
+            self.cancel_prefetched()
             self.log_message("User input exit processing next video")
             return
 
-    # Save transcript as temp file for Blender script
-    def import_to_blender(self, video_path, audio_path, transcript, out_folder, base_name):
-        transcript_path = os.path.join(out_folder, base_name, "transcript.txt")
-        blender_script = os.path.join(os.path.dirname(__file__), "blender_vse_script.py")
-        blender_project = os.path.join(out_folder, base_name, f"{base_name}.blend")
-        # Call Blender in background mode
-        subprocess.run([
-            self.blender_path, "--background", "--python", blender_script,
-            "--", video_path, audio_path, transcript_path, blender_project
-        ], check=True)
+    def choose_batch_folder(self):
+        # Process every video in a folder without asking between videos
+        folder = filedialog.askdirectory(initialdir=DEFAULT_VIDEO_DIR)
+        if not folder:
+            return
+        videos = get_video_files(folder)
+        if not videos:
+            self.log_message("No video files found in selected folder.")
+            return
+        self.source_folder = folder
+        self.log_message(f"Batch processing {len(videos)} videos in {folder}")
+        self.run_batch([os.path.join(folder, video) for video in videos])
+
+    def show_batch_table(self, videos):
+        # Window with one row per video: its status and the latest detail
+        win = tk.Toplevel(self.root)
+        win.title(CFG["batch_status"])
+        table = ttk.Treeview(win, columns=("status", "detail"), height=min(len(videos), 20))
+        table.heading("#0", text="Video")
+        table.heading("status", text="Status")
+        table.heading("detail", text="Detail")
+        table.column("status", width=110)
+        table.column("detail", width=360)
+        for video in videos:
+            table.insert("", "end", iid=video, text=os.path.basename(video), values=("queued", ""))
+        table.pack(fill="both", expand=True)
+        return table
+
+    def set_batch_status(self, table, video, status, detail=""):
+        # Worker threads must not touch Tk widgets, so hand the update to the main loop
+        def update():
+            try:
+                table.item(video, values=(status, detail))
+            except tk.TclError:
+                pass  # the status window was closed, the batch keeps going
+        self.root.after(0, update)
+
+    def run_batch(self, videos):
+        # Transcription and Blender builds are pipeline stages with their own workers and a
+        # bounded queue between them, so the API transcribes the next videos while Blender
+        # builds the previous ones; a failed video is recorded and skipped
+        table = self.show_batch_table(videos)
+        def on_detail(video, status, detail):
+            self.set_batch_status(table, video, status, detail)
+        stages, skipped = video_stages(self.api_url, self.output_folder, self.blender_path, force=FORCE_REBUILD,
+                                       on_detail=on_detail)
+        def on_status(video, stage, state, detail):
+            if state == "queued":
+                self.set_batch_status(table, video, "waiting", f"for {stage}")
+            elif state == "running":
+                self.set_batch_status(table, video, BATCH_RUNNING[stage])
+            elif state == "failed":
+                self.set_batch_status(table, video, "failed", f"{stage}: {detail}")
+            elif video in up_to_date(skipped):
+                self.set_batch_status(table, video, "done", "up to date")
+            else:
+                self.set_batch_status(table, video, "done", os.path.join(self.output_folder, video_base_name(video)))
+        pipeline = Pipeline(stages, on_status)
+        def run():
+            failures = pipeline.run(videos)
+            failures = [(os.path.basename(video), stage, error) for video, stage, error in failures]
+            report = [f"{len(up_to_date(skipped))} videos were already up to date."] + pipeline.report()
+            self.root.after(0, lambda: self.finish_batch(len(videos), failures, report))
+        threading.Thread(target=run, daemon=True).start()
+
+    def finish_batch(self, total, failures, stage_report=()):
+        # Summary of the whole batch and per-stage throughput, in the log and in a dialog
+        summary = "\n".join([batch_summary(total, failures), *stage_report])
+        for line in summary.split("\n"):
+            self.log_message(line)
+        if failures:
+            messagebox.showwarning(CFG["batch_status"], summary)
+        else:
+            messagebox.showinfo(CFG["batch_status"], summary)
 
     def choose_transcript(self):
         # Open a file dialog to select a transcript file
@@ -163,44 +256,147 @@ class App:
             transcript = json.load(f)
         self.edit_transcript(transcript, transcript_file)
 
+    def retranscribe_range(self):
+        # Re-transcribe one time range of a video and splice it into its transcript
+        transcript_file = filedialog.askopenfilename(
+            title="Open Transcript File",
+            filetypes=[("Transcript Files", "*.txt"), ("All Files", "*.*")],
+            initialdir=self.output_folder
+        )
+        if not transcript_file:
+            return
+        video_path = filedialog.askopenfilename(
+            title="Select Source Video",
+            filetypes=[("Video Files", "*.mp4 *.mov *.avi"), ("All Files", "*.*")],
+            initialdir=self.source_folder
+        )
+        if not video_path:
+            return
+        start = simpledialog.askfloat("Re-transcribe", "Start (seconds):", minvalue=0)
+        end = simpledialog.askfloat("Re-transcribe", "End (seconds):", minvalue=0)
+        if start is None or end is None or end <= start:
+            return
+        def worker():
+            try:
+                self.log_message(f"Re-transcribing {start:.1f}s-{end:.1f}s of {video_path} ...")
+                def on_progress(sent, total):
+                    self.set_status(f"{os.path.basename(video_path)}: {upload_progress_text(sent, total)}")
+                _, (a, b) = retranscribe_range(video_path, self.api_url, transcript_file, start, end, on_progress)
+                self.log_message(f"Transcript updated for {a:.1f}s-{b:.1f}s: {transcript_file}")
+            except Exception as e:
+                self.log_message(f"Failed re-transcribing {video_path}: {e}")
+        threading.Thread(target=worker).start()
+
     def edit_transcript(self, transcript, transcript_file):
-        # Open a window to edit transcript sentences and words
+        # Edit sentence and word texts one page at a time; timing is never touched
         win = tk.Toplevel(self.root)
-        win.title("Edit Transcript")
-        sentences = transcript.get("sentences", [])
-        words = transcript.get("words", [])
-        text = tk.Text(win, width=80, height=20)
-        text.pack()
-        text.insert("end", "\n".join([s["text"] if isinstance(s, dict) else s for s in sentences]))
+        win.title(f"Edit Transcript - {os.path.basename(transcript_file)}")
+        state = {"transcript": transcript, "ranges": sentence_word_ranges(transcript), "page": 0}
+        edits = {}  # (key, index) -> {"record": as loaded, "text": new text}, what Save writes
+        def records(key):
+            return state["transcript"].get(key, [])
+        def page_count():
+            return max(1, math.ceil(len(records("sentences")) / EDITOR_PAGE_SIZE))
+        def current_text(key, index):
+            edit = edits.get((key, index))
+            return edit["text"] if edit else record_text(records(key)[index])
+        def row(key, index):
+            record = records(key)[index]
+            times = (f"{record['start']:.2f}", f"{record['end']:.2f}") if has_timing(record) else ("", "")
+            return times + (current_text(key, index).strip(),)
+
+        nav = tk.Frame(win)
+        nav.pack(fill="x")
+        page_label = tk.Label(nav)
+        changes_label = tk.Label(nav)
+        time_var = tk.StringVar()
+
+        def make_table(height):
+            table = ttk.Treeview(win, columns=("start", "end", "text"), show="headings", height=height)
+            for column, title, width in (("start", "Start", 70), ("end", "End", 70), ("text", "Text", 560)):
+                table.heading(column, text=title)
+                table.column(column, width=width, stretch=column == "text")
+            table.pack(fill="both", expand=True)
+            return table
+        sentence_table = make_table(20)
+        word_table = make_table(6)
+
+        def show_page(page):
+            # Only the sentences of one page are ever put into the table
+            state["page"] = max(0, min(page_count() - 1, page))
+            sentence_table.delete(*sentence_table.get_children())
+            word_table.delete(*word_table.get_children())
+            first = state["page"] * EDITOR_PAGE_SIZE
+            for index in range(first, min(first + EDITOR_PAGE_SIZE, len(records("sentences")))):
+                sentence_table.insert("", "end", iid=str(index), values=row("sentences", index))
+            page_label.config(text=f"Page {state['page'] + 1} / {page_count()}")
+        def show_words(event=None):
+            word_table.delete(*word_table.get_children())
+            selection = sentence_table.selection()
+            if not selection:
+                return
+            first, end = state["ranges"][int(selection[0])]
+            for index in range(first, end):
+                word_table.insert("", "end", iid=str(index), values=row("words", index))
+        def go_to_time():
+            try:
+                seconds = float(time_var.get())
+            except ValueError:
+                return
+            sentences = records("sentences")
+            index = next((i for i, s in enumerate(sentences) if has_timing(s) and s["end"] >= seconds),
+                         len(sentences) - 1)
+            show_page(index // EDITOR_PAGE_SIZE)
+            if sentence_table.exists(str(index)):
+                sentence_table.selection_set(str(index))
+                sentence_table.see(str(index))
+        def edit_row(table, key):
+            iid = table.focus()
+            if not iid:
+                return
+            index = int(iid)
+            text = simpledialog.askstring("Edit Transcript", "Text:", initialvalue=current_text(key, index).strip(),
+                                          parent=win)
+            if text is None:
+                return
+            original = records(key)[index]
+            if text == record_text(original).strip():
+                edits.pop((key, index), None)
+            else:
+                edits[(key, index)] = {"record": original, "text": text}
+            table.item(iid, values=row(key, index))
+            changes_label.config(text=f"{len(edits)} unsaved" if edits else "")
         def save_changes():
-            new_text = text.get("1.0", "end").strip()
-            new_sentences = [{"text": s} for s in new_text.split("\n")]
-            transcript["sentences"] = new_sentences
-            with open(transcript_file, "w", encoding="utf-8") as f:
-                f.write(json.dumps(transcript, indent=2, ensure_ascii=False))
+            if not edits:
+                return
+            try:
+                state["transcript"] = apply_transcript_edits(transcript_file, edits)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Edit Transcript", str(e), parent=win)
+                return
+            count = len(edits)
+            edits.clear()
+            state["ranges"] = sentence_word_ranges(state["transcript"])
+            changes_label.config(text="")
+            show_page(state["page"])
+            self.log_message(f"Transcript updated ({count} changed): {transcript_file}")
+        def close():
+            if edits and not messagebox.askyesno("Edit Transcript", "Discard unsaved changes?", parent=win):
+                return
             win.destroy()
-            self.log_message("Transcript updated.")
-        tk.Button(win, text="Save", command=save_changes).pack()
-        # Word-level editing
-        word_frame = tk.Frame(win)
-        word_frame.pack()
-        word_var = tk.StringVar(value=" ".join([w["text"] if isinstance(w, dict) else w for w in words]))
-        word_entry = tk.Entry(word_frame, textvariable=word_var, width=80)
-        word_entry.pack(side="left")
-        def add_word():
-            word = simpledialog.askstring("Add Word", "Enter word to add:")
-            if word:
-                words.append({"text": word})
-                word_var.set(" ".join([w["text"] if isinstance(w, dict) else w for w in words]))
-        def remove_word():
-            word = simpledialog.askstring("Remove Word", "Enter word to remove:")
-            for w in words:
-                if (isinstance(w, dict) and w["text"] == word) or w == word:
-                    words.remove(w)
-                    break
-            word_var.set(" ".join([w["text"] if isinstance(w, dict) else w for w in words]))
-        #tk.Button(word_frame, text=CFG["add_word"], command=add_word).pack(side="left")
-        #tk.Button(word_frame, text=CFG["remove_word"], command=remove_word).pack(side="left")
+
+        tk.Button(nav, text="<", command=lambda: show_page(state["page"] - 1)).pack(side="left")
+        page_label.pack(side="left")
+        tk.Button(nav, text=">", command=lambda: show_page(state["page"] + 1)).pack(side="left")
+        tk.Entry(nav, textvariable=time_var, width=8).pack(side="left")
+        tk.Button(nav, text=CFG["go_to_time"], command=go_to_time).pack(side="left")
+        tk.Button(nav, text=CFG["save_transcript"], command=save_changes).pack(side="right")
+        changes_label.pack(side="right")
+        sentence_table.bind("<<TreeviewSelect>>", show_words)
+        sentence_table.bind("<Double-1>", lambda e: edit_row(sentence_table, "sentences"))
+        word_table.bind("<Double-1>", lambda e: edit_row(word_table, "words"))
+        win.protocol("WM_DELETE_WINDOW", close)
+        show_page(0)
 
     def select_blender_executable(self):
         initial_dir = os.path.dirname(self.blender_path)
@@ -215,13 +411,6 @@ class App:
             self.blender_path_var.set(path)
             self.log_message(f"Blender executable set to: {path}")
 
-    # render in blender to output mp4 file
-    def render_blender_project(self, blend_file, out_path):
-        blender_script = os.path.join(os.path.dirname(__file__), "render_video.py")
-        subprocess.run([
-            self.blender_path, "-b", blend_file, "--python", blender_script, "--", out_path
-        ], check=True)
-
     def select_blender_project(self):
         blend_file = filedialog.askopenfilename(filetypes=[("Blender Files", "*.blend")], initialdir=self.output_folder)
         if blend_file:
@@ -254,32 +443,91 @@ class App:
         if not pos:
             return
 
-        blender_script = os.path.join(os.path.dirname(__file__), "update_text_position.py")
-        subprocess.run([
-            self.blender_path, "-b", blend_file, "--python", blender_script, "--", pos
-        ])
-        self.log_message(f"Updated text position in {blend_file} to {pos}")
+        call = text_position_call(self.blender_path, blend_file, pos)
+        self.render_queue.submit(call, blend_file, f"text position {pos}")
+        self.log_message(f"Queued text position update to {pos} for {blend_file}")
 
     def reset_text_position(self):
         blend_file = filedialog.askopenfilename(filetypes=[("Blender Files", "*.blend")], initialdir=self.output_folder)
         if not blend_file:
             return
-        blender_script = os.path.join(os.path.dirname(__file__), "reset_text_position.py")
-        subprocess.run([
-            self.blender_path, "-b", blend_file, "--python", blender_script
-        ])
-        self.log_message(f"Reset text position in {blend_file}")
+        call = reset_text_position_call(self.blender_path, blend_file)
+        self.render_queue.submit(call, blend_file, "reset text position")
+        self.log_message(f"Queued text position reset for {blend_file}")
 
     def render_video(self):
-       
-        blend_file = filedialog.askopenfilename(filetypes=[("Blender Files", "*.blend")], initialdir=self.output_folder)
-        if not blend_file:
+        # Queue one or more projects for rendering; they run in the background
+        blend_files = filedialog.askopenfilenames(filetypes=[("Blender Files", "*.blend")], initialdir=self.output_folder)
+        if not blend_files:
+            return
+        # render in blender to output mp4 file
+        for blend_file in blend_files:
+            out_path = render_output_path(blend_file)
+            call = render_call(self.blender_path, blend_file, out_path)
+            self.render_queue.submit(call, blend_file, f"render {os.path.basename(out_path)}")
+            self.log_message(f"Queued render of {blend_file}")
+        self.show_render_queue()
+
+    def on_render_change(self, job):
+        # Called from the queue's threads; report each finished job once, on the Tk thread
+        if job.status not in FINISHED or job.id in self.reported_jobs:
+            return
+        self.reported_jobs.add(job.id)
+        message = f"{job.task} of {job.blend_file}: {job.status}"
+        if job.error:
+            message += f" ({job.error})"
+        self.root.after(0, lambda: self.log_message(message))
+
+    def show_render_queue(self):
+        # Window listing every render and edit with progress and ETA, refreshed while it is open
+        if self.render_table is not None and self.render_table.winfo_exists():
+            self.render_table.winfo_toplevel().lift()
+            return
+        win = tk.Toplevel(self.root)
+        win.title(CFG["render_queue"])
+        table = ttk.Treeview(win, columns=("task", "status", "progress", "eta"), height=10)
+        table.heading("#0", text="Project")
+        table.heading("task", text="Task")
+        table.heading("status", text="Status")
+        table.heading("progress", text="Progress")
+        table.heading("eta", text="ETA")
+        for column, width in (("task", 200), ("status", 80), ("progress", 80), ("eta", 80)):
+            table.column(column, width=width)
+        table.pack(fill="both", expand=True)
+        buttons = tk.Frame(win)
+        buttons.pack(fill="x")
+        def selected():
+            return [int(iid) for iid in table.selection()]
+        def cancel():
+            for job_id in selected():
+                self.render_queue.cancel(job_id)
+        def move(steps):
+            for job_id in selected():
+                self.render_queue.move(job_id, steps)
+        tk.Button(buttons, text=CFG["cancel_job"], command=cancel).pack(side="left")
+        tk.Button(buttons, text=CFG["move_up"], command=lambda: move(-1)).pack(side="left")
+        tk.Button(buttons, text=CFG["move_down"], command=lambda: move(1)).pack(side="left")
+        self.render_table = table
+        self.refresh_render_queue()
+
+    def refresh_render_queue(self):
+        table = self.render_table
+        if table is None or not table.winfo_exists():
+            self.render_table = None
             return
-        base_name = os.path.splitext(os.path.basename(blend_file))[0]
-        out_path = os.path.join(self.output_folder, f"/{base_name}_bps.mp4")
-        self.log_message(f"base_name={base_name} Rendering video: {out_path} Will notify, when complete!!! please wait...")
-        self.render_blender_project(blend_file, out_path)
-        self.log_message(f"Rendered video: {out_path}")
+        jobs = self.render_queue.jobs()
+        for iid in set(table.get_children()) - {str(job.id) for job in jobs}:
+            table.delete(iid)
+        for index, job in enumerate(jobs):
+            progress = job.progress()
+            values = (job.task, job.status, "" if progress is None else f"{progress:.0%}", format_eta(job.eta()))
+            iid = str(job.id)
+            if table.exists(iid):
+                table.item(iid, values=values)
+                table.move(iid, "", index)
+            else:
+                table.insert("", index, iid=iid, text=os.path.basename(job.blend_file), values=values)
+        self.root.after(RENDER_REFRESH_MS, self.refresh_render_queue)
 
 
 
@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = "manifest.json"  # kept next to the outputs, one per video
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def fingerprint(path, known=()):
+    # known: earlier fingerprints; one of the same file with the same size and mtime saves hashing it again
+    st = os.stat(path)
+    path = os.path.abspath(path)
+    for other in known:
+        if other["path"] == path and other["size"] == st.st_size and other["mtime_ns"] == st.st_mtime_ns:
+            return dict(other)
+    return {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+class BuildManifest:
+    """Remembers which inputs every build step of one video was last run with.
+
+    A step is up to date, like a make target, when its outputs exist and its
+    inputs and settings are the same as when it was recorded. An input whose
+    size and mtime did not change counts as unchanged without reading it;
+    otherwise its content hash decides, so touching a file does not force a
+    rebuild.
+    """
+
+    def __init__(self, out_dir):
+        self.path = os.path.join(out_dir, MANIFEST_NAME)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.steps = json.load(f).get("steps", {})
+        except (FileNotFoundError, ValueError):
+            self.steps = {}
+
+    def _same_file(self, path, recorded):
+        if recorded is None or recorded["path"] != os.path.abspath(path) or not os.path.exists(path):
+            return False
+        st = os.stat(path)
+        if st.st_size == recorded["size"] and st.st_mtime_ns == recorded["mtime_ns"]:
+            return True
+        if st.st_size != recorded["size"] or file_sha256(path) != recorded["sha256"]:
+            return False
+        recorded["mtime_ns"] = st.st_mtime_ns  # touched but unchanged, no need to hash it again
+        self.save()
+        return True
+
+    def changed_inputs(self, step, inputs, settings=None):
+        # Names of the inputs that differ from the recorded run, or None when the step was
+        # never recorded or ran with other settings or inputs, so nothing of it can be reused
+        entry = self.steps.get(step)
+        if entry is None or entry.get("settings") != json.loads(json.dumps(settings or {})):
+            return None
+        if set(entry["inputs"]) != set(inputs):
+            return None
+        return {name for name, path in inputs.items() if not self._same_file(path, entry["inputs"][name])}
+
+    def is_current(self, step, inputs, settings=None, outputs=()):
+        # inputs: name -> path, settings: anything JSON serializable, outputs: paths that must exist
+        if not all(os.path.exists(p) for p in outputs):
+            return False
+        return self.changed_inputs(step, inputs, settings) == set()
+
+    def forget(self, step):
+        # Call before a step starts overwriting its outputs, so a failure leaves it out of date
+        if self.steps.pop(step, None) is not None:
+            self.save()
+
+    def record(self, step, inputs, settings=None):
+        # Call after the step succeeded
+        known = [f for entry in self.steps.values() for f in entry["inputs"].values()]
+        self.steps[step] = {
+            "inputs": {name: fingerprint(path, known) for name, path in inputs.items()},
+            "settings": json.loads(json.dumps(settings or {}))
+        }
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"steps": self.steps}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+
+_STOP = object()  # tells a stage worker there is nothing more to come
+
+
+class Stage:
+    """One step of a Pipeline.
+
+    fn(key, value) gets the key of the item and what the previous stage
+    returned (the item itself for the first stage); its return value goes
+    to the next stage. Items wait in a queue of at most queue_size in front
+    of the stage, so a slow stage holds back the ones before it.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size or self.workers)
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, start, ok=True):
+        end = time.monotonic()
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            self.busy_seconds += end - start
+            self.first_start = start if self.first_start is None else min(self.first_start, start)
+            self.last_end = end
+
+    def stats(self):
+        # Throughput over the time the stage was active, and how busy its workers were
+        with self._lock:
+            wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "done": self.done,
+                "failed": self.failed,
+                "seconds": round(wall, 1),
+                "items_per_minute": round(60.0 * self.done / wall, 2) if wall > 0 else 0.0,
+                "utilization": round(self.busy_seconds / (wall * self.workers), 2) if wall > 0 else 0.0
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"{s['stage']}: {s['done']} done, {s['failed']} failed in {s['seconds']}s "
+                f"({s['items_per_minute']}/min, {s['workers']} workers {s['utilization']:.0%} busy)")
+
+
+class Pipeline:
+    """Runs items through stages, each with its own worker threads.
+
+    While one stage works on item N, the stage before it can already work
+    on N+1. on_status(key, stage_name, state, detail) is called with state
+    "queued", "running", "done" (after the last stage) or "failed", with
+    the error as detail. A failed item is recorded in failures as
+    (key, stage_name, error) and dropped; the others go on.
+    """
+
+    def __init__(self, stages, on_status=None):
+        self.stages = stages
+        self.on_status = on_status
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def _status(self, key, stage, state, detail=""):
+        if self.on_status:
+            self.on_status(key, stage, state, detail)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                return
+            key, value = item
+            self._status(key, stage.name, "running")
+            start = time.monotonic()
+            try:
+                value = stage.fn(key, value)
+            except Exception as e:
+                stage.record(start, ok=False)
+                with self._lock:
+                    self.failures.append((key, stage.name, str(e)))
+                self._status(key, stage.name, "failed", str(e))
+                continue
+            stage.record(start)
+            if following is None:
+                self._status(key, stage.name, "done")
+            else:
+                self._status(key, following.name, "queued")
+                following.queue.put((key, value))  # blocks while the next stage is full
+
+    def run(self, keys):
+        # Blocks until every item has gone through or failed; returns the failures
+        threads = []
+        for index, stage in enumerate(self.stages):
+            workers = [threading.Thread(target=self._work, args=(index,), daemon=True) for _ in range(stage.workers)]
+            for t in workers:
+                t.start()
+            threads.append(workers)
+        first = self.stages[0]
+        for key in keys:
+            self._status(key, first.name, "queued")
+            first.queue.put((key, key))
+        # Stop the stages front to back, so each one has drained before the next is told to stop
+        for stage, workers in zip(self.stages, threads):
+            for _ in workers:
+                stage.queue.put(_STOP)
+            for t in workers:
+                t.join()
+        return self.failures
+
+    def report(self):
+        return [stage.report() for stage in self.stages]
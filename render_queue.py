@@ -0,0 +1,196 @@
+import re
+import time
+import itertools
+import threading
+from blender_pool import BlenderJobError, run_process
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+HISTORY = 100  # finished jobs kept for display
+
+# render_video.py prints the frame range first; Blender then reports every frame it renders
+RANGE_RE = re.compile(r"^RENDER_RANGE (\d+) (\d+)")
+FRAME_RE = re.compile(r"^(?:Fra:|Append frame )(\d+)")
+
+
+class RenderJob:
+    """One Blender run in the queue, with its progress parsed from Blender's output."""
+
+    def __init__(self, job_id, command, blend_file, task):
+        self.id = job_id
+        self.command = command
+        self.blend_file = blend_file
+        self.task = task
+        self.status = QUEUED
+        self.error = None
+        self.first_frame = None
+        self.last_frame = None
+        self.frame = None
+        self.started = None
+        self.first_frame_at = None  # when the first frame was seen, for the ETA
+        self.finished = None
+        self.process = None
+
+    def parse_line(self, line):
+        match = RANGE_RE.match(line)
+        if match:
+            self.first_frame, self.last_frame = int(match.group(1)), int(match.group(2))
+            return
+        match = FRAME_RE.match(line)
+        if match:
+            self.frame = int(match.group(1))
+            if self.first_frame_at is None:
+                self.first_frame_at = time.monotonic()
+
+    def frames_done(self):
+        if self.frame is None or self.first_frame is None:
+            return 0
+        return max(0, self.frame - self.first_frame + 1)
+
+    def progress(self):
+        # 0..1, or None while the frame range is unknown (e.g. text position edits)
+        if self.status == DONE:
+            return 1.0
+        if self.first_frame is None or self.last_frame is None:
+            return None
+        total = self.last_frame - self.first_frame + 1
+        return min(1.0, self.frames_done() / total) if total > 0 else None
+
+    def eta(self):
+        # Seconds left, from the speed since the first frame
+        done = self.frames_done()
+        if self.status != RUNNING or done < 2 or self.last_frame is None:
+            return None
+        rate = (done - 1) / max(1e-6, time.monotonic() - self.first_frame_at)
+        return (self.last_frame - self.frame) / rate if rate > 0 else None
+
+
+class RenderQueue:
+    """Runs Blender jobs in background processes, at most `parallel` at a time.
+
+    Queued jobs start in list order, which move() changes. A job never starts
+    while another job on the same .blend file is running, so edits and renders
+    of one project happen one after the other. on_change(job) is called from
+    the worker threads whenever a job changes.
+
+    A job's command is either a command line, run in a process of its own,
+    or anything run_call(command, on_line, on_process) can run, such as
+    core.run_blender with a BlenderCall.
+    """
+
+    def __init__(self, parallel=1, on_change=None, run_call=None):
+        self.parallel = max(1, parallel)
+        self.on_change = on_change
+        self.run_call = run_call
+        self.queued = []
+        self.running = []
+        self.finished = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, command, blend_file, task):
+        job = RenderJob(next(self._ids), command, blend_file, task)
+        with self._lock:
+            self.queued.append(job)
+        self._changed(job)
+        self._start_ready()
+        return job
+
+    def jobs(self):
+        # Running first, then queued in the order they will start, then finished
+        with self._lock:
+            return self.running + self.queued + self.finished
+
+    def get(self, job_id):
+        return next((job for job in self.jobs() if job.id == job_id), None)
+
+    def move(self, job_id, steps):
+        # Move a queued job earlier (negative steps) or later in the queue
+        with self._lock:
+            job = next((j for j in self.queued if j.id == job_id), None)
+            if job is None:
+                return False
+            index = self.queued.index(job)
+            self.queued.remove(job)
+            self.queued.insert(max(0, min(len(self.queued), index + steps)), job)
+        self._changed(job)
+        return True
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = next((j for j in self.queued + self.running if j.id == job_id), None)
+            if job is None:
+                return False
+            if job in self.queued:
+                self.queued.remove(job)
+                self._finish(job, CANCELLED)
+            else:
+                job.status = CANCELLED  # the worker sees this when the process exits
+                # Under the lock: a pooled process is unbound from the job before it runs another one
+                if job.process is not None and job.process.poll() is None:
+                    job.process.terminate()
+        self._changed(job)
+        self._start_ready()
+        return True
+
+    def _finish(self, job, status, error=None):
+        # Caller holds the lock
+        job.status = status
+        job.error = error
+        job.finished = time.monotonic()
+        if job in self.running:
+            self.running.remove(job)
+        self.finished.insert(0, job)
+        del self.finished[HISTORY:]
+
+    def _start_ready(self):
+        started = []
+        with self._lock:
+            busy = {job.blend_file for job in self.running}
+            for job in list(self.queued):
+                if len(self.running) >= self.parallel:
+                    break
+                if job.blend_file in busy:
+                    continue
+                self.queued.remove(job)
+                self.running.append(job)
+                busy.add(job.blend_file)
+                job.status = RUNNING
+                job.started = time.monotonic()
+                started.append(job)
+        for job in started:
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        self._changed(job)
+        def on_line(line):
+            job.parse_line(line)
+            self._changed(job)
+        def on_process(process):
+            with self._lock:
+                job.process = process
+                if process is not None and job.status == CANCELLED:  # cancelled while starting
+                    process.terminate()
+        error = None
+        try:
+            if isinstance(job.command, list):
+                run_process(job.command, on_line, on_process)
+            else:
+                self.run_call(job.command, on_line, on_process)
+        except (OSError, BlenderJobError) as e:
+            error = str(e)
+        with self._lock:
+            if job.status == CANCELLED:
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, FAILED if error else DONE, error)
+        self._changed(job)
+        self._start_ready()
+
+    def _changed(self, job):
+        if self.on_change:
+            self.on_change(job)
@@ -44,6 +44,8 @@ else:
 # Set output file path
 scene.render.filepath = filesave_path
 print(f"output path= {filesave_path}")
+# Frame range for the GUI's render queue, which follows the "Fra:" lines to show progress
+print(f"RENDER_RANGE {scene.frame_start} {scene.frame_end}", flush=True)
 
 # Render animation (video + audio)
 bpy.ops.render.render(animation=True)
\ No newline at end of file
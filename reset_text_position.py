@@ -1,6 +1,23 @@
 import bpy
+import os
+import sys
+import argparse
 
-for strip in bpy.context.scene.sequence_editor.sequences_all:
+# strip_registry.py lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from strip_registry import registered_strips, parse_roles, ROLES, TEXT_ROLES
+
+argv = sys.argv
+argv = argv[argv.index("--") + 1:] if "--" in argv else []
+parser = argparse.ArgumentParser(prog="reset_text_position.py")
+parser.add_argument("--roles", default=",".join(TEXT_ROLES), help=f"comma separated, of {', '.join(ROLES)}")
+args = parser.parse_args(argv)
+try:
+    roles = parse_roles(args.roles)
+except ValueError as e:
+    parser.error(str(e))
+
+for strip in registered_strips(bpy.context.scene, roles):
     if strip.type == 'TEXT':
         strip.location[1] = 0.9  # Default to top
 bpy.ops.wm.save_mainfile()
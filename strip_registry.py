@@ -0,0 +1,80 @@
+import json
+import bisect
+
+# Runs inside Blender, next to the scripts that import it; it only uses the scene it is given
+REGISTRY_PROPERTY = "vse_strip_registry"  # scene custom property, JSON since ID properties cannot hold lists of strings
+SENTENCE = "sentence"
+WORD = "word"
+BACKGROUND = "background"
+ROLES = (SENTENCE, WORD, BACKGROUND)
+TEXT_ROLES = (SENTENCE, WORD)
+
+
+def parse_roles(value):
+    # "sentence,word" from the scripts' --roles as a list, ValueError naming unknown roles
+    roles = [role.strip() for role in value.split(",") if role.strip()]
+    unknown = [role for role in roles if role not in ROLES]
+    if unknown:
+        raise ValueError(f"Unknown role {', '.join(unknown)}, expected {', '.join(ROLES)}")
+    return roles
+
+
+def save_registry(scene, strips_by_role):
+    """Record the names of the subtitle strips in the scene, by role and sorted by start frame.
+
+    strips_by_role maps a role to its strips. Strips that are not in the
+    registry (titles added by hand, for example) are left alone by
+    everything that looks strips up through it.
+    """
+    registry = {}
+    for role in ROLES:
+        entries = sorted((s.frame_final_start, s.frame_final_end, s.name) for s in strips_by_role.get(role, ()))
+        registry[role] = {
+            "starts": [start for start, _, _ in entries],
+            "ends": [end for _, end, _ in entries],
+            "names": [name for _, _, name in entries],
+            "longest": max((end - start for start, end, _ in entries), default=0)
+        }
+    scene[REGISTRY_PROPERTY] = json.dumps(registry)
+
+
+def load_registry(scene):
+    # None for projects built before the registry existed
+    value = scene.get(REGISTRY_PROPERTY)
+    return json.loads(value) if value else None
+
+
+def registered_strips(scene, roles, start_frame=None, end_frame=None):
+    """The strips of the roles, only those overlapping [start_frame, end_frame) when given.
+
+    The time window is found by bisecting the start frames instead of
+    looking at every strip. Projects without a registry get every TEXT
+    strip for the text roles and every TRANSFORM strip for the background,
+    which is what the scripts used to change.
+    """
+    unknown = [role for role in roles if role not in ROLES]
+    if unknown:
+        raise ValueError(f"Unknown role {', '.join(unknown)}, expected {', '.join(ROLES)}")
+    strips = scene.sequence_editor.sequences_all
+    registry = load_registry(scene)
+    if registry is None:
+        types = {"TRANSFORM" if role == BACKGROUND else "TEXT" for role in roles}
+        return [s for s in strips if s.type in types
+                and (start_frame is None or s.frame_final_end > start_frame)
+                and (end_frame is None or s.frame_final_start < end_frame)]
+    found = []
+    for role in roles:
+        entry = registry[role]
+        first, last = 0, len(entry["names"])
+        if end_frame is not None:
+            last = bisect.bisect_left(entry["starts"], end_frame)
+        if start_frame is not None:
+            # No strip is longer than "longest", so none starting earlier can reach into the window
+            first = bisect.bisect_left(entry["starts"], start_frame - entry["longest"])
+        for i in range(first, last):
+            if start_frame is not None and entry["ends"][i] <= start_frame:
+                continue
+            strip = strips.get(entry["names"][i])
+            if strip is not None:  # removed or renamed by hand since
+                found.append(strip)
+    return found
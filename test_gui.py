@@ -1,5 +1,20 @@
 import unittest
 import os
+import sys
+import time
+import json
+import tempfile
+import threading
+from unittest import mock
+import core
+import cli
+from pipeline import Pipeline, Stage
+from manifest import BuildManifest
+from render_queue import RenderQueue, DONE, FAILED, FINISHED
+from watcher import FolderWatcher, SeenRecord
+from types import SimpleNamespace
+from blender_pool import BlenderPool, BlenderJobError
+import strip_registry
 
 class TestFolders(unittest.TestCase):
     def test_source_folder_exists(self):
@@ -7,5 +22,368 @@ class TestFolders(unittest.TestCase):
     def test_output_folder_exists(self):
         self.assertTrue(os.path.exists("output"))
 
+class TestTranscriptRange(unittest.TestCase):
+    def setUp(self):
+        self.transcript = {
+            "resolution": {"name": "youtube", "width": 1920, "height": 1080, "fps": 30},
+            "sentences": [
+                {"text": " One.", "start": 0.0, "end": 2.0},
+                {"text": " Two tw.", "start": 2.0, "end": 4.0},
+                {"text": " Three.", "start": 4.0, "end": 6.0}
+            ],
+            "words": [
+                {"text": " One.", "start": 0.0, "end": 2.0},
+                {"text": " Two", "start": 2.0, "end": 3.0},
+                {"text": " tw.", "start": 3.0, "end": 4.0},
+                {"text": " Three.", "start": 4.0, "end": 6.0}
+            ]
+        }
+
+    def test_range_expands_to_whole_sentences(self):
+        self.assertEqual(core.expand_range_to_sentences(self.transcript, 2.5, 3.5), (2.0, 4.0))
+
+    def test_merge_replaces_only_overlapping_records(self):
+        partial = {
+            "sentences": [{"text": " Two too.", "start": 2.0, "end": 4.0}],
+            "words": [{"text": " Two", "start": 2.0, "end": 3.0}, {"text": " too.", "start": 3.0, "end": 4.0}]
+        }
+        merged = core.merge_transcript_range(self.transcript, partial, 2.0, 4.0)
+        self.assertEqual([s["text"] for s in merged["sentences"]], [" One.", " Two too.", " Three."])
+        self.assertEqual([w["text"] for w in merged["words"]], [" One.", " Two", " too.", " Three."])
+        self.assertEqual(merged["resolution"], self.transcript["resolution"])
+
+class FakeStream:
+    # What post_video returns for a streamed transcription: NDJSON lines
+    def __init__(self, events):
+        self.lines = [json.dumps(event).encode() for event in events]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+class TestTranscriptStream(unittest.TestCase):
+    events = [
+        {"type": "resolution", "resolution": {"fps": 30}, "media": None},
+        {"type": "sentence", "sentence": {"text": " One.", "start": 0.0, "end": 1.0},
+         "words": [{"text": " One.", "start": 0.0, "end": 1.0}]},
+        {"type": "sentence", "sentence": {"text": " Two three.", "start": 1.0, "end": 2.0},
+         "words": {"text": [" Two", " three."], "start": [1.0, 1.5], "end": [1.5, 2.0]}}  # columnar
+    ]
+
+    def test_summary_completes_the_transcript(self):
+        summary = {"type": "summary", "status": "done", "sentences": 2, "words": 3}
+        with tempfile.TemporaryDirectory() as folder, \
+                mock.patch.object(core, "post_video", return_value=FakeStream(self.events + [summary])):
+            transcript = core.stream_transcript_api("clip.mp4", "http://api/", folder, "clip")
+            self.assertNotIn("partial", transcript)
+            self.assertEqual(len(transcript["sentences"]), 2)
+            self.assertEqual(transcript["words"][2], {"text": " three.", "start": 1.5, "end": 2.0})
+
+    def test_stream_without_summary_fails_and_stays_partial(self):
+        summary = {"type": "summary", "status": "done", "sentences": 2, "words": 3}
+        with tempfile.TemporaryDirectory() as folder:
+            video = os.path.join(folder, "clip.mp4")
+            with open(video, "wb") as f:
+                f.write(b"video")
+            with mock.patch.object(core, "post_video", return_value=FakeStream(self.events + [summary])):
+                core.transcribe_step(video, "http://api/", folder, "clip")  # an earlier successful run
+            with mock.patch.object(core, "post_video", return_value=FakeStream(self.events)):
+                with self.assertRaisesRegex(RuntimeError, "without a summary"):
+                    core.transcribe_step(video, "http://api/", folder, "clip", force=True)
+            with open(os.path.join(folder, "clip", "transcript.txt")) as f:
+                self.assertTrue(json.load(f)["partial"])
+            self.assertIsNone(BuildManifest(os.path.join(folder, "clip")).steps.get("transcribe"))
+            with mock.patch.object(core, "post_video", return_value=FakeStream(self.events + [summary])) as post:
+                _, called = core.transcribe_step(video, "http://api/", folder, "clip")
+            self.assertTrue(called and post.called)  # the partial transcript is not reused
+
+class TestBatchSummary(unittest.TestCase):
+    def test_summary_lists_failures(self):
+        summary = core.batch_summary(3, [("b.mp4", "build", "Blender exited with 1")])
+        self.assertEqual(summary.split("\n"), [
+            "2 of 3 videos processed, 1 failed.",
+            "b.mp4 (build): Blender exited with 1"
+        ])
+
+class TestPipeline(unittest.TestCase):
+    def test_items_flow_through_and_failures_are_collected(self):
+        built = []
+        def transcribe(video, _):
+            if video == "bad.mp4":
+                raise RuntimeError("API down")
+            return video + ".txt"
+        def build(video, transcript):
+            built.append(transcript)
+        pipeline = Pipeline([Stage("transcribe", transcribe), Stage("build", build)])
+        failures = pipeline.run(["a.mp4", "bad.mp4", "b.mp4", "c.mp4"])
+        self.assertEqual(sorted(built), ["a.mp4.txt", "b.mp4.txt", "c.mp4.txt"])
+        self.assertEqual(failures, [("bad.mp4", "transcribe", "API down")])
+        self.assertEqual([s["done"] for s in map(Stage.stats, pipeline.stages)], [3, 3])
+
+class TestMultipartUpload(unittest.TestCase):
+    def test_body_streams_files_with_progress(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "clip.mp4")
+            with open(path, "wb") as f:
+                f.write(b"x" * 3000)
+            progress = []
+            body = core.MultipartUpload([("file", path)], lambda sent, total: progress.append((sent, total)))
+            data = b"".join(iter(lambda: body.read(1000), b""))
+            body.rewind()
+            self.assertEqual(body.read(), data)
+            body.close()
+        self.assertEqual(len(data), len(body))
+        self.assertIn(b'name="file"; filename="clip.mp4"\r\n', data)
+        self.assertIn(b"\r\n\r\n" + b"x" * 3000 + b"\r\n--" + body.boundary.encode() + b"--\r\n", data)
+        self.assertEqual(progress[-1], (len(body), len(body)))
+
+class TestResumableUpload(unittest.TestCase):
+    def test_chunk_is_sent_again_while_the_api_is_busy(self):
+        created = SimpleNamespace(status_code=201, raise_for_status=lambda: None, json=lambda: {"upload_id": "u1"})
+        busy = SimpleNamespace(status_code=429, headers={"Retry-After": "3"}, close=lambda: None)
+        stored = SimpleNamespace(status_code=204, raise_for_status=lambda: None, json=lambda: {"offset": 10})
+        with tempfile.TemporaryDirectory() as folder, \
+                mock.patch.object(core, "request_with_retry", return_value=created), \
+                mock.patch.object(core.SESSION, "patch", side_effect=[busy, stored]) as patch, \
+                mock.patch.object(core.time, "sleep") as sleep:
+            path = os.path.join(folder, "clip.mp4")
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+            self.assertEqual(core.resumable_upload("http://api/transcribe/", path), "u1")
+        self.assertEqual(patch.call_count, 2)
+        sleep.assert_called_once_with(3.0)
+
+class TestBuildManifest(unittest.TestCase):
+    def test_step_reruns_only_when_inputs_change(self):
+        with tempfile.TemporaryDirectory() as folder:
+            video = os.path.join(folder, "clip.mp4")
+            blend = os.path.join(folder, "clip.blend")
+            for path in (video, blend):
+                with open(path, "wb") as f:
+                    f.write(b"data")
+            manifest = BuildManifest(folder)
+            inputs = {"video": video}
+            self.assertFalse(manifest.is_current("build", inputs, {"blender": "a"}, [blend]))
+            manifest.record("build", inputs, {"blender": "a"})
+            self.assertTrue(BuildManifest(folder).is_current("build", inputs, {"blender": "a"}, [blend]))
+            self.assertFalse(manifest.is_current("build", inputs, {"blender": "b"}, [blend]))
+            os.utime(video, ns=(1, 1))  # touched, same content
+            self.assertTrue(manifest.is_current("build", inputs, {"blender": "a"}, [blend]))
+            with open(video, "wb") as f:
+                f.write(b"other")
+            self.assertFalse(manifest.is_current("build", inputs, {"blender": "a"}, [blend]))
+            os.remove(blend)
+            manifest.record("build", inputs, {"blender": "a"})
+            self.assertFalse(manifest.is_current("build", inputs, {"blender": "a"}, [blend]))
+
+    def test_changed_inputs_names_what_differs(self):
+        with tempfile.TemporaryDirectory() as folder:
+            paths = {name: os.path.join(folder, name) for name in ("video", "transcript")}
+            for path in paths.values():
+                with open(path, "wb") as f:
+                    f.write(b"data")
+            manifest = BuildManifest(folder)
+            self.assertIsNone(manifest.changed_inputs("build", paths))
+            manifest.record("build", paths)
+            self.assertEqual(manifest.changed_inputs("build", paths), set())
+            with open(paths["transcript"], "wb") as f:
+                f.write(b"edited")
+            self.assertEqual(manifest.changed_inputs("build", paths), {"transcript"})
+            self.assertIsNone(manifest.changed_inputs("build", paths, {"blender": "b"}))
+
+    def test_transcription_reruns_for_another_api(self):
+        def stream(video_path, api_url, out_folder, base_name, **callbacks):
+            os.makedirs(os.path.join(out_folder, base_name), exist_ok=True)
+            with open(os.path.join(out_folder, base_name, "transcript.txt"), "w") as f:
+                json.dump({"api": api_url}, f)
+            return {"api": api_url}
+        with tempfile.TemporaryDirectory() as folder, mock.patch.object(core, "stream_transcript_api", side_effect=stream):
+            video = os.path.join(folder, "clip.mp4")
+            with open(video, "wb") as f:
+                f.write(b"data")
+            self.assertTrue(core.transcribe_step(video, "http://a/", folder, "clip")[1])
+            self.assertFalse(core.transcribe_step(video, "http://a/", folder, "clip")[1])
+            self.assertTrue(core.transcribe_step(video, "http://b/", folder, "clip")[1])
+
+class TestTranscriptEdits(unittest.TestCase):
+    def test_edits_keep_timing_and_other_records(self):
+        transcript = {
+            "sentences": [{"text": " Hello there.", "start": 0.0, "end": 1.0}, {"text": " Bye.", "start": 1.0, "end": 2.0}],
+            "words": [{"text": " Hello", "start": 0.0, "end": 0.5}, {"text": " there.", "start": 0.5, "end": 1.0},
+                      {"text": " Bye.", "start": 1.0, "end": 2.0}]
+        }
+        self.assertEqual(core.sentence_word_ranges(transcript), [(0, 2), (2, 3)])
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "clip.txt")
+            core.write_json_atomic(path, transcript)
+            edits = {("sentences", 1): {"record": transcript["sentences"][1], "text": "Goodbye."}}
+            # A sentence was inserted before it since the editor loaded the file
+            shifted = dict(transcript, sentences=[{"text": " Hi.", "start": 0.0, "end": 0.2}] + transcript["sentences"])
+            core.write_json_atomic(path, shifted)
+            result = core.apply_transcript_edits(path, edits)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual(json.load(f), result)
+            self.assertEqual(result["sentences"][2], {"text": "Goodbye.", "start": 1.0, "end": 2.0})
+            self.assertEqual(result["sentences"][:2], shifted["sentences"][:2])
+            self.assertEqual(result["words"], transcript["words"])
+            gone = {("words", 5): {"record": {"text": "x", "start": 9.0, "end": 9.5}, "text": "y"}}
+            self.assertRaises(ValueError, core.apply_transcript_edits, path, gone)
+
+class TestRenderQueue(unittest.TestCase):
+    def test_progress_is_parsed_and_failures_reported(self):
+        render = "print('RENDER_RANGE 1 4')\nfor i in range(1, 5): print(f'Fra:{i} Mem:10M')"
+        queue = RenderQueue(parallel=2)
+        ok = queue.submit([sys.executable, "-c", render], "a.blend", "render")
+        bad = queue.submit([sys.executable, "-c", "raise SystemExit(2)"], "b.blend", "render")
+        deadline = time.monotonic() + 10
+        while not (ok.status in FINISHED and bad.status in FINISHED) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual((ok.status, ok.frame, ok.progress()), (DONE, 4, 1.0))
+        self.assertEqual(bad.status, FAILED)
+        self.assertIn("exited with 2", bad.error)
+
+class TestFolderWatcher(unittest.TestCase):
+    def test_new_videos_are_yielded_once(self):
+        with tempfile.TemporaryDirectory() as folder:
+            os.makedirs(os.path.join(folder, "sub"))
+            for name in ("a.mp4", os.path.join("sub", "B.MOV"), "notes.txt"):
+                with open(os.path.join(folder, name), "wb") as f:
+                    f.write(b"data")
+            seen_path = os.path.join(folder, "seen.json")
+            def watch():
+                watcher = FolderWatcher([folder], SeenRecord(seen_path), stable_seconds=0.1, poll_seconds=0.05,
+                                        use_inotify=False)
+                stop = threading.Event()
+                threading.Timer(0.5, stop.set).start()
+                found = []
+                for path in watcher.videos(stop):
+                    found.append(os.path.relpath(path, folder))
+                    watcher.finished(path, "done")
+                return found
+            self.assertEqual(sorted(watch()), ["a.mp4", os.path.join("sub", "B.MOV")])
+            self.assertEqual(watch(), [])  # remembered across restarts
+            with open(os.path.join(folder, "a.mp4"), "wb") as f:
+                f.write(b"replaced")
+            self.assertEqual(watch(), ["a.mp4"])
+
+class TestStripRegistry(unittest.TestCase):
+    def test_roles_and_time_window(self):
+        class Strips(list):
+            def get(self, name):
+                return next((s for s in self if s.name == name), None)
+        def strip(name, kind, start, end):
+            return SimpleNamespace(name=name, type=kind, frame_final_start=start, frame_final_end=end)
+        sentences = [strip("TXT_0", "TEXT", 0, 100), strip("TXT_100", "TEXT", 100, 130), strip("TXT_130", "TEXT", 130, 200)]
+        words = [strip("TXT_0.001", "TEXT", 0, 10)]
+        title = strip("Title", "TEXT", 0, 500)
+        class Scene(dict):
+            sequence_editor = SimpleNamespace(sequences_all=Strips(sentences + words + [title]))
+        scene = Scene()
+        self.assertEqual(len(strip_registry.registered_strips(scene, ["sentence"])), 5)  # no registry yet: every TEXT strip
+        strip_registry.save_registry(scene, {"sentence": sentences, "word": words})
+        found = strip_registry.registered_strips(scene, ["sentence"], 120, 135)
+        self.assertEqual([s.name for s in found], ["TXT_100", "TXT_130"])
+        self.assertEqual([s.name for s in strip_registry.registered_strips(scene, ["word", "background"])], ["TXT_0.001"])
+        self.assertEqual(strip_registry.parse_roles("sentence, word"), ["sentence", "word"])
+        with self.assertRaisesRegex(ValueError, "Unknown role words"):
+            strip_registry.parse_roles("sentence,words")
+        with self.assertRaises(ValueError):
+            strip_registry.registered_strips(scene, ["words"])
+
+FAKE_BLENDER_WORKER = """#!{python}
+import sys, json, time
+print("Blender (fake)", flush=True)
+print("BLENDER_WORKER_RESULT " + json.dumps({{"ready": True}}), flush=True)
+for line in sys.stdin:
+    job = json.loads(line)
+    if job["args"][0] == "crash":
+        sys.exit(3)
+    if job["args"][0] == "sleep":
+        time.sleep(float(job["args"][1]))
+    print("Fra:1", flush=True)
+    print("BLENDER_WORKER_RESULT " + json.dumps({{"id": job["id"], "ok": job["args"][0] != "fail", "error": "bad"}}), flush=True)
+"""
+
+class TestBlenderPool(unittest.TestCase):
+    def test_worker_is_reused_and_restarted_after_a_crash(self):
+        with tempfile.TemporaryDirectory() as folder:
+            blender = os.path.join(folder, "blender")
+            with open(blender, "w") as f:
+                f.write(FAKE_BLENDER_WORKER.format(python=sys.executable))
+            os.chmod(blender, 0o755)
+            pool = BlenderPool(blender)
+            lines = []
+            pool.run("script.py", ["ok"], on_line=lines.append)
+            self.assertEqual(lines, ["Fra:1\n"])
+            pid = pool.idle[0][0].process.pid
+            self.assertRaises(BlenderJobError, pool.run, "script.py", ["fail"])
+            self.assertEqual(pool.idle[0][0].process.pid, pid)
+            self.assertRaises(BlenderJobError, pool.run, "script.py", ["crash"])
+            pool.run("script.py", ["ok"])
+            self.assertNotEqual(pool.idle[0][0].process.pid, pid)
+            pool.close()
+
+    def test_workers_are_capped_closed_when_idle_and_stopped_on_close(self):
+        with tempfile.TemporaryDirectory() as folder:
+            blender = os.path.join(folder, "blender")
+            with open(blender, "w") as f:
+                f.write(FAKE_BLENDER_WORKER.format(python=sys.executable))
+            os.chmod(blender, 0o755)
+            pool = BlenderPool(blender, max_workers=1, idle_seconds=0.2)
+            threads = [threading.Thread(target=pool.run, args=("script.py", ["sleep", "0.1"])) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(pool.idle), 1)  # the jobs took turns on one worker
+            process = pool.idle[0][0].process
+            time.sleep(0.5)
+            self.assertEqual(pool.idle, [])
+            self.assertIsNotNone(process.poll())
+            errors = []
+            def long_job():
+                try:
+                    pool.run("script.py", ["sleep", "30"])
+                except BlenderJobError as e:
+                    errors.append(e)
+            thread = threading.Thread(target=long_job)
+            thread.start()
+            while not pool.busy or pool.busy.copy().pop().process is None:
+                time.sleep(0.01)
+            pool.close()
+            thread.join(10)
+            self.assertEqual(len(errors), 1)
+
+class TestCli(unittest.TestCase):
+    def test_folders_expand_to_their_videos(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ("b.mp4", "a.MOV", "notes.txt"):
+                open(os.path.join(folder, name), "w").close()
+            videos = cli.expand_videos([folder, "c.mp4"])
+        self.assertEqual(videos, [os.path.join(folder, "a.MOV"), os.path.join(folder, "b.mp4"), "c.mp4"])
+
+    def test_global_options_after_the_subcommand(self):
+        args = cli.parse_args(["--output", "out", "ingest", "a.mp4", "--json", "--api-url", "http://api/"])
+        self.assertEqual((args.output, args.json, args.api_url), ("out", True, "http://api/"))
+        args = cli.parse_args(["render", "a.blend"])
+        self.assertEqual((args.output, args.json), (cli.OUTPUT_FOLDER, False))
+
+    def test_text_style_changes_only_what_is_given(self):
+        args = cli.parse_args(["text-style", "a.blend", "--hide", "--color", "1", "1", "0.5", "--roles", "word"])
+        self.assertEqual((args.visible, args.color, args.font_size, args.box), (False, [1.0, 1.0, 0.5], None, None))
+        call = core.text_style_call("blender", "a.blend", color=args.color, visible=args.visible, roles=args.roles)
+        self.assertEqual(os.path.basename(call.script), "update_text_style.py")
+        self.assertEqual(call.args, ["--color", "1.0,1.0,0.5", "--hide", "--roles", "word"])
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            cli.parse_args(["text-style", "a.blend"])  # nothing to change
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+import os
+import math
+import threading
+
+# Admission limits, override with environment variables
+MAX_CONCURRENT_UPLOADS = int(os.environ.get("TRANSCRIPT_MAX_CONCURRENT_UPLOADS", "8"))
+MAX_QUEUE = int(os.environ.get("TRANSCRIPT_MAX_QUEUE", "32"))
+# Audio seconds one worker transcribes per wall-clock second, until we have measured it
+INITIAL_SPEED = float(os.environ.get("TRANSCRIPT_INITIAL_SPEED", "1.0"))
+SPEED_SMOOTHING = 0.2  # weight of the newest measurement in the moving average
+
+# Routes that accept uploads with POST and are subject to admission control
+UPLOAD_ROUTES = ("/transcribe/", "/transcribe/batch", "/jobs/")
+RESUMABLE_UPLOADS = "/uploads/"  # PATCH /uploads/{upload_id} carries the bytes of a resumable upload
+
+
+def is_upload(method, path):
+    # Requests with video bytes in their body; POST /uploads/ only announces an upload
+    if method == "POST":
+        return path in UPLOAD_ROUTES
+    return method == "PATCH" and path.startswith(RESUMABLE_UPLOADS)
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps concurrent uploads and queued jobs, and estimates the wait.
+
+    The estimate is the audio still to be transcribed in the queue divided
+    by how fast the pool gets through audio, measured from finished jobs.
+    """
+
+    def __init__(self, jobs, max_uploads=MAX_CONCURRENT_UPLOADS, max_queue=MAX_QUEUE):
+        self.jobs = jobs
+        self.max_uploads = max_uploads
+        self.max_queue = max_queue
+        self.uploads = 0
+        self.speed = INITIAL_SPEED
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def record(self, audio_seconds, inference_seconds):
+        # Called for every finished transcription to keep the speed estimate current
+        if audio_seconds <= 0 or inference_seconds <= 0:
+            return
+        with self._lock:
+            self.speed += SPEED_SMOOTHING * (audio_seconds / inference_seconds - self.speed)
+
+    def queued_audio_seconds(self, live=False):
+        # live asks the workers how far each job got, one IPC call per job and chunk;
+        # otherwise the progress last seen is used, which never blocks
+        progress = self.jobs.progress if live else self.jobs.cached_progress
+        total = 0.0
+        for job in self.jobs.unfinished():
+            total += job.meta.get("audio_seconds", 0.0) * (1.0 - progress(job))
+        return total
+
+    def estimated_wait(self, live=False):
+        return self.queued_audio_seconds(live) / (self.speed * self.jobs.workers)
+
+    def retry_after(self):
+        return max(1, math.ceil(self.estimated_wait()))
+
+    def _refresh_progress(self):
+        # Reads the progress of every unfinished job from the workers, so the cached values
+        # behind the next retry_after are current; runs in a thread of its own
+        try:
+            for job in self.jobs.unfinished():
+                self.jobs.progress(job)
+        except (EOFError, OSError):
+            pass  # the pool is being rebuilt
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def check_queue(self, jobs=1):
+        # Raises Overloaded when queueing that many more jobs would overflow the queue
+        if self.jobs.pending() + jobs > self.max_queue:
+            raise Overloaded("Transcription queue is full.", self.retry_after())
+
+    def enter_upload(self):
+        # Raises Overloaded instead of admitting a request we cannot serve in reasonable time.
+        # Called from async middleware: nothing in here waits on the worker processes.
+        with self._lock:
+            if self.uploads >= self.max_uploads:
+                reason = "Too many concurrent uploads."
+            elif self.jobs.pending() >= self.max_queue:
+                reason = "Transcription queue is full."
+            else:
+                self.uploads += 1
+                return
+            refresh = not self._refreshing
+            self._refreshing = True
+        if refresh:
+            threading.Thread(target=self._refresh_progress, daemon=True).start()
+        raise Overloaded(reason, self.retry_after())
+
+    def admit(self, method, path):
+        # Takes an upload slot for upload requests (True, call leave_upload when done), or raises Overloaded
+        if not is_upload(method, path):
+            return False
+        self.enter_upload()
+        return True
+
+    def leave_upload(self):
+        with self._lock:
+            self.uploads -= 1
+
+    def status(self):
+        return {
+            "queue_length": self.jobs.pending(),
+            "max_queue": self.max_queue,
+            "uploads_in_progress": self.uploads,
+            "max_concurrent_uploads": self.max_uploads,
+            "workers": self.jobs.workers,
+            "queued_audio_seconds": round(self.queued_audio_seconds(live=True), 1),
+            "audio_seconds_per_worker_second": round(self.speed, 3),
+            "estimated_wait_seconds": round(self.estimated_wait(live=True), 1)
+        }
@@ -1,70 +1,635 @@
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse
-import whisper
 import os
-import tempfile
-from utils import get_video_resolution, map_to_nearest_resolution
-import ffmpeg
+import json
+import itertools
+import asyncio
+from typing import Optional
+from fastapi import FastAPI, Request, HTTPException, Query, Body, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from utils import map_to_nearest_resolution
+from ingest import MalformedUpload, UploadSizeLimit, UploadTooLarge, receive_form, receive_upload, discard, hash_file
+from resumable import ResumableUploads, UploadNotFound, OffsetMismatch, UploadIncomplete
+from cache import TranscriptCache, cache_key
+from probe import ProbeError, probe_media
+from jobs import JobManager, DONE, CANCELLED
+from chunking import LONG_MEDIA_SECONDS
+from wire import COLUMNAR_MEDIA_TYPE, StreamCompressor, encode_transcript, pick_encoding, to_columns
+from admission import AdmissionController, Overloaded
+import metrics
+from models import AVAILABLE_MODELS, DEFAULT_MODEL, UnknownModel, check_model_name
 
 
 
     
 app = FastAPI()
-model = whisper.load_model("base")  # You can use "small", "medium", or "large" for better accuracy
+TRANSCRIBE_OPTIONS = {"word_timestamps": True}
+transcript_cache = TranscriptCache()
+uploads = ResumableUploads()
+upload_claims = {}  # upload_id -> future of the (job, cache_hit) it was handed to, so retries get the same job
+jobs = JobManager()  # models are loaded inside the worker processes
+admission = AdmissionController(jobs)
+# Server-side folder that batch manifests may reference, manifests are refused when unset
+BATCH_ROOT = os.environ.get("TRANSCRIPT_BATCH_ROOT")
+
+# --- METRICS ---
+def loaded_model_counts():
+    # model name -> number of workers that have it loaded
+    counts = {}
+    for names in jobs.loaded_models().values():
+        for name in names:
+            counts[(name,)] = counts.get((name,), 0) + 1
+    return counts
+
+UPLOAD_RECEIVE_SECONDS = metrics.histogram("transcript_upload_receive_seconds", "Time spent receiving upload chunks")
+UPLOAD_WRITE_SECONDS = metrics.histogram("transcript_upload_write_seconds", "Time spent hashing and writing uploads to the temp file")
+PROBE_SECONDS = metrics.histogram("transcript_probe_seconds", "Time spent probing uploaded media")
+INFERENCE_SECONDS = metrics.histogram("transcript_inference_seconds", "Model inference time per transcription", ["model"])
+SERIALIZE_SECONDS = metrics.histogram("transcript_serialize_seconds", "Time spent serializing transcript responses")
+IN_FLIGHT = metrics.gauge("transcript_in_flight_requests", "Requests currently being handled")
+metrics.gauge("transcript_queue_depth", "Jobs queued or running", callback=lambda: jobs.pending())
+metrics.gauge("transcript_loaded_models", "Workers with the model loaded", ["model"], callback=loaded_model_counts)
+INGESTED_BYTES = metrics.counter("transcript_ingested_bytes_total", "Bytes of uploaded media received")
+AUDIO_SECONDS = metrics.counter("transcript_audio_seconds_total", "Seconds of audio transcribed", ["model"])
+REJECTED = metrics.counter("transcript_rejected_requests_total", "Uploads turned away with 429")
+
+# Reject oversize uploads while the body arrives, with or without a Content-Length
+app.add_middleware(UploadSizeLimit)
+
+def overloaded_response(e):
+    REJECTED.inc()
+    return JSONResponse({"detail": str(e), "retry_after": e.retry_after}, status_code=429,
+                        headers={"Retry-After": str(e.retry_after)})
+
+@app.middleware("http")
+async def admit_uploads(request: Request, call_next):
+    # Turn uploads away with 429 + Retry-After before reading their body when we are full
+    try:
+        if not admission.admit(request.method, request.url.path):
+            return await call_next(request)
+    except Overloaded as e:
+        return overloaded_response(e)
+    try:
+        return await call_next(request)
+    finally:
+        admission.leave_upload()
+
+@app.middleware("http")
+async def count_in_flight(request: Request, call_next):
+    IN_FLIGHT.inc()
+    try:
+        return await call_next(request)
+    finally:
+        IN_FLIGHT.dec()
+
+@app.get("/status")
+def status():
+    # Queue length and estimated wait, for clients deciding when to send more work
+    return admission.status()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Prometheus text format; real-time factor = rate(audio_seconds_total) / rate(inference_seconds_sum)
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+MODEL_QUERY = Query(None, description=f"Whisper model, one of {', '.join(AVAILABLE_MODELS)} (default {DEFAULT_MODEL})")
+START_QUERY = Query(None, ge=0, description="Only transcribe from this many seconds into the media")
+END_QUERY = Query(None, gt=0, description="Only transcribe up to this many seconds into the media")
+CHUNKED_QUERY = Query(None, description=f"Split at silences and transcribe chunks in parallel (default: for media over {LONG_MEDIA_SECONDS}s)")
+UPLOAD_ID_QUERY = Query(None, description="Transcribe a finished resumable upload (see /uploads/) instead of a file in the request")
+
+@app.on_event("startup")
+def warm_up_workers():
+    # Start the pool and load the default model in the background, startup itself stays instant
+    jobs.warm_up(DEFAULT_MODEL)
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    jobs.shutdown()
+
+def model_param(name):
+    try:
+        return check_model_name(name)
+    except UnknownModel as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the API process answers, models may still be loading
+    return {"status": "ok", "loaded_models": jobs.loaded_models()}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: the default model has finished loading in at least one worker,
+    # and the pool is not broken by a dead worker
+    loaded = jobs.loaded_models()
+    ready = not jobs.broken and any(DEFAULT_MODEL in names for names in loaded.values())
+    failed = [str(f.exception()) for f in jobs.warming if f.done() and f.exception() is not None]
+    body = {
+        "ready": ready,
+        "pool": "broken" if jobs.broken else "ok",
+        "default_model": DEFAULT_MODEL,
+        "available_models": AVAILABLE_MODELS,
+        "loaded_models": loaded,
+        "warm_up_errors": failed
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+async def start_job(upload, refresh, stream=False, model_name=DEFAULT_MODEL, chunked=None, start=None, end=None,
+                    upload_id=None, request=None):
+    """Store the upload, then answer from the cache or queue a transcription job.
+
+    The media is a finished resumable upload, a StoredUpload already on
+    disk, or the "file" field of the multipart request, read straight from
+    its stream. Returns (job, cache_hit). The temp file belongs to the job from
+    here on and is removed when it finishes.
+    """
+    if upload_id is not None:
+        claim = upload_claims.get(upload_id)
+        if claim is not None:
+            # A retry, e.g. after a read timeout: the upload is gone, but its job is not
+            return await asyncio.shield(claim)
+        prune_upload_claims()
+        claim = upload_claims[upload_id] = asyncio.get_running_loop().create_future()
+        try:
+            path = claim_upload(upload_id)
+            try:
+                sha256 = await run_in_threadpool(hash_file, path)
+            except BaseException:
+                discard(path)
+                raise
+            started = await queue_transcription(path, sha256, refresh, cleanup=lambda: discard(path), stream=stream,
+                                                model_name=model_name, chunked=chunked, start=start, end=end)
+        except BaseException as e:
+            del upload_claims[upload_id]  # nothing was started, the client may try again
+            if isinstance(e, Exception):
+                claim.set_exception(e)
+                claim.exception()  # retrieved, whether or not a retry was waiting
+            else:
+                claim.cancel()
+            raise
+        claim.set_result(started)
+        return started
+    if upload is None and request is not None:
+        try:
+            upload = await receive_upload(request.stream(), request.headers.get("content-type"))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except MalformedUpload as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if upload is None:
+        raise HTTPException(status_code=400, detail="Send a file or an upload_id.")
+    INGESTED_BYTES.inc(upload.size)
+    UPLOAD_RECEIVE_SECONDS.observe(upload.timings.get("receive", 0.0))
+    UPLOAD_WRITE_SECONDS.observe(upload.timings.get("write", 0.0))
+    return await queue_transcription(upload.path, upload.sha256, refresh, cleanup=lambda: discard(upload.path),
+                                     stream=stream, model_name=model_name, chunked=chunked, start=start, end=end)
+
+def prune_upload_claims():
+    # Forget claims whose job has left the job history
+    for upload_id, claim in list(upload_claims.items()):
+        if claim.done() and jobs.get(claim.result()[0].id) is None:
+            del upload_claims[upload_id]
+
+def claim_upload(upload_id):
+    try:
+        return uploads.complete(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    except UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+def upload_headers(info):
+    return {"Upload-Offset": str(info["offset"]), "Upload-Length": str(info["size"])}
+
+@app.post("/uploads/", status_code=201)
+def create_upload(
+    filename: str = Body(..., embed=True),
+    size: int = Body(..., embed=True, ge=0)
+):
+    # Start a resumable upload: PATCH the bytes to /uploads/{upload_id}, then pass upload_id to /transcribe/ or /jobs/
+    try:
+        info = uploads.create(filename, size)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    headers = upload_headers(info)
+    headers["Location"] = f"/uploads/{info['upload_id']}"
+    return JSONResponse(info, status_code=201, headers=headers)
+
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    # How far the upload got, the client resumes from "offset"
+    try:
+        info = uploads.info(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    return JSONResponse(info, headers=upload_headers(info))
+
+@app.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, upload_offset: int = Header(..., ge=0)):
+    # The body is the next chunk of the file, starting at the Upload-Offset header
+    try:
+        offset = await uploads.append(upload_id, upload_offset, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    except OffsetMismatch as e:
+        return JSONResponse({"detail": str(e), "offset": e.offset}, status_code=409,
+                            headers={"Upload-Offset": str(e.offset)})
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    INGESTED_BYTES.inc(offset - upload_offset)
+    info = uploads.info(upload_id)
+    return JSONResponse(info, headers=upload_headers(info))
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+def delete_upload(upload_id: str):
+    try:
+        uploads.remove(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    return Response(status_code=204)
+
+def use_long_media_mode(media, chunked, window=None):
+    # Time ranges are short and transcribed in one pass; streamed chunks arrive in order too
+    if window is not None:
+        if chunked:
+            raise HTTPException(status_code=400, detail="chunked cannot be combined with start/end.")
+        return False
+    if chunked is not None:
+        return chunked
+    return jobs.workers > 1 and (media.duration or 0) > LONG_MEDIA_SECONDS
+
+def time_window(media, start, end):
+    # (start, end) in seconds clamped to the media, or None for the whole file
+    if start is None and end is None:
+        return None
+    duration = media.duration or float("inf")
+    start = start or 0.0
+    end = min(end if end is not None else duration, duration)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end and inside the media.")
+    return (start, end)
+
+async def queue_transcription(path, sha256, refresh, cleanup=None, stream=False, model_name=DEFAULT_MODEL, chunked=None,
+                              start=None, end=None):
+    # Shared by uploads and manifest entries; cleanup runs once the file is no longer needed
+    try:
+        try:
+            with PROBE_SECONDS.time():
+                media = await probe_media(path)
+        except ProbeError as e:
+            raise HTTPException(status_code=400, detail=f"Could not read media: {e}")
+        if not media.has_video:
+            raise HTTPException(status_code=400, detail="No video stream found.")
+        if media.audio is None:
+            raise HTTPException(status_code=400, detail="No audio stream found.")
+        window = time_window(media, start, end)
+        long_media = use_long_media_mode(media, chunked, window)
+        # The cache key needs the mode, so the cache is only asked after probing
+        options = dict(TRANSCRIBE_OPTIONS)
+        if start is not None or end is not None:
+            options["range"] = [start, end]  # only part of the cache key, not a Whisper option
+        if long_media:
+            options["chunked"] = True  # stitched chunks differ from a single pass at the cuts
+        key = cache_key(sha256, model_name, options)
+        cached = None if refresh else transcript_cache.get(key)
+        if cached is not None:
+            if cleanup:
+                cleanup()
+            return jobs.finish(jobs.create(), cached), True
+
+        def on_result(result):
+            INFERENCE_SECONDS.observe(result.get("inference_seconds", 0.0), model=model_name)
+            AUDIO_SECONDS.inc(result.get("audio_seconds", 0.0), model=model_name)
+            admission.record(result.get("audio_seconds", 0.0), result.get("inference_seconds", 0.0))
+            response = build_response(media, result)
+            if window is not None:
+                response["range"] = {"start": window[0], "end": window[1]}
+            transcript_cache.put(key, response)
+            return response
+
+        if long_media:
+            job = jobs.submit_chunked(path, model_name, TRANSCRIBE_OPTIONS, on_result, cleanup=cleanup, stream=stream)
+        else:
+            job = jobs.submit(path, model_name, TRANSCRIBE_OPTIONS, on_result,
+                              cleanup=cleanup, duration=media.duration, stream=stream, window=window)
+        job.meta["header"] = response_header(media)
+        job.meta["audio_seconds"] = (window[1] - window[0]) if window else (media.duration or 0.0)
+        return job, False
+    except BaseException:
+        if cleanup:
+            cleanup()
+        raise
 
 @app.post("/transcribe/")
-async def transcribe_video(file: UploadFile = File(...)):
-    # Save uploaded file to a temp location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
-
-    # Get video resolution and map to nearest
-    width, height = get_video_resolution(tmp_path)
-    res_name, res_tuple = map_to_nearest_resolution(width, height)
-
-    # Get FPS using ffmpeg
-    # This is optional, but can be useful for debugging or further processing
-    probe = ffmpeg.probe(tmp_path)
-    video_streams = [stream for stream in probe['streams'] if stream['codec_type'] == 'video']
-    if video_streams:
-        fps = eval(video_streams[0]['r_frame_rate'])
-        print(f"FPS: {fps}")
+async def transcribe_video(
+    request: Request,
+    refresh: bool = Query(False, description="Ignore cached transcript and transcribe again"),
+    stream: bool = Query(False, description="Stream NDJSON (or SSE with Accept: text/event-stream) as segments are decoded"),
+    model: Optional[str] = MODEL_QUERY,
+    chunked: Optional[bool] = CHUNKED_QUERY,
+    start: Optional[float] = START_QUERY,
+    end: Optional[float] = END_QUERY,
+    upload_id: Optional[str] = UPLOAD_ID_QUERY
+):
+    # Synchronous wrapper around the job API: queue the job and wait for its result.
+    # The video is the multipart "file" field, read by start_job rather than declared as an UploadFile.
+    # With start/end only that range is decoded; timestamps stay in absolute media time.
+    job, hit = await start_job(None, refresh, stream=stream, model_name=model_param(model), chunked=chunked,
+                               start=start, end=end, upload_id=upload_id, request=request)
+    if stream:
+        return transcript_stream_response(job, hit, request)
+    await jobs.wait(job)
+    if job.status != DONE:
+        raise HTTPException(status_code=500, detail=job.error or f"Transcription {job.status}")
+    return transcript_response(job.result, request, {"X-Transcript-Cache": "hit" if hit else "miss"})
+
+def transcript_response(transcript, request, headers=None):
+    # JSON by default; columnar and gzip/zstd when the client asks for them
+    with SERIALIZE_SECONDS.time():
+        body, media_type, extra = encode_transcript(
+            transcript, request.headers.get("accept", ""), request.headers.get("accept-encoding", "")
+        )
+    extra.update(headers or {})
+    return Response(content=body, media_type=media_type, headers=extra)
+
+def transcript_stream_response(job, hit, request):
+    # NDJSON or SSE; columnar words and gzip/zstd when the client asks for them, like transcript_response
+    accept = request.headers.get("accept", "")
+    sse = "text/event-stream" in accept
+    events = stream_transcript(job, hit, sse, columnar=COLUMNAR_MEDIA_TYPE in accept)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""))
+    if encoding:
+        events = compressed_stream(events, encoding)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(events, media_type="text/event-stream" if sse else "application/x-ndjson", headers=headers)
+
+async def compressed_stream(events, encoding):
+    compressor = StreamCompressor(encoding)
+    async for event in events:
+        yield compressor.compress(event.encode("utf-8"))
+    yield compressor.finish()
+
+def stream_event(kind, data, sse):
+    if sse:
+        return f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps(dict(type=kind, **data), ensure_ascii=False) + "\n"
+
+def cached_segments(response):
+    # Regroup a finished transcript's flat word list under its sentences
+    words = response.get("words", [])
+    w = 0
+    for sentence in response.get("sentences", []):
+        sentence_words = []
+        while w < len(words) and words[w]["start"] < sentence["end"]:
+            sentence_words.append(words[w])
+            w += 1
+        yield sentence, sentence_words
+
+async def stream_transcript(job, hit, sse, columnar=False):
+    """Emit the resolution header, then one event per sentence with its words, then a summary.
+
+    Fresh jobs stream segments as the worker decodes them; cache hits replay
+    the stored transcript. With columnar, each event's words are parallel
+    text/start/end lists.
+    """
+    def sentence_event(sentence, words):
+        return stream_event("sentence", {"sentence": sentence, "words": to_columns(words) if columnar else words}, sse)
+
+    header = job.meta.get("header")
+    if header is None and job.result is not None:
+        header = {"resolution": job.result["resolution"], "media": job.result.get("media")}
+    yield stream_event("resolution", header or {}, sse)
+    sentence_count = word_count = 0
+    if job.segments is not None:
+        async for segment in jobs.iter_segments(job):
+            sentence, words = segment_records(segment)
+            sentence_count += 1
+            word_count += len(words)
+            yield sentence_event(sentence, words)
+        await jobs.wait(job)
+        if job.result is not None:
+            # Segments the worker could not forward while decoding come from the finished result
+            for sentence, words in itertools.islice(cached_segments(job.result), sentence_count, None):
+                sentence_count += 1
+                word_count += len(words)
+                yield sentence_event(sentence, words)
+    elif job.result is not None:
+        for sentence, words in cached_segments(job.result):
+            sentence_count += 1
+            word_count += len(words)
+            yield sentence_event(sentence, words)
+    yield stream_event("summary", {
+        "status": job.status,
+        "error": job.error,
+        "sentences": sentence_count,
+        "words": word_count,
+        "cache": "hit" if hit else "miss"
+    }, sse)
+
+def manifest_paths(manifest):
+    # A manifest is a JSON list of paths relative to TRANSCRIPT_BATCH_ROOT
+    if not BATCH_ROOT:
+        raise HTTPException(status_code=400, detail="Manifests are disabled, set TRANSCRIPT_BATCH_ROOT on the server.")
+    try:
+        entries = json.loads(manifest)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Manifest must be a JSON list of paths.")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Manifest must be a JSON list of paths.")
+    root = os.path.realpath(BATCH_ROOT)
+    paths = []
+    for entry in entries:
+        path = os.path.realpath(os.path.join(root, str(entry)))
+        if os.path.commonpath([root, path]) != root:
+            raise HTTPException(status_code=400, detail=f"Manifest path outside batch root: {entry}")
+        paths.append((str(entry), path))
+    return paths
+
+async def start_batch_item(name, upload=None, path=None, refresh=False, model_name=DEFAULT_MODEL):
+    # Never raises, a failing file is reported in its own result; an upload belongs to its job from here on
+    try:
+        try:
+            admission.check_queue()  # other requests may have filled the queue since the batch was admitted
+        except Overloaded as e:
+            if upload is not None:
+                discard(upload.path)
+            raise HTTPException(status_code=429, detail=str(e))
+        if upload is not None:
+            job, hit = await start_job(upload, refresh, model_name=model_name)
+        else:
+            if not os.path.isfile(path):
+                raise HTTPException(status_code=404, detail="File not found.")
+            sha256 = await run_in_threadpool(hash_file, path)
+            job, hit = await queue_transcription(path, sha256, refresh, model_name=model_name)
+        return {"filename": name, "job": job, "cache": "hit" if hit else "miss"}
+    except HTTPException as e:
+        return {"filename": name, "job": None, "error": e.detail}
+
+def batch_result(index, item):
+    job = item["job"]
+    result = {"index": index, "filename": item["filename"]}
+    if job is None:
+        result.update(status="failed", error=item["error"])
     else:
-        print("No video stream found.")    
-    # Transcribe using Whisper
-    result = model.transcribe(tmp_path, word_timestamps=True)
-    os.remove(tmp_path)
+        result.update(status=job.status, error=job.error, cache=item["cache"], transcript=job.result)
+    return result
 
-    # Structure transcript for Blender
-    sentences = []
+@app.post("/transcribe/batch")
+async def transcribe_batch(
+    request: Request,
+    refresh: bool = Query(False, description="Ignore cached transcripts and transcribe again"),
+    stream: bool = Query(False, description="Return NDJSON, one line per file as soon as it finishes"),
+    model: Optional[str] = MODEL_QUERY
+):
+    """Transcribe many files in one request.
+
+    The multipart body has "files" parts, saved to disk once as they
+    arrive, and/or a "manifest" field with a JSON list of paths below
+    TRANSCRIPT_BATCH_ROOT. All files are queued at once so every worker in
+    the pool stays busy. Results come back as one combined document, or
+    streamed in completion order with stream=true.
+    """
+    model_name = model_param(model)
+    try:
+        uploads, fields = await receive_form(request.stream(), request.headers.get("content-type"), "files")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MalformedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        paths = manifest_paths(fields["manifest"]) if fields.get("manifest") else []
+        count = len(uploads) + len(paths)
+        if not count:
+            raise HTTPException(status_code=400, detail="No files or manifest given.")
+        admission.check_queue(count)  # admission let the request in, but a batch queues a job per file
+    except (HTTPException, Overloaded) as e:
+        for _, upload in uploads:
+            discard(upload.path)
+        if isinstance(e, Overloaded):
+            return overloaded_response(e)
+        raise
+    # Hashing, probing and queueing run for all files at once
+    items = await asyncio.gather(
+        *[start_batch_item(name, upload=upload, refresh=refresh, model_name=model_name) for name, upload in uploads],
+        *[start_batch_item(name, path=path, refresh=refresh, model_name=model_name) for name, path in paths]
+    )
+
+    async def wait_item(index, item):
+        if item["job"] is not None:
+            await jobs.wait(item["job"])
+        return batch_result(index, item)
+
+    if stream:
+        async def lines():
+            for next_done in asyncio.as_completed([wait_item(i, item) for i, item in enumerate(items)]):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    results = await asyncio.gather(*[wait_item(i, item) for i, item in enumerate(items)])
+    return {
+        "results": results,
+        "done": sum(1 for r in results if r["status"] == DONE),
+        "failed": sum(1 for r in results if r["status"] != DONE)
+    }
+
+@app.post("/jobs/", status_code=202)
+async def create_job(
+    request: Request,
+    refresh: bool = Query(False, description="Ignore cached transcript and transcribe again"),
+    model: Optional[str] = MODEL_QUERY,
+    chunked: Optional[bool] = CHUNKED_QUERY,
+    start: Optional[float] = START_QUERY,
+    end: Optional[float] = END_QUERY,
+    upload_id: Optional[str] = UPLOAD_ID_QUERY
+):
+    # Returns immediately with a job id, poll GET /jobs/{job_id} for the result
+    job, hit = await start_job(None, refresh, model_name=model_param(model), chunked=chunked, start=start, end=end,
+                               upload_id=upload_id, request=request)
+    data = jobs.status(job.id)
+    data.pop("result", None)
+    data["cache"] = "hit" if hit else "miss"
+    return data
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    data = jobs.status(job_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return data
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    data = jobs.status(job_id)
+    data.pop("result", None)
+    if data["status"] not in (DONE, CANCELLED):
+        data["status"] = "cancelling"
+    return data
+
+@app.get("/cache/stats")
+def cache_stats():
+    # Hit/miss counters and size of the transcript cache
+    return transcript_cache.stats()
+
+def normalize_fps(fps):
+    # setting fps to 30 if it is 29.97002997002997 (NTSC), otherwise keep the exact rate
+    if fps is None:
+        return 30
+    if 29.01 <= float(fps) <= 29.99:
+        return 30
+    if fps.denominator == 1:
+        return fps.numerator
+    return float(fps)
+
+def segment_records(segment):
+    # One Whisper segment -> sentence and word records in the transcript format Blender reads
+    sentence = {
+        "text": segment['text'],
+        "start": segment['start'],
+        "end": segment['end']
+    }
     words = []
-    for segment in result['segments']:
-        sentences.append({
-            "text": segment['text'],
-            "start": segment['start'],
-            "end": segment['end']
+    for word in segment.get('words', []):
+        words.append({
+            "text": word['word'],
+            "start": word['start'],
+            "end": word['end']
         })
-        for word in segment.get('words', []):
-            words.append({
-                "text": word['word'],
-                "start": word['start'],
-                "end": word['end']
-            })
-    # setting fps to 30 if it is 29.97002997002997
-    if(float(fps) >= 29.01 or float(fps) <= 29.99 ):
-        fps = 30
-    # for debug _response= {"resolution":{"name":"instagram_post","width":1080,"height":1080,"fps":30},"sentences":[{"text":" Yeah, go ahead. So the thing is that I'm on Wi-Fi. Sorry, I'm not on Wi-Fi. I","start":0.0,"end":7.54}],"words":[{"text":" Yeah,","start":0.0,"end":0.46}]}
-    return JSONResponse({
+    return sentence, words
+
+def response_header(media):
+    # Map video resolution to nearest standard one
+    res_name, res_tuple = map_to_nearest_resolution(media.width, media.height)
+    return {
         "resolution": {
             "name": res_name,
             "width": res_tuple[0],
             "height": res_tuple[1],
-             "fps": fps
+            "fps": normalize_fps(media.fps),
+            "fps_rational": str(media.fps) if media.fps else None
         },
-        "sentences": sentences,
-        "words": words
-    })
+        "media": {
+            "duration": media.duration,
+            "audio": media.audio
+        }
+    }
+
+def build_response(media, result):
+    # Structure transcript for Blender
+    sentences = []
+    words = []
+    for segment in result['segments']:
+        sentence, segment_words = segment_records(segment)
+        sentences.append(sentence)
+        words.extend(segment_words)
+    # for debug _response= {"resolution":{"name":"instagram_post","width":1080,"height":1080,"fps":30},"sentences":[{"text":" Yeah, go ahead. So the thing is that I'm on Wi-Fi. Sorry, I'm not on Wi-Fi. I","start":0.0,"end":7.54}],"words":[{"text":" Yeah,","start":0.0,"end":0.46}]}
+    response = response_header(media)
+    response["sentences"] = sentences
+    response["words"] = words
+    return response
     # for debug return JSONResponse(_response)
 
 # To run: uvicorn app:app --reload
\ No newline at end of file
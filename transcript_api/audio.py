@@ -0,0 +1,92 @@
+import os
+import tempfile
+import subprocess
+import numpy as np
+
+SAMPLE_RATE = 16000  # what Whisper expects
+READ_CHUNK = 1024 * 1024
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def ffmpeg_audio_command(path, sr=SAMPLE_RATE, window=None):
+    # Only the first audio stream is mapped, so ffmpeg never decodes the video frames.
+    # window=(start, end) in seconds seeks on the input, so only that range is decoded.
+    seek = []
+    if window is not None:
+        start, end = window
+        seek = ["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}"]
+    return [
+        "ffmpeg", "-nostdin", "-v", "error", "-threads", "0",
+        *seek, "-i", path,
+        "-map", "0:a:0", "-vn", "-sn", "-dn",
+        "-ac", "1", "-ar", str(sr),
+        "-f", "f32le", "-acodec", "pcm_f32le", "-"
+    ]
+
+
+def _read_into_array(stream, expected_samples):
+    # Fill a preallocated float32 buffer straight from the pipe, growing it if the estimate was short
+    buf = np.empty(max(expected_samples, SAMPLE_RATE), dtype=np.float32)
+    filled = 0
+    while True:
+        view = memoryview(buf).cast("B")
+        if filled == len(view):
+            grown = np.empty(len(buf) * 2, dtype=np.float32)
+            grown[:len(buf)] = buf
+            buf = grown
+            continue
+        n = stream.readinto(view[filled:filled + READ_CHUNK])
+        if not n:
+            break
+        filled += n
+    return buf[:filled // 4]
+
+
+def decode_audio_to_file(path, out_path, sr=SAMPLE_RATE):
+    """Decode the first audio stream of path to raw mono float32 PCM in out_path.
+
+    Returns the number of samples. Other processes can map the file with load_pcm.
+    """
+    with tempfile.TemporaryFile() as err, open(out_path, "wb") as out:
+        returncode = subprocess.run(ffmpeg_audio_command(path, sr), stdout=out, stderr=err).returncode
+        if returncode != 0:
+            err.seek(0)
+            raise AudioDecodeError(err.read().decode(errors="replace").strip() or "ffmpeg failed")
+        return out.tell() // 4
+
+
+def load_pcm(pcm_path, start=0, end=None):
+    # Map samples [start, end) of a raw PCM file, copy-on-write so the slice is writable.
+    # Whisper copies whatever it gets into a tensor, so keep the slices chunk sized.
+    samples = os.path.getsize(pcm_path) // 4
+    end = samples if end is None else min(end, samples)
+    if end <= start:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_path, dtype=np.float32, mode="c", offset=start * 4, shape=(end - start,))
+
+
+def decode_audio(path, duration=None, sr=SAMPLE_RATE, window=None):
+    """Decode the first audio stream of path to a mono float32 array at sr Hz.
+
+    ffmpeg writes raw PCM to a pipe that is read in fixed-size chunks. With a
+    known duration the buffer is allocated once. The whole array is in RAM:
+    Whisper's log_mel_spectrogram copies it into a tensor anyway, so a
+    memory map would not save anything. window=(start, end) decodes only
+    that range.
+    """
+    if window is not None:
+        duration = window[1] - window[0]
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(ffmpeg_audio_command(path, sr, window), stdout=subprocess.PIPE, stderr=err)
+        try:
+            audio = _read_into_array(proc.stdout, int((duration or 0) * sr) + sr)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            err.seek(0)
+            raise AudioDecodeError(err.read().decode(errors="replace").strip() or "ffmpeg failed")
+    return audio
@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Transcript cache settings, override with environment variables
+CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+CACHE_MAX_MB = int(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "1024"))
+
+
+def cache_key(content_hash, model_name, options):
+    # Same bytes + same model + same options -> same transcript
+    raw = json.dumps({"sha256": content_hash, "model": model_name, "options": options}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    """Persistent on-disk cache of transcript responses with LRU eviction.
+
+    Each entry is one JSON file named after its key. Recency is kept in memory
+    and mirrored to the file mtime so it survives restarts.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            found.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                # Entry vanished or is corrupt, drop it and treat as a miss
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, self._path(key))
+            self._entries[key] = len(raw)
+            self.total_bytes += len(raw)
+            self._evict()
+
+    def _drop(self, key):
+        self.total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        # Remove least recently used entries until we are under the limit
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes
+            }
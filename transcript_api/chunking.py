@@ -0,0 +1,140 @@
+import os
+import numpy as np
+from audio import SAMPLE_RATE
+
+# Long-media mode settings, override with environment variables
+LONG_MEDIA_SECONDS = int(os.environ.get("TRANSCRIPT_LONG_MEDIA_SECONDS", "600"))
+CHUNK_SECONDS = int(os.environ.get("TRANSCRIPT_CHUNK_SECONDS", "300"))
+
+FRAME_SECONDS = 0.03       # energy is measured per 30 ms frame
+MIN_SILENCE_SECONDS = 0.3  # shorter pauses are not used as cut points
+SILENCE_DB = -35           # frames this far below the loud (95th percentile) level count as silence
+SEARCH_FRACTION = 0.2      # look for a silence within +-20% of the target chunk length
+BLOCK_FRAMES = 10000       # frames per block when scanning, keeps memory flat on memory-mapped audio
+
+
+def frame_energy(audio, sr=SAMPLE_RATE, frame_seconds=FRAME_SECONDS):
+    # RMS per frame, computed block by block
+    frame = max(1, int(sr * frame_seconds))
+    count = len(audio) // frame
+    energy = np.empty(count, dtype=np.float32)
+    for first in range(0, count, BLOCK_FRAMES):
+        last = min(count, first + BLOCK_FRAMES)
+        block = np.asarray(audio[first * frame:last * frame], dtype=np.float32).reshape(last - first, frame)
+        energy[first:last] = np.sqrt(np.mean(np.square(block), axis=1))
+    return energy, frame
+
+
+def silence_runs(energy, min_frames, silence_db=SILENCE_DB):
+    """Return (first_frame, end_frame) of every silent stretch of at least min_frames.
+
+    A frame is silent when its energy is silence_db below the 95th percentile,
+    so the threshold follows the recording level.
+    """
+    if len(energy) == 0:
+        return []
+    threshold = np.percentile(energy, 95) * 10 ** (silence_db / 20)
+    silent = np.concatenate(([False], energy <= threshold, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    return [(int(a), int(b)) for a, b in zip(starts, ends) if b - a >= min_frames]
+
+
+def split_points(audio, sr=SAMPLE_RATE, chunk_seconds=CHUNK_SECONDS):
+    """Split audio into (start_sample, end_sample) ranges of about chunk_seconds.
+
+    Every cut is placed in the middle of the longest silence near the target
+    length, falling back to a hard cut when there is none. Ranges are
+    contiguous and do not overlap, so no sample is transcribed twice.
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sr)
+    if total <= chunk * 1.5:
+        return [(0, total)]
+    energy, frame = frame_energy(audio, sr)
+    runs = silence_runs(energy, max(1, int(MIN_SILENCE_SECONDS / FRAME_SECONDS)))
+    search = int(chunk * SEARCH_FRACTION)
+    ranges = []
+    pos = 0
+    while total - pos > chunk * 1.5:
+        target = pos + chunk
+        lo, hi = (target - search) // frame, (target + search) // frame
+        best = None
+        for a, b in runs:
+            a, b = max(a, lo), min(b, hi)
+            if b > a and (best is None or b - a > best[1] - best[0]):
+                best = (a, b)
+        cut = ((best[0] + best[1]) // 2) * frame if best else target
+        ranges.append((pos, cut))
+        pos = cut
+    ranges.append((pos, total))
+    return ranges
+
+
+def shift_segment(segment, offset):
+    # Copy of a Whisper segment with its own and its words' times moved by offset seconds
+    segment = dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+    segment["words"] = [dict(w, start=w["start"] + offset, end=w["end"] + offset) for w in segment.get("words", [])]
+    return segment
+
+
+class Stitcher:
+    """Joins per-chunk Whisper results, added in chunk order, into one in absolute media time.
+
+    Segment and word times are shifted by each chunk's offset (seconds).
+    Chunks never overlap, so every word is real speech: a word whose
+    timestamp drifted before the previous word's end is moved up to it
+    instead of being dropped, and times never run backwards.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.texts = []
+        self.language = None
+        self.audio_seconds = 0.0
+        self.inference_seconds = 0.0
+        self._last_end = 0.0
+        self._last_word_end = 0.0
+
+    def add(self, result, offset):
+        # Returns the new segments, so they can be streamed as soon as their chunk is stitched
+        self.language = self.language or result.get("language")
+        self.texts.append(result.get("text") or "")
+        self.audio_seconds += result.get("audio_seconds", 0.0)
+        self.inference_seconds += result.get("inference_seconds", 0.0)
+        added = []
+        for segment in result["segments"]:
+            segment = dict(segment)
+            words = []
+            for word in segment.get("words", []):
+                start = max(self._last_word_end, word["start"] + offset)
+                word = dict(word, start=start, end=max(start, word["end"] + offset))
+                words.append(word)
+                self._last_word_end = word["end"]
+            segment["words"] = words
+            segment["start"] = max(self._last_end, segment["start"] + offset)
+            segment["end"] = max(segment["start"], segment["end"] + offset)
+            if "seek" in segment:
+                segment["seek"] += int(offset * 100)  # Whisper counts seek in 10 ms mel frames
+            segment["id"] = len(self.segments)
+            self.segments.append(segment)
+            added.append(segment)
+            self._last_end = segment["end"]
+        return added
+
+    def result(self):
+        return {
+            "text": "".join(self.texts),
+            "language": self.language,
+            "segments": self.segments,
+            "audio_seconds": self.audio_seconds,
+            "inference_seconds": self.inference_seconds
+        }
+
+
+def stitch(chunk_results, offsets):
+    # All chunks at once, see Stitcher
+    stitcher = Stitcher()
+    for result, offset in zip(chunk_results, offsets):
+        stitcher.add(result, offset)
+    return stitcher.result()
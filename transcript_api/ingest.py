@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+
+# Upload limits, override with environment variables when starting uvicorn
+MAX_UPLOAD_BYTES = int(os.environ.get("TRANSCRIPT_MAX_UPLOAD_MB", "8192")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.environ.get("TRANSCRIPT_UPLOAD_CHUNK_KB", "1024")) * 1024
+UPLOAD_DIR = os.environ.get("TRANSCRIPT_UPLOAD_DIR") or None  # None -> system temp dir
+
+
+MAX_PART_HEADER_BYTES = 16 * 1024
+MAX_FIELD_BYTES = 1024 * 1024  # text fields of a form, e.g. a batch manifest
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes):
+        super().__init__(f"Upload exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class MalformedUpload(ValueError):
+    pass
+
+
+def check_content_length(headers, max_bytes=MAX_UPLOAD_BYTES):
+    # Reject oversize bodies up front when the client announces the length
+    length = headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+
+class UploadSizeLimit:
+    """ASGI middleware answering 413 as soon as a request body grows past max_bytes.
+
+    The bytes are counted as they arrive, so chunked uploads without a
+    Content-Length are stopped too, before the rest is read or spooled to
+    disk. Whatever the app sends after that is dropped.
+    """
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        try:
+            check_content_length(headers, self.max_bytes)
+        except UploadTooLarge as e:
+            return await self.reject(send, e)
+        received = 0
+        started = rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    error = UploadTooLarge(self.max_bytes)
+                    if not rejected and not started:
+                        rejected = True
+                        await self.reject(send, error)
+                    raise error
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if rejected:
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    @staticmethod
+    async def reject(send, error):
+        body = json.dumps({"detail": str(error)}).encode("utf-8")
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def upload_suffix(filename):
+    # Keep the original extension so ffprobe/ffmpeg can guess the container
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext else ".mp4"
+
+
+class StoredUpload:
+    # An upload that has been written to disk, with its size and content hash
+    def __init__(self, path, size, sha256, timings=None):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.timings = timings or {}  # seconds spent receiving vs. writing to disk
+
+
+class DiskWriter:
+    """Hashes and writes upload data to an open file in a thread, about chunk_size bytes per hop.
+
+    hashlib and file writes release the GIL, so several large uploads do not
+    hold up the event loop, and with it the other requests and streams.
+    seconds adds up the time spent writing.
+    """
+
+    def __init__(self, out, hasher=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.out = out
+        self.hasher = hasher
+        self.chunk_size = chunk_size
+        self.pending = bytearray()
+        self.seconds = 0.0
+
+    def _write(self, data, close=False):
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.out.write(data)
+        if close:
+            self.out.close()
+
+    async def write(self, data):
+        self.pending += data
+        if len(self.pending) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self, close=False):
+        data, self.pending = self.pending, bytearray()
+        start = time.perf_counter()
+        await asyncio.to_thread(self._write, data, close)
+        self.seconds += time.perf_counter() - start
+
+    async def close(self):
+        await self.flush(close=True)
+
+
+def multipart_boundary(content_type):
+    # The boundary of a multipart/form-data Content-Type, None for other bodies
+    kind, _, params = (content_type or "").partition(";")
+    if kind.strip().lower() != "multipart/form-data":
+        return None
+    match = re.search(r'boundary=(?:"([^"]+)"|([^;\s]+))', params, re.IGNORECASE)
+    if match is None:
+        raise MalformedUpload("multipart/form-data without a boundary")
+    return (match.group(1) or match.group(2)).encode("latin-1")
+
+
+def part_disposition(header_block):
+    # (field name, filename or None) from a part's Content-Disposition header
+    for line in header_block.decode("utf-8", "replace").split("\r\n"):
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-disposition":
+            params = {}
+            for match in re.finditer(r'(\w+)=(?:"((?:[^"\\]|\\.)*)"|([^;\s]*))', value):
+                params[match.group(1).lower()] = match.group(2) if match.group(2) is not None else match.group(3)
+            return params.get("name"), params.get("filename")
+    raise MalformedUpload("Form part without a Content-Disposition header")
+
+
+async def receive_form(chunks, content_type, file_field="file", max_files=None, max_bytes=MAX_UPLOAD_BYTES):
+    """Parse a multipart/form-data body read from the chunks, saving its files to disk as they arrive.
+
+    Parsing request.stream() here instead of taking UploadFiles writes each
+    video to disk once: Starlette would spool it to a temp file of its own
+    first. Returns (files, fields): a list of (filename, StoredUpload) for
+    the parts of file_field, at most max_files of them, and the other text
+    fields by name. A body that is not multipart gives ([], {}). Raises
+    MalformedUpload for a broken body and UploadTooLarge for a file over
+    max_bytes; the files saved so far are removed then.
+    """
+    boundary = multipart_boundary(content_type)
+    if boundary is None:
+        return [], {}
+    delimiter = b"--" + boundary
+    separator = b"\r\n" + delimiter
+    buffer = bytearray()
+    chunks = chunks.__aiter__()
+    received = 0.0
+    files, fields = [], {}
+    out = None
+
+    async def read_more():
+        nonlocal received
+        start = time.perf_counter()
+        try:
+            buffer.extend(await chunks.__anext__())
+        except StopAsyncIteration:
+            return False
+        finally:
+            received += time.perf_counter() - start
+        return True
+
+    async def read_until(marker, limit=None, what=None):
+        # Index of marker in the buffer, reading more as needed
+        while (index := buffer.find(marker)) < 0:
+            if limit is not None and len(buffer) > limit:
+                raise MalformedUpload(f"{what} too long")
+            if not await read_more():
+                raise MalformedUpload("Upload body ended early")
+        return index
+
+    try:
+        del buffer[:await read_until(delimiter) + len(delimiter)]  # skip the preamble
+        while True:
+            while len(buffer) < 2 and await read_more():
+                pass
+            if buffer[:2] == b"--":
+                break  # the closing delimiter
+            if buffer[:2] != b"\r\n":
+                raise MalformedUpload("Malformed multipart delimiter")
+            del buffer[:2]
+            end = await read_until(b"\r\n\r\n", MAX_PART_HEADER_BYTES, "Form part headers are")
+            name, filename = part_disposition(bytes(buffer[:end]))
+            del buffer[:end + 4]
+            if filename is None:
+                # A text field, kept in memory
+                end = await read_until(separator, MAX_FIELD_BYTES, f"Form field {name} is")
+                fields[name] = buffer[:end].decode("utf-8", "replace")
+                del buffer[:end + len(separator)]
+                continue
+            saving = name == file_field and (max_files is None or len(files) < max_files)
+            if saving:
+                fd, path = tempfile.mkstemp(suffix=upload_suffix(filename), dir=UPLOAD_DIR)
+                out = os.fdopen(fd, "wb")
+                hasher = hashlib.sha256()
+                writer = DiskWriter(out, hasher)
+                stored = StoredUpload(path, 0, None)
+                files.append((filename, stored))
+            keep = len(separator) - 1  # a separator may begin at the end of the buffer
+            while True:
+                end = buffer.find(separator)
+                data_end = end if end >= 0 else max(0, len(buffer) - keep)
+                if saving and data_end:
+                    stored.size += data_end
+                    if stored.size > max_bytes:
+                        raise UploadTooLarge(max_bytes)
+                    await writer.write(buffer[:data_end])
+                if end >= 0:
+                    del buffer[:end + len(separator)]
+                    break
+                del buffer[:data_end]
+                if not await read_more():
+                    raise MalformedUpload("Upload body ended early")
+            if saving:
+                await writer.close()
+                out = None
+                stored.sha256 = hasher.hexdigest()
+                stored.timings = {"receive": received, "write": writer.seconds}
+                received = 0.0
+    except BaseException:
+        if out is not None:
+            out.close()
+        for _, stored in files:
+            discard(stored.path)
+        raise
+    return files, fields
+
+
+async def receive_upload(chunks, content_type, field="file", max_bytes=MAX_UPLOAD_BYTES):
+    # The file in form field `field` as a StoredUpload, None when there is none; see receive_form
+    files, _ = await receive_form(chunks, content_type, field, 1, max_bytes)
+    return files[0][1] if files else None
+
+
+def hash_file(path, chunk_size=UPLOAD_CHUNK_SIZE):
+    # sha256 of a file already on disk, read in chunks
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,535 @@
+import os
+import sys
+import time
+import queue
+import uuid
+import asyncio
+import threading
+import importlib
+import multiprocessing
+from collections import OrderedDict
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+from audio import SAMPLE_RATE, decode_audio, decode_audio_to_file, load_pcm
+from chunking import CHUNK_SECONDS, Stitcher, split_points, stitch, shift_segment
+from models import ModelRegistry
+
+# Number of transcription worker processes, each one holds its own model copy
+WORKERS = int(os.environ.get("TRANSCRIPT_WORKERS", "1"))
+# Finished jobs kept in memory so clients can still fetch their result
+JOB_HISTORY = int(os.environ.get("TRANSCRIPT_JOB_HISTORY", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# --- WORKER PROCESS SIDE ---
+_registry = None
+
+
+def _init_worker(loaded):
+    # Each worker keeps its own models and publishes their names under its pid
+    global _registry
+    pid = os.getpid()
+    loaded[pid] = []
+
+    def publish(names):
+        loaded[pid] = names
+
+    _registry = ModelRegistry(on_change=publish)
+
+
+def _get_model(model_name):
+    # Loaded once per worker process, on the first job that needs it
+    return _registry.get(model_name)
+
+
+def warm_model(model_name):
+    _get_model(model_name)
+    return os.getpid()
+
+
+class _ProgressBar:
+    """Stand-in for the tqdm bar Whisper drives while decoding.
+
+    Whisper advances it once per 30 second window, which is where we publish
+    progress, forward newly decoded segments and check whether the job was
+    cancelled.
+    """
+
+    def __init__(self, job_id, progress, cancelled, segments=None, offset=0.0, total=None, **kwargs):
+        self.job_id = job_id
+        self.progress = progress
+        self.cancelled = cancelled
+        self.segments = segments
+        self.offset = offset  # seconds added to streamed segment times
+        self.sent = 0
+        self.total = total or 0
+        self.n = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, n=1):
+        self.n += n
+        if self.total:
+            self.progress[self.job_id] = min(1.0, self.n / self.total)
+        if self.segments is not None:
+            self._forward_segments(sys._getframe(1))
+        if self.cancelled.get(self.job_id):
+            raise JobCancelled(self.job_id)
+
+    def _forward_segments(self, frame):
+        # Whisper has no segment callback; the finished segments are the
+        # all_segments local of the transcribe() call driving this bar
+        decoded = frame.f_locals.get("all_segments")
+        if not decoded:
+            return
+        for segment in decoded[self.sent:]:
+            self.segments.put(shift_segment(segment, self.offset) if self.offset else segment)
+        self.sent = len(decoded)
+
+
+class _TqdmShim:
+    def __init__(self, factory):
+        self.tqdm = factory
+
+
+def run_transcription(job_id, path, model_name, options, progress, cancelled, duration=None, segments=None, pcm=None,
+                      window=None):
+    # Runs inside a pool process; returns only the picklable parts of the result.
+    # With a segments queue, each decoded segment is also put on it as soon as it exists.
+    # pcm=(pcm_path, start, end) transcribes that slice of an already decoded file instead of path.
+    # window=(start, end) in seconds transcribes only that range, with times in absolute media time.
+    try:
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        progress[job_id] = 0.0
+        model = _get_model(model_name)
+        if pcm is not None:
+            audio = load_pcm(*pcm)
+        else:
+            # Decode to PCM ourselves so Whisper gets an array instead of running its own ffmpeg pass
+            audio = decode_audio(path, duration, window=window)
+        offset = window[0] if window else 0.0
+        transcribe_module = importlib.import_module("whisper.transcribe")
+        transcribe_module.tqdm = _TqdmShim(lambda **kw: _ProgressBar(job_id, progress, cancelled, segments, offset, **kw))
+        started = time.perf_counter()
+        result = model.transcribe(audio, verbose=False, **options)
+        if offset:
+            result = stitch([result], [offset])
+        progress[job_id] = 1.0
+        return {
+            "text": result.get("text"),
+            "language": result.get("language"),
+            "segments": result["segments"],
+            "audio_seconds": len(audio) / SAMPLE_RATE,
+            "inference_seconds": time.perf_counter() - started
+        }
+    finally:
+        if segments is not None:
+            segments.put(None)  # end of stream
+
+
+def plan_chunks(path, chunk_seconds, pcm_dir=None):
+    # Decode once to a raw PCM file every worker can map, then pick the cut points
+    fd, pcm_path = tempfile.mkstemp(suffix=".f32", dir=pcm_dir)
+    os.close(fd)
+    try:
+        decode_audio_to_file(path, pcm_path)
+        return pcm_path, split_points(load_pcm(pcm_path), SAMPLE_RATE, chunk_seconds)
+    except BaseException:
+        _remove(pcm_path)
+        raise
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# --- API PROCESS SIDE ---
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.segments = None  # queue of decoded segments for streaming jobs
+        self.parts = []  # (part_id, future) of a chunked job
+        self.meta = {}  # extra data the API attaches, e.g. the response header
+        self.last_progress = 0.0  # as of the last JobManager.progress call
+        self.done = threading.Event()
+
+    def to_dict(self, progress=None, include_result=True):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": 1.0 if self.status == DONE else (progress or 0.0),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+        if include_result and self.status == DONE:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs transcription jobs in a process pool and tracks their state.
+
+    The pool and the shared progress/cancel maps are created on first use,
+    so importing the app stays cheap. When a worker dies (e.g. killed for
+    running out of memory) the executor refuses all further work, so the
+    pool is rebuilt and the models warmed up again.
+    """
+
+    def __init__(self, workers=WORKERS, history=JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.history = history
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+        self._loaded = None
+        self._pool_lock = threading.RLock()
+        self.broken = False  # a worker died and the pool could not be rebuilt yet
+        self.warm_model = None
+        self.warming = []  # futures of the last warm_up
+
+    def _ensure_pool(self):
+        with self._pool_lock:
+            if self._executor is None:
+                # spawn, not fork: torch does not survive being forked with threads running
+                ctx = multiprocessing.get_context("spawn")
+                self._manager = ctx.Manager()
+                self._progress = self._manager.dict()
+                self._cancelled = self._manager.dict()
+                self._loaded = self._manager.dict()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=ctx, initializer=_init_worker, initargs=(self._loaded,)
+                )
+
+    def _rebuild_pool(self):
+        with self._pool_lock:
+            if self._executor is not None:
+                try:
+                    self._executor.submit(os.getpid)
+                    return  # healthy, another thread rebuilt it already
+                except BrokenProcessPool:
+                    pass
+                self.broken = True
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._manager.shutdown()
+            self._ensure_pool()
+            self.broken = False
+        if self.warm_model:
+            self.warm_up(self.warm_model)
+
+    def _submit(self, task):
+        # task() submits to self._executor; a pool broken by a dead worker is rebuilt and task() tried again
+        self._ensure_pool()
+        try:
+            return task()
+        except BrokenProcessPool:
+            self._rebuild_pool()
+            return task()
+
+    def warm_up(self, model_name):
+        # One load task per worker; loading takes seconds, so they spread over the pool
+        self.warm_model = model_name
+        self.warming = [self._submit(lambda: self._executor.submit(warm_model, model_name)) for _ in range(self.workers)]
+        return self.warming
+
+    def loaded_models(self):
+        # pid -> names of the models loaded in that worker
+        if self._loaded is None:
+            return {}
+        try:
+            return {str(pid): list(names) for pid, names in self._loaded.items()}
+        except (EOFError, OSError):
+            return {}  # the pool is being rebuilt
+
+    def create(self):
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        return job
+
+    def finish(self, job, result):
+        # Completes a job without running it, e.g. on a cache hit
+        job.status = DONE
+        job.result = result
+        job.finished_at = time.time()
+        job.done.set()
+        return job
+
+    def submit(self, path, model_name, options, on_result, cleanup=None, duration=None, stream=False, window=None):
+        """Queue a transcription of path and return its Job.
+
+        on_result(whisper_result) builds the response stored on the job;
+        cleanup() runs once the job is finished, whatever the outcome.
+        duration (seconds, if known) lets the worker size its audio buffer.
+        With stream=True, decoded segments can be read with iter_segments.
+        window=(start, end) limits the transcription to that range.
+        """
+        job = self.create()
+
+        def task():
+            if stream:
+                job.segments = self._manager.Queue()
+            return self._executor.submit(
+                run_transcription, job.id, path, model_name, options, self._progress, self._cancelled,
+                duration, job.segments, None, window
+            )
+
+        job.future = self._submit(task)
+        job.future.add_done_callback(lambda future: self._on_done(job, future, on_result, cleanup))
+        return job
+
+    def submit_chunked(self, path, model_name, options, on_result, cleanup=None, chunk_seconds=CHUNK_SECONDS,
+                       stream=False):
+        """Queue a long-media transcription of path split into chunks, and return its Job.
+
+        One worker decodes the audio and cuts it at silences, then every chunk
+        is transcribed in parallel across the pool. The stitched result is in
+        absolute media time and is passed to on_result like for submit.
+        With stream=True, a chunk's segments can be read with iter_segments
+        once it and every chunk before it are done.
+        """
+        job = self.create()
+        if stream:
+            job.segments = queue.Queue()  # filled here in the API process, not by a worker
+        job.future = Future()
+        job.future.add_done_callback(lambda future: self._on_done(job, future, on_result, cleanup))
+        plan = self._submit(lambda: self._executor.submit(plan_chunks, path, chunk_seconds))
+        job.parts = [(job.id + ":plan", plan)]
+        plan.add_done_callback(lambda plan: self._start_chunks(job, plan, model_name, options))
+        return job
+
+    def _start_chunks(self, job, plan, model_name, options):
+        try:
+            pcm_path, ranges = plan.result()
+        except BaseException as e:
+            self._resolve(job.future, exception=e)
+            return
+        if job.future.done():
+            _remove(pcm_path)  # cancelled while planning
+            return
+        futures = []
+        try:
+            for index, (start, end) in enumerate(ranges):
+                part_id = f"{job.id}:{index}"
+                futures.append((part_id, self._submit(lambda part_id=part_id, start=start, end=end: self._executor.submit(
+                    run_transcription, part_id, None, model_name, options, self._progress, self._cancelled,
+                    None, None, (pcm_path, start, end)
+                ))))
+        except BaseException as e:
+            job.parts = futures
+            self._cancel_parts(job)
+            _remove(pcm_path)
+            self._resolve(job.future, exception=e)
+            return
+        job.parts = futures
+        if job.future.done():
+            # Cancelled while the chunks were submitted, after _on_done looked at the parts
+            self._cancel_parts(job)
+            self._forget_parts(job)
+        offsets = [start / SAMPLE_RATE for start, _ in ranges]
+        remaining = [len(futures)]
+        stitched = [0]  # chunks added to the stitcher, always a prefix of futures
+        stitcher = Stitcher()
+        lock = threading.Lock()
+
+        def part_done(future):
+            failed = future.cancelled() or future.exception() is not None
+            if failed:
+                self._cancel_parts(job)  # no point finishing the other chunks
+            with lock:
+                remaining[0] -= 1
+                # Stitch in chunk order as far as the chunks are done, streaming the new segments
+                while stitched[0] < len(futures) and not failed:
+                    part = futures[stitched[0]][1]
+                    if not part.done() or part.cancelled() or part.exception() is not None:
+                        break
+                    for segment in stitcher.add(part.result(), offsets[stitched[0]]):
+                        if job.segments is not None:
+                            job.segments.put(segment)
+                    stitched[0] += 1
+                if remaining[0]:
+                    return
+            _remove(pcm_path)
+            if job.segments is not None:
+                job.segments.put(None)  # end of stream
+            try:
+                for _, f in futures:
+                    f.result()
+            except BaseException as e:
+                self._resolve(job.future, exception=e)
+                return
+            self._resolve(job.future, result=stitcher.result())
+
+        for _, future in futures:
+            future.add_done_callback(part_done)
+
+    def _resolve(self, future, result=None, exception=None):
+        if future.done():
+            return
+        if isinstance(exception, CancelledError):
+            future.cancel()
+        elif exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _cancel_parts(self, job):
+        for part_id, future in job.parts:
+            if not future.done() and not future.cancel():
+                self._cancelled[part_id] = True
+                if future.done():
+                    self._cancelled.pop(part_id, None)  # finished meanwhile, nothing will read the flag
+
+    def _forget_parts(self, job):
+        # Drop the progress and cancel flag of each part once it stops running, not before:
+        # a running chunk only stops when it sees its flag
+        for part_id, future in job.parts:
+            future.add_done_callback(lambda future, part_id=part_id: self._forget(part_id))
+
+    def _forget(self, job_id):
+        try:
+            self._progress.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+        except (EOFError, OSError):
+            pass  # the manager went away with a broken pool
+
+    def _on_done(self, job, future, on_result, cleanup):
+        try:
+            job.result = on_result(future.result())
+            job.status = DONE
+        except (CancelledError, JobCancelled):
+            job.status = CANCELLED
+        except BrokenProcessPool:
+            job.status = FAILED
+            job.error = "BrokenProcessPool: a worker process died, e.g. out of memory"
+            threading.Thread(target=self._rebuild_pool, daemon=True).start()
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            self._forget(job.id)
+            self._forget_parts(job)
+            if cleanup:
+                cleanup()
+            job.done.set()
+
+    def progress(self, job):
+        if self._progress is None:
+            return 0.0
+        if job.parts:
+            # A chunked job is as far along as its chunks are on average
+            chunks = [part_id for part_id, _ in job.parts if not part_id.endswith(":plan")]
+            reported = {part_id: self._progress.get(part_id) for part_id in chunks}
+            started = any(value is not None for value in reported.values())
+            value = sum(v or 0.0 for v in reported.values()) / len(chunks) if chunks else 0.0
+        else:
+            value = self._progress.get(job.id)
+            started = value is not None
+        if job.status == QUEUED and started:
+            # The pool does not tell us when a job starts, the first progress report does
+            job.status = RUNNING
+            job.started_at = time.time()
+        job.last_progress = value or 0.0
+        return job.last_progress
+
+    def cached_progress(self, job):
+        # The progress last read from the workers, without asking them again
+        return 1.0 if job.status == DONE else job.last_progress
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return job.to_dict(self.progress(job))
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.parts:
+            self._cancel_parts(job)
+        if job.future is not None and not job.future.cancel():
+            # Already running: the worker stops at its next progress update
+            self._cancelled[job.id] = True
+        return job
+
+    async def wait(self, job):
+        # Our done callback was registered first, so it has run by the time this wakes up
+        if job.future is not None and not job.done.is_set():
+            waiter = asyncio.wrap_future(job.future)
+            await asyncio.wait([waiter])
+            if not waiter.cancelled():
+                waiter.exception()  # already recorded on the job, mark it as retrieved
+        return job
+
+    async def iter_segments(self, job, poll=0.5):
+        """Yield raw Whisper segments of a streaming job as the worker decodes them.
+
+        Ends at the worker's end-of-stream marker, or once the job has
+        finished and nothing is left to read (e.g. it was cancelled while queued).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                segment = await loop.run_in_executor(None, job.segments.get, True, poll)
+            except queue.Empty:
+                if job.done.is_set():
+                    return
+                continue
+            except (EOFError, OSError):
+                return  # the pool was rebuilt after a worker died, and the job with it
+            if segment is None:
+                return
+            yield segment
+
+    def unfinished(self):
+        return [job for job in list(self.jobs.values()) if job.status not in FINISHED]
+
+    def pending(self):
+        return len(self.unfinished())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
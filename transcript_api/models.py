@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Model sizes clients may ask for, and the one used when they don't
+AVAILABLE_MODELS = [m.strip() for m in os.environ.get("TRANSCRIPT_MODELS", "tiny,base,small").split(",") if m.strip()]
+DEFAULT_MODEL = os.environ.get("TRANSCRIPT_MODEL", "base")  # You can use "small", "medium", or "large" for better accuracy
+# Memory budget for loaded models in each worker process
+MODEL_MEMORY_MB = int(os.environ.get("TRANSCRIPT_MODEL_MEMORY_MB", "4096"))
+
+if DEFAULT_MODEL not in AVAILABLE_MODELS:
+    AVAILABLE_MODELS.append(DEFAULT_MODEL)
+
+
+class UnknownModel(Exception):
+    pass
+
+
+def check_model_name(name):
+    # None means the default model
+    name = name or DEFAULT_MODEL
+    if name not in AVAILABLE_MODELS:
+        raise UnknownModel(f"Unknown model '{name}', available: {', '.join(AVAILABLE_MODELS)}")
+    return name
+
+
+def model_size_bytes(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+class ModelRegistry:
+    """Loads Whisper models by name on first use and keeps them in an LRU.
+
+    Least recently used models are dropped when the loaded ones exceed
+    max_bytes; the model being returned is always kept. on_change is called
+    with the list of loaded names whenever it changes.
+    """
+
+    def __init__(self, max_bytes=MODEL_MEMORY_MB * 1024 * 1024, on_change=None):
+        self.max_bytes = max_bytes
+        self.on_change = on_change
+        self._models = OrderedDict()  # name -> (model, size in bytes)
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        name = check_model_name(name)
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name][0]
+            import whisper
+            model = whisper.load_model(name)
+            self._models[name] = (model, model_size_bytes(model))
+            self._evict()
+            self._changed()
+            return model
+
+    def _evict(self):
+        while len(self._models) > 1 and sum(size for _, size in self._models.values()) > self.max_bytes:
+            self._models.popitem(last=False)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.loaded())
+
+    def loaded(self):
+        return list(self._models)
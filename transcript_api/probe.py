@@ -0,0 +1,122 @@
+import os
+import json
+import asyncio
+import subprocess
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+
+PROBE_CACHE_SIZE = 256
+
+FFPROBE_ARGS = [
+    'ffprobe',
+    '-v', 'error',
+    '-show_entries',
+    'stream=codec_type,codec_name,width,height,r_frame_rate,avg_frame_rate,sample_rate,channels:format=duration',
+    '-of', 'json'
+]
+
+_cache = OrderedDict()  # (path, size, mtime_ns) -> MediaInfo
+_cache_lock = threading.Lock()
+
+
+class ProbeError(Exception):
+    pass
+
+
+class MediaInfo:
+    # Everything the service needs to know about an uploaded file, from one ffprobe run
+    def __init__(self, width, height, fps, duration, audio):
+        self.width = width
+        self.height = height
+        self.fps = fps            # Fraction, e.g. Fraction(30000, 1001), or None without video
+        self.duration = duration  # seconds as float, or None if unknown
+        self.audio = audio        # {"codec", "sample_rate", "channels"} or None without audio
+
+    @property
+    def has_video(self):
+        return self.width is not None and self.height is not None
+
+
+def parse_rate(rate):
+    # "30000/1001" -> Fraction(30000, 1001); "0/0" or missing -> None
+    try:
+        value = Fraction(rate)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return value if value > 0 else None
+
+
+def parse_probe(info):
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    width = height = fps = None
+    if video:
+        width = int(video['width'])
+        height = int(video['height'])
+        fps = parse_rate(video.get('r_frame_rate')) or parse_rate(video.get('avg_frame_rate'))
+    audio_info = None
+    if audio:
+        audio_info = {
+            "codec": audio.get('codec_name'),
+            "sample_rate": int(audio['sample_rate']) if audio.get('sample_rate') else None,
+            "channels": audio.get('channels')
+        }
+    duration = info.get('format', {}).get('duration')
+    return MediaInfo(width, height, fps, float(duration) if duration else None, audio_info)
+
+
+def _cache_key(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _cache_get(key):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def _cache_put(key, media):
+    with _cache_lock:
+        _cache[key] = media
+        while len(_cache) > PROBE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+async def probe_media(path):
+    """Probe a media file with a single non-blocking ffprobe call.
+
+    Results are cached by path, size and mtime, so probing the same
+    unchanged file again costs nothing.
+    """
+    key = _cache_key(path)
+    media = _cache_get(key)
+    if media is not None:
+        return media
+    proc = await asyncio.create_subprocess_exec(
+        *FFPROBE_ARGS, path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise ProbeError(stderr.decode(errors="replace").strip() or "ffprobe failed")
+    media = parse_probe(json.loads(stdout))
+    _cache_put(key, media)
+    return media
+
+
+def probe_media_sync(path):
+    # Blocking variant for callers outside the event loop
+    key = _cache_key(path)
+    media = _cache_get(key)
+    if media is not None:
+        return media
+    result = subprocess.run(FFPROBE_ARGS + [path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise ProbeError(result.stderr.strip() or "ffprobe failed")
+    media = parse_probe(json.loads(result.stdout))
+    _cache_put(key, media)
+    return media
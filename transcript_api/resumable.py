@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import tempfile
+from ingest import MAX_UPLOAD_BYTES, DiskWriter, UploadTooLarge, discard
+
+# Resumable upload settings, override with environment variables
+RESUMABLE_DIR = os.environ.get("TRANSCRIPT_RESUMABLE_DIR") or os.path.join(tempfile.gettempdir(), "transcript_uploads")
+RESUMABLE_TTL = int(os.environ.get("TRANSCRIPT_RESUMABLE_TTL_HOURS", "24")) * 3600  # unfinished uploads are dropped after this
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+class OffsetMismatch(Exception):
+    # The client sent a chunk for another offset than the one the server has reached
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadIncomplete(Exception):
+    pass
+
+
+class ResumableUploads:
+    """Uploads sent in chunks, which survive dropped connections and restarts.
+
+    Each upload is a .part file plus a .json file with its name and total
+    size. The offset is simply the size of the .part file, so whatever made
+    it to disk counts and the client continues from there. Chunks must
+    arrive in order: a chunk for any other offset is refused.
+    """
+
+    def __init__(self, directory=RESUMABLE_DIR, max_bytes=MAX_UPLOAD_BYTES, ttl=RESUMABLE_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._locks = {}  # upload id -> asyncio.Lock, one chunk at a time per upload
+        os.makedirs(directory, exist_ok=True)
+
+    def _id(self, upload_id):
+        # Ids are generated here; anything else is refused so they cannot point outside the directory
+        try:
+            return uuid.UUID(upload_id).hex
+        except (ValueError, TypeError, AttributeError):
+            raise UploadNotFound(upload_id)
+
+    def _paths(self, upload_id):
+        base = os.path.join(self.directory, self._id(upload_id))
+        return base + ".part", base + ".json"
+
+    def create(self, filename, size):
+        if size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        part, meta = self._paths(upload_id)
+        open(part, "wb").close()
+        with open(meta, "w", encoding="utf-8") as f:
+            json.dump({"filename": filename, "size": size, "created": time.time()}, f)
+        return self.info(upload_id)
+
+    def info(self, upload_id):
+        part, meta = self._paths(upload_id)
+        try:
+            with open(meta, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            offset = os.path.getsize(part)
+        except FileNotFoundError:
+            raise UploadNotFound(upload_id)
+        return {"upload_id": self._id(upload_id), "filename": data["filename"], "size": data["size"], "offset": offset}
+
+    async def append(self, upload_id, offset, chunks):
+        # Write an async iterator of bytes at offset and return the new offset
+        lock = self._locks.setdefault(self._id(upload_id), asyncio.Lock())
+        async with lock:
+            info = self.info(upload_id)
+            if offset != info["offset"]:
+                raise OffsetMismatch(info["offset"])
+            part, _ = self._paths(upload_id)
+            with open(part, "ab") as out:
+                writer = DiskWriter(out)
+                try:
+                    async for chunk in chunks:
+                        offset += len(chunk)
+                        if offset > info["size"]:
+                            raise UploadTooLarge(info["size"])
+                        await writer.write(chunk)
+                finally:
+                    await writer.flush()  # what arrived counts, also when the connection dropped
+            return offset
+
+    def complete(self, upload_id):
+        """Hand over a fully received upload and return its path.
+
+        The file belongs to the caller from here on, the upload id is gone.
+        """
+        info = self.info(upload_id)
+        if info["offset"] < info["size"]:
+            raise UploadIncomplete(f"Upload has {info['offset']} of {info['size']} bytes.")
+        part, meta = self._paths(upload_id)
+        ext = os.path.splitext(os.path.basename(info["filename"] or ""))[1].lower() or ".mp4"
+        path = os.path.splitext(part)[0] + ext  # ffprobe/ffmpeg guess the container from the extension
+        os.replace(part, path)
+        discard(meta)
+        self._locks.pop(info["upload_id"], None)
+        return path
+
+    def remove(self, upload_id):
+        part, meta = self._paths(upload_id)
+        if not os.path.exists(meta):
+            raise UploadNotFound(upload_id)
+        discard(part)
+        discard(meta)
+        self._locks.pop(self._id(upload_id), None)
+
+    def expire(self):
+        # Drop uploads that have not received a chunk for ttl seconds
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta = os.path.join(self.directory, name)
+            part = meta[:-len(".json")] + ".part"
+            touched = max(os.path.getmtime(p) for p in (meta, part) if os.path.exists(p))
+            if touched < cutoff:
+                discard(part)
+                discard(meta)
+                self._locks.pop(name[:-len(".json")], None)
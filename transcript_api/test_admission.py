@@ -0,0 +1,79 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from admission import AdmissionController, Overloaded
+
+
+class FakeJobs:
+    # The parts of JobManager the controller uses; progress() blocks like a slow IPC call
+    def __init__(self, jobs, workers=1):
+        self.queued = jobs
+        self.workers = workers
+        self.release = threading.Event()
+        self.live_calls = 0
+
+    def unfinished(self):
+        return list(self.queued)
+
+    def pending(self):
+        return len(self.queued)
+
+    def progress(self, job):
+        self.release.wait(10)
+        self.live_calls += 1
+        job.last_progress = 0.5
+        return job.last_progress
+
+    def cached_progress(self, job):
+        return job.last_progress
+
+
+def job(audio_seconds, progress=0.0):
+    return SimpleNamespace(meta={"audio_seconds": audio_seconds}, last_progress=progress)
+
+
+class TestAdmission(unittest.TestCase):
+    def test_full_queue_is_rejected_with_an_estimate_without_waiting_for_workers(self):
+        jobs = FakeJobs([job(100.0), job(50.0, progress=0.5)], workers=1)
+        admission = AdmissionController(jobs, max_uploads=4, max_queue=2)
+        with self.assertRaises(Overloaded) as raised:
+            admission.enter_upload()  # would hang if it asked the workers
+        self.assertEqual(raised.exception.retry_after, 125)  # 100 + 25 audio seconds at 1x speed
+        self.assertEqual(jobs.live_calls, 0)
+        jobs.release.set()
+        admission.status()  # /status asks the workers
+        self.assertGreater(jobs.live_calls, 0)
+
+    def test_upload_slots_and_speed(self):
+        jobs = FakeJobs([job(60.0)], workers=2)
+        jobs.release.set()
+        admission = AdmissionController(jobs, max_uploads=1, max_queue=10)
+        admission.enter_upload()
+        self.assertRaises(Overloaded, admission.enter_upload)
+        admission.leave_upload()
+        admission.enter_upload()
+        admission.record(audio_seconds=10.0, inference_seconds=1.0)
+        self.assertGreater(admission.speed, 1.0)
+        admission.record(audio_seconds=0.0, inference_seconds=1.0)  # ignored
+        self.assertEqual(admission.status()["uploads_in_progress"], 1)
+
+    def test_batches_count_every_file_against_the_queue(self):
+        jobs = FakeJobs([job(10.0)] * 8)
+        admission = AdmissionController(jobs, max_uploads=4, max_queue=10)
+        admission.check_queue(2)
+        self.assertRaises(Overloaded, admission.check_queue, 3)
+
+    def test_resumable_chunks_take_upload_slots(self):
+        jobs = FakeJobs([])
+        admission = AdmissionController(jobs, max_uploads=1, max_queue=10)
+        self.assertTrue(admission.admit("POST", "/transcribe/"))
+        with self.assertRaises(Overloaded):
+            admission.admit("PATCH", "/uploads/0123abcd")  # answered with 429
+        self.assertFalse(admission.admit("POST", "/uploads/"))  # creating an upload sends no video
+        self.assertFalse(admission.admit("GET", "/uploads/0123abcd"))
+        admission.leave_upload()
+        self.assertTrue(admission.admit("PATCH", "/uploads/0123abcd"))
+
+
+if __name__ == "__main__":
+    unittest.main()
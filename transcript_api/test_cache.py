@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from cache import TranscriptCache, cache_key
+
+ENTRY = {"text": "x" * 20}  # 32 bytes as JSON
+
+
+class TestTranscriptCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TranscriptCache(self.folder.name, max_bytes=70)
+        cache.put("a", ENTRY)
+        cache.put("b", ENTRY)
+        self.assertEqual(cache.get("a"), ENTRY)  # "b" is now the oldest
+        cache.put("c", ENTRY)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), ENTRY)
+        self.assertFalse(os.path.exists(os.path.join(self.folder.name, "b.json")))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 2))
+        self.assertLessEqual(stats["bytes"], 70)
+
+    def test_entries_survive_a_restart_in_recency_order(self):
+        cache = TranscriptCache(self.folder.name, max_bytes=70)
+        cache.put("a", ENTRY)
+        cache.put("b", ENTRY)
+        os.utime(os.path.join(self.folder.name, "a.json"), (1, 1))
+        os.utime(os.path.join(self.folder.name, "b.json"), (2, 2))
+        reopened = TranscriptCache(self.folder.name, max_bytes=70)
+        self.assertEqual(reopened.stats()["bytes"], cache.stats()["bytes"])
+        reopened.put("c", ENTRY)
+        self.assertIsNone(reopened.get("a"))
+        self.assertEqual(reopened.get("b"), ENTRY)
+
+    def test_corrupt_entry_is_a_miss_and_dropped(self):
+        cache = TranscriptCache(self.folder.name)
+        cache.put("a", ENTRY)
+        with open(os.path.join(self.folder.name, "a.json"), "w") as f:
+            f.write("{broken")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_key_depends_on_content_model_and_options(self):
+        key = cache_key("abc", "base", {"word_timestamps": True})
+        self.assertEqual(key, cache_key("abc", "base", {"word_timestamps": True}))
+        self.assertNotEqual(key, cache_key("abd", "base", {"word_timestamps": True}))
+        self.assertNotEqual(key, cache_key("abc", "small", {"word_timestamps": True}))
+        self.assertNotEqual(key, cache_key("abc", "base", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from chunking import split_points, stitch
+
+
+def word(text, start, end):
+    return {"word": text, "start": start, "end": end}
+
+
+def segment(start, end, *words):
+    return {"start": start, "end": end, "text": "".join(w["word"] for w in words), "words": list(words)}
+
+
+class TestSplitPoints(unittest.TestCase):
+    def test_cuts_fall_into_silences_and_cover_everything(self):
+        sr = 1000
+        audio = np.random.default_rng(0).uniform(-0.5, 0.5, 10 * sr).astype(np.float32)
+        for silence in (1.1, 2.3):  # seconds where 0.5 s of silence starts
+            audio[int(silence * sr):int((silence + 0.5) * sr)] = 0.0
+        ranges = split_points(audio, sr, chunk_seconds=1)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(audio))
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(ranges, ranges[1:])))  # contiguous, no overlap
+        self.assertTrue(1.1 * sr <= ranges[0][1] <= 1.6 * sr)
+        self.assertTrue(2.3 * sr <= ranges[1][1] <= 2.8 * sr)
+
+    def test_short_audio_is_one_chunk(self):
+        self.assertEqual(split_points(np.zeros(1500, dtype=np.float32), 1000, chunk_seconds=1), [(0, 1500)])
+
+
+class TestStitch(unittest.TestCase):
+    def test_times_are_shifted_and_boundary_words_kept(self):
+        first = {"text": " a b", "language": "en", "segments": [segment(0.0, 9.9, word(" a", 0.0, 4.0), word(" b", 4.0, 9.9))]}
+        # The second chunk starts at 10 s; its first word's timestamp drifted before the previous word's end
+        second = {"text": " c d", "segments": [segment(-0.5, 3.0, word(" c", -0.5, 1.0), word(" d", 1.0, 3.0))]}
+        result = stitch([first, second], [0.0, 10.0])
+        words = [w for s in result["segments"] for w in s["words"]]
+        self.assertEqual([w["word"] for w in words], [" a", " b", " c", " d"])
+        self.assertEqual((words[2]["start"], words[2]["end"]), (9.9, 11.0))
+        self.assertEqual([s["id"] for s in result["segments"]], [0, 1])
+        self.assertEqual((result["text"], result["language"]), (" a b c d", "en"))
+
+    def test_times_never_run_backwards(self):
+        chunks = [{"segments": [segment(0.0, 5.0, word(" a", 0.0, 5.0))]},
+                  {"segments": [segment(-2.0, -1.0, word(" b", -2.0, -1.0)), segment(0.0, 1.0, word(" c", 0.0, 1.0))]}]
+        result = stitch(chunks, [0.0, 4.0])
+        times = [t for s in result["segments"] for w in s["words"] for t in (w["start"], w["end"])]
+        self.assertEqual(times, sorted(times))
+        starts = [s["start"] for s in result["segments"]]
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual(len(result["segments"]), 3)  # nothing dropped
+
+
+if __name__ == "__main__":
+    unittest.main()
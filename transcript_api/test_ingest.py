@@ -0,0 +1,146 @@
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from ingest import DiskWriter, MalformedUpload, UploadSizeLimit, UploadTooLarge, receive_form, receive_upload, discard
+
+BOUNDARY = "b0undary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart(*parts):
+    # parts are (field name, filename or None, data), encoded like a browser or requests would
+    body = b""
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunks(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def receive(body, size=7, **kwargs):
+    return asyncio.run(receive_upload(chunks(body, size), CONTENT_TYPE, **kwargs))
+
+
+class TestReceiveUpload(unittest.TestCase):
+    def test_file_field_is_saved_whatever_the_chunking(self):
+        video = os.urandom(5000) + f"\r\n--{BOUNDARY}".encode()[:-1]  # almost a delimiter inside the data
+        body = multipart(("note", None, b"skipped"), ("file", "Talk.MOV", video))
+        for size in (1, 7, 64, len(body)):
+            stored = receive(body, size)
+            try:
+                with open(stored.path, "rb") as f:
+                    self.assertEqual(f.read(), video)
+                self.assertEqual((stored.size, stored.sha256), (len(video), hashlib.sha256(video).hexdigest()))
+                self.assertTrue(stored.path.endswith(".mov"))
+            finally:
+                discard(stored.path)
+
+    def test_batch_form_keeps_every_file_and_the_text_fields(self):
+        body = multipart(("files", "a.mp4", b"first"), ("manifest", None, b'["b.mp4"]'), ("files", "c.mkv", b"third"))
+        files, fields = asyncio.run(receive_form(chunks(body, 5), CONTENT_TYPE, "files"))
+        try:
+            self.assertEqual([name for name, _ in files], ["a.mp4", "c.mkv"])
+            with open(files[1][1].path, "rb") as f:
+                self.assertEqual(f.read(), b"third")
+            self.assertEqual(fields, {"manifest": '["b.mp4"]'})
+        finally:
+            for _, stored in files:
+                discard(stored.path)
+
+    def test_body_without_the_file(self):
+        self.assertIsNone(receive(multipart(("note", None, b"x"))))
+        self.assertIsNone(asyncio.run(receive_upload(chunks(b"{}", 7), "application/json")))
+
+    def test_too_large_and_truncated_bodies_leave_no_file(self):
+        with tempfile.TemporaryDirectory() as folder, mock.patch("ingest.UPLOAD_DIR", folder):
+            with self.assertRaises(UploadTooLarge):
+                receive(multipart(("file", "a.mp4", b"x" * 100)), max_bytes=50)
+            with self.assertRaises(MalformedUpload):
+                receive(multipart(("file", "a.mp4", b"x" * 100))[:-30])
+            with self.assertRaises(MalformedUpload):  # the second file is cut off, the first is removed too
+                asyncio.run(receive_form(chunks(multipart(("files", "a.mp4", b"x"), ("files", "b.mp4", b"y"))[:-30], 7),
+                                         CONTENT_TYPE, "files"))
+            self.assertEqual(os.listdir(folder), [])
+
+
+class RecordingFile:
+    def __init__(self):
+        self.writes = []
+        self.closed = False
+
+    def write(self, data):
+        self.writes.append((bytes(data), threading.get_ident()))
+
+    def close(self):
+        self.closed = True
+
+
+class TestDiskWriter(unittest.TestCase):
+    def test_writes_are_batched_into_a_thread(self):
+        out, hasher = RecordingFile(), hashlib.sha256()
+        writer = DiskWriter(out, hasher, chunk_size=4)
+
+        async def write_all():
+            for data in (b"ab", b"cd", b"e"):
+                await writer.write(data)
+            await writer.close()
+        asyncio.run(write_all())
+        self.assertEqual([data for data, _ in out.writes], [b"abcd", b"e"])
+        self.assertNotIn(threading.get_ident(), [thread for _, thread in out.writes])
+        self.assertTrue(out.closed)
+        self.assertEqual(hasher.hexdigest(), hashlib.sha256(b"abcde").hexdigest())
+
+
+class TestUploadSizeLimit(unittest.TestCase):
+    def call(self, body_parts, headers=()):
+        messages = [{"type": "http.request", "body": part, "more_body": True} for part in body_parts]
+        messages[-1]["more_body"] = False
+        sent, read = [], []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        async def app(scope, receive, send):
+            # Reads the whole body, then answers 200
+            while True:
+                message = await receive()
+                read.append(message["body"])
+                if not message["more_body"]:
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        scope = {"type": "http", "headers": [(name.encode(), value.encode()) for name, value in headers]}
+        asyncio.run(UploadSizeLimit(app, max_bytes=10)(scope, receive, send))
+        return sent, read
+
+    def test_chunked_body_is_stopped_at_the_limit(self):
+        sent, read = self.call([b"12345", b"67890", b"1", b"never read"])
+        self.assertEqual(sent[0]["status"], 413)
+        self.assertIn("10 bytes", json.loads(sent[1]["body"])["detail"])
+        self.assertEqual(len(sent), 2)  # the app's own response is dropped
+        self.assertEqual(read, [b"12345", b"67890"])
+
+    def test_announced_length_is_rejected_before_reading(self):
+        sent, read = self.call([b"x"], headers=[("Content-Length", "11")])
+        self.assertEqual((sent[0]["status"], read), (413, []))
+
+    def test_small_body_passes(self):
+        sent, read = self.call([b"12345", b"67890"])
+        self.assertEqual((sent[0]["status"], sent[1]["body"]), (200, b"ok"))
+
+
+if __name__ == "__main__":
+    unittest.main()
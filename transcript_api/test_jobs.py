@@ -0,0 +1,106 @@
+import os
+import inspect
+import queue
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from audio import SAMPLE_RATE
+from jobs import CANCELLED, FAILED, JobCancelled, JobManager, _ProgressBar
+
+try:
+    import whisper.transcribe as whisper_transcribe
+except ImportError:
+    whisper_transcribe = None
+
+
+class TestSegmentStreaming(unittest.TestCase):
+    def test_new_segments_are_forwarded_once_per_update(self):
+        segments = queue.Queue()
+        bar = _ProgressBar("job", {}, {}, segments, offset=10.0, total=2)
+        all_segments = []  # read by the bar from this frame, like from Whisper's transcribe()
+        all_segments.append({"start": 0.0, "end": 1.0, "words": []})
+        bar.update()
+        all_segments.append({"start": 1.0, "end": 2.0, "words": []})
+        bar.update()
+        forwarded = [segments.get_nowait() for _ in range(segments.qsize())]
+        self.assertEqual([(s["start"], s["end"]) for s in forwarded], [(10.0, 11.0), (11.0, 12.0)])
+
+    @unittest.skipIf(whisper_transcribe is None, "whisper is not installed")
+    def test_whisper_drives_the_bar_from_transcribe(self):
+        # _ProgressBar relies on these internals of whisper.transcribe.transcribe; if they
+        # change, streaming only delivers segments at the end (see stream_transcript)
+        self.assertIn("all_segments", whisper_transcribe.transcribe.__code__.co_varnames)
+        source = inspect.getsource(whisper_transcribe.transcribe)
+        self.assertIn("tqdm.tqdm(", source)
+        self.assertIn("pbar.update(", source)
+
+
+class FakeExecutor:
+    # Keeps the submitted futures so the test decides when each chunk finishes
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+class TestChunkedStreaming(unittest.TestCase):
+    def test_chunks_are_streamed_in_order(self):
+        manager = JobManager(workers=2)
+        manager._executor = FakeExecutor()
+        manager._progress, manager._cancelled = {}, {}
+        job = manager.create()
+        job.segments = queue.Queue()
+        job.future = Future()
+        plan = Future()
+        plan.set_result(("/nonexistent.f32", [(0, 10 * SAMPLE_RATE), (10 * SAMPLE_RATE, 20 * SAMPLE_RATE)]))
+        manager._start_chunks(job, plan, "base", {})
+        first, second = manager._executor.futures
+        second.set_result({"text": " b", "segments": [{"start": 0.0, "end": 1.0, "text": " b", "words": []}]})
+        self.assertTrue(job.segments.empty())  # waits for the first chunk
+        first.set_result({"text": " a", "segments": [{"start": 0.0, "end": 1.0, "text": " a", "words": []}]})
+        streamed = [job.segments.get_nowait() for _ in range(job.segments.qsize())]
+        self.assertEqual([s and s["start"] for s in streamed], [0.0, 10.0, None])
+        self.assertEqual(len(job.future.result()["segments"]), 2)
+
+    def test_running_chunks_see_the_cancel(self):
+        manager = JobManager(workers=2)
+        manager._executor = FakeExecutor()
+        manager._progress, manager._cancelled = {}, {}
+        job = manager.submit_chunked("/nonexistent.mp4", "base", {}, lambda result: result)
+        plan = manager._executor.futures[0]
+        plan.set_result(("/nonexistent.f32", [(0, 10 * SAMPLE_RATE), (10 * SAMPLE_RATE, 20 * SAMPLE_RATE)]))
+        parts = manager._executor.futures[1:]
+        for index, part in enumerate(parts):
+            part.set_running_or_notify_cancel()  # picked up by a worker
+            manager._progress[f"{job.id}:{index}"] = 0.5
+        manager.cancel(job.id)
+        self.assertEqual(job.status, CANCELLED)
+        self.assertEqual(manager._cancelled, {f"{job.id}:0": True, f"{job.id}:1": True})
+        for index, part in enumerate(parts):
+            part.set_exception(JobCancelled(f"{job.id}:{index}"))  # the workers stopped at the flag
+        self.assertEqual((manager._cancelled, manager._progress), ({}, {}))
+
+
+class TestBrokenPool(unittest.TestCase):
+    def test_pool_is_rebuilt_after_a_worker_dies(self):
+        manager = JobManager(workers=1)
+        try:
+            job = manager.create()
+            job.future = manager._submit(lambda: manager._executor.submit(os._exit, 1))  # like an OOM kill
+            job.future.add_done_callback(lambda future: manager._on_done(job, future, lambda result: result, None))
+            with self.assertRaises(BrokenProcessPool):
+                job.future.result(timeout=60)
+            job.done.wait(60)
+            self.assertEqual(job.status, FAILED)
+            pid = manager._submit(lambda: manager._executor.submit(os.getpid)).result(timeout=60)
+            self.assertNotEqual(pid, os.getpid())
+            self.assertFalse(manager.broken)
+        finally:
+            manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
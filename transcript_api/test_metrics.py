@@ -0,0 +1,36 @@
+import unittest
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+class TestRendering(unittest.TestCase):
+    def test_counter_and_gauge_samples(self):
+        registry = Registry()
+        requests = registry.register(Counter("requests_total", "Requests", ["model"]))
+        requests.inc(model="base")
+        requests.inc(2, model='say "hi"\n')
+        registry.register(Gauge("loaded", "Loaded models", ["model"], callback=lambda: {("base",): 3}))
+        registry.register(Gauge("depth", "Queue depth", callback=lambda: 4))
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP requests_total Requests", "# TYPE requests_total counter"])
+        self.assertIn('requests_total{model="base"} 1.0', lines)
+        self.assertIn('requests_total{model="say \\"hi\\"\\n"} 2.0', lines)
+        self.assertIn("# TYPE loaded gauge", lines)
+        self.assertIn('loaded{model="base"} 3.0', lines)
+        self.assertIn("depth 4.0", lines)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        self.assertEqual(histogram.render()[2:], [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1.0"} 2',
+            'latency_seconds_bucket{le="+Inf"} 3',
+            "latency_seconds_sum 5.55",
+            "latency_seconds_count 3"
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from ingest import UploadTooLarge
+from resumable import ResumableUploads, UploadNotFound, OffsetMismatch, UploadIncomplete
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestResumableUploads(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.uploads = ResumableUploads(self.folder.name, max_bytes=100)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def append(self, upload_id, offset, *parts):
+        return asyncio.run(self.uploads.append(upload_id, offset, chunks(*parts)))
+
+    def test_chunks_resume_from_the_offset_on_disk(self):
+        upload_id = self.uploads.create("talk.MP4", 10)["upload_id"]
+        self.assertEqual(self.append(upload_id, 0, b"abc", b"de"), 5)
+        with self.assertRaises(OffsetMismatch) as raised:
+            self.append(upload_id, 3, b"xyz")  # the client thinks less arrived: 409 with the real offset
+        self.assertEqual(raised.exception.offset, 5)
+        self.assertRaises(UploadIncomplete, self.uploads.complete, upload_id)
+        self.assertEqual(self.append(upload_id, 5, b"fghij"), 10)
+        path = self.uploads.complete(upload_id)
+        self.assertTrue(path.endswith(".mp4"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"abcdefghij")
+        self.assertRaises(UploadNotFound, self.uploads.info, upload_id)
+
+    def test_sizes_and_ids_are_checked(self):
+        self.assertRaises(UploadTooLarge, self.uploads.create, "big.mp4", 101)
+        upload_id = self.uploads.create("a.mp4", 4)["upload_id"]
+        self.assertRaises(UploadTooLarge, self.append, upload_id, 0, b"12345")
+        self.assertRaises(UploadNotFound, self.uploads.info, "../../etc/passwd")
+        self.uploads.remove(upload_id)
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+    def test_abandoned_uploads_expire_with_their_lock(self):
+        upload_id = self.uploads.create("a.mp4", 10)["upload_id"]
+        self.append(upload_id, 0, b"abc")
+        self.uploads.ttl = -1  # everything counts as abandoned
+        self.uploads.expire()
+        self.assertEqual((os.listdir(self.folder.name), self.uploads._locks), ([], {}))
+        self.assertRaises(UploadNotFound, self.uploads.info, upload_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
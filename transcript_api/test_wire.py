@@ -0,0 +1,41 @@
+import gzip
+import json
+import unittest
+import zlib
+from wire import COLUMNAR_MEDIA_TYPE, StreamCompressor, encode_transcript, from_columnar, pick_encoding, to_columnar
+
+TRANSCRIPT = {
+    "resolution": {"name": "youtube", "width": 1920, "height": 1080, "fps": 30},
+    "sentences": [{"text": " One two.", "start": 0.0, "end": 1.0}],
+    "words": [{"text": " One", "start": 0.0, "end": 0.5}, {"text": " two.", "start": 0.5, "end": 1.0}]
+}
+
+
+class TestWire(unittest.TestCase):
+    def test_columnar_round_trip(self):
+        data = to_columnar(TRANSCRIPT)
+        self.assertEqual(data["words"]["start"], [0.0, 0.5])
+        self.assertEqual(from_columnar(json.loads(json.dumps(data))), TRANSCRIPT)
+
+    def test_encoding_follows_the_request_headers(self):
+        big = dict(TRANSCRIPT, words=TRANSCRIPT["words"] * 100)
+        body, media_type, headers = encode_transcript(big, COLUMNAR_MEDIA_TYPE, "gzip")
+        self.assertEqual((media_type, headers["Content-Encoding"]), (COLUMNAR_MEDIA_TYPE, "gzip"))
+        self.assertEqual(from_columnar(json.loads(gzip.decompress(body))), big)
+        body, media_type, headers = encode_transcript(TRANSCRIPT, "application/json", "identity")
+        self.assertEqual(json.loads(body), TRANSCRIPT)
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertIsNone(pick_encoding("gzip;q=0"))
+
+    def test_streamed_pieces_decode_as_they_arrive(self):
+        compressor = StreamCompressor("gzip")
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        events = [json.dumps({"type": "sentence", "index": i}) + "\n" for i in range(3)]
+        for event in events:
+            self.assertEqual(decompressor.decompress(compressor.compress(event.encode())).decode(), event)
+        decompressor.decompress(compressor.finish())
+        self.assertTrue(decompressor.eof)
+
+
+if __name__ == "__main__":
+    unittest.main()
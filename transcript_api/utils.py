@@ -1,6 +1,4 @@
-#import ffmpeg
-import subprocess
-import json
+from probe import probe_media_sync
 
 # Standard resolutions dictionary
 RESOLUTIONS = {
@@ -16,24 +14,9 @@ RESOLUTIONS = {
 }
 
 def get_video_resolution(video_path):
-    """probe = ffmpeg.probe(video_path)
-    video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-    width = int(video_stream['width'])
-    height = int(video_stream['height'])
-    return width, height"""
-    command = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-show_entries', 'stream=width,height',
-        '-of', 'json',
-        video_path
-    ]
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    info = json.loads(result.stdout)
-    width = info['streams'][0]['width']
-    height = info['streams'][0]['height']
-    return width, height
+    # Kept for existing callers, the probe is shared (and cached) with the API
+    media = probe_media_sync(video_path)
+    return media.width, media.height
 
 def map_to_nearest_resolution(width, height):
     def diff(res):
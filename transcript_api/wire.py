@@ -0,0 +1,115 @@
+import gzip
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+# Parallel arrays instead of one object per sentence/word.
+# core.py keeps a copy of this and of from_columnar (expand_columnar) for the client; change both together.
+COLUMNAR_MEDIA_TYPE = "application/vnd.transcript.columnar+json"
+MIN_COMPRESS_BYTES = 1024  # not worth compressing below this
+COLUMNS = ("text", "start", "end")
+
+
+def to_columns(records):
+    # [{"text","start","end"}, ...] -> {"text": [...], "start": [...], "end": [...]}
+    return {column: [record.get(column) for record in records] for column in COLUMNS}
+
+
+def to_columnar(transcript):
+    # {"words": [{"text","start","end"}, ...]} -> {"words": {"text": [...], "start": [...], "end": [...]}}
+    data = {key: value for key, value in transcript.items() if key not in ("sentences", "words")}
+    data["format"] = "columnar"
+    for key in ("sentences", "words"):
+        data[key] = to_columns(transcript.get(key, []))
+    return data
+
+
+def from_columnar(data):
+    transcript = {key: value for key, value in data.items() if key not in ("sentences", "words", "format")}
+    for key in ("sentences", "words"):
+        columns = data.get(key, {})
+        texts = columns.get("text", [])
+        transcript[key] = [
+            {column: columns[column][i] for column in COLUMNS} for i in range(len(texts))
+        ]
+    return transcript
+
+
+def accepted_encodings(header):
+    # "gzip;q=0.5, zstd" -> {"gzip": 0.5, "zstd": 1.0}
+    encodings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def pick_encoding(accept_encoding):
+    encodings = accepted_encodings(accept_encoding)
+    candidates = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    best = None
+    for name in candidates:
+        q = encodings.get(name, encodings.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (name, q)
+    return best[0] if best else None
+
+
+def encode_transcript(transcript, accept="", accept_encoding=""):
+    """Serialize a transcript for the client's Accept and Accept-Encoding headers.
+
+    Returns (body bytes, media type, extra headers). Plain JSON stays the
+    default; the columnar form is only sent when asked for.
+    """
+    if COLUMNAR_MEDIA_TYPE in (accept or ""):
+        data, media_type = to_columnar(transcript), COLUMNAR_MEDIA_TYPE
+    else:
+        data, media_type = transcript, JSON_MEDIA_TYPE
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = pick_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding == "zstd":
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, media_type, headers
+
+
+class StreamCompressor:
+    """gzip or zstd for a streamed response, one piece at a time.
+
+    Every piece is flushed, so the client can decode each event as soon as
+    it arrives; the compression context carries over, so repeated keys in
+    later events still cost next to nothing.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+
+    def compress(self, data):
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
@@ -1,11 +1,32 @@
 import bpy
+import os
 import sys
+import argparse
+
+# strip_registry.py lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from strip_registry import registered_strips, parse_roles, ROLES, TEXT_ROLES
 
 argv = sys.argv
 argv = argv[argv.index("--") + 1:]
-pos = argv[0].lower()
+parser = argparse.ArgumentParser(prog="update_text_position.py")
+parser.add_argument("position", help="top, bottom or a y value")
+parser.add_argument("--roles", default=",".join(TEXT_ROLES), help=f"comma separated, of {', '.join(ROLES)}")
+parser.add_argument("--start", type=float, help="only strips from this second on")
+parser.add_argument("--end", type=float, help="only strips up to this second")
+args = parser.parse_args(argv)
+try:
+    roles = parse_roles(args.roles)
+except ValueError as e:
+    parser.error(str(e))
+pos = args.position.lower()
+
+scene = bpy.context.scene
+fps = scene.render.fps / scene.render.fps_base
+start_frame = None if args.start is None else int(args.start * fps)
+end_frame = None if args.end is None else int(args.end * fps)
 
-for strip in bpy.context.scene.sequence_editor.sequences_all:
+for strip in registered_strips(scene, roles, start_frame, end_frame):
     if strip.type == 'TEXT':
         if pos == "top":
             strip.location[1] = 0.9
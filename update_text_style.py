@@ -0,0 +1,58 @@
+import bpy
+import os
+import sys
+import argparse
+
+# strip_registry.py lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from strip_registry import registered_strips, parse_roles, ROLES, TEXT_ROLES
+
+
+def parse_color(value):
+    # "r,g,b" or "r,g,b,a" with values from 0 to 1
+    try:
+        color = [float(v) for v in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a color: {value}")
+    if len(color) not in (3, 4) or not all(0.0 <= v <= 1.0 for v in color):
+        raise argparse.ArgumentTypeError(f"expected r,g,b or r,g,b,a between 0 and 1: {value}")
+    return color + [1.0] * (4 - len(color))
+
+
+argv = sys.argv
+argv = argv[argv.index("--") + 1:]
+parser = argparse.ArgumentParser(prog="update_text_style.py")
+parser.add_argument("--font-size", type=float, help="font size of the text strips")
+parser.add_argument("--color", type=parse_color, help="text color as r,g,b[,a] between 0 and 1")
+parser.add_argument("--box", choices=("on", "off"), help="box behind the text")
+visibility = parser.add_mutually_exclusive_group()
+visibility.add_argument("--show", action="store_true", help="unmute the strips")
+visibility.add_argument("--hide", action="store_true", help="mute the strips")
+parser.add_argument("--roles", default=",".join(TEXT_ROLES), help=f"comma separated, of {', '.join(ROLES)}")
+parser.add_argument("--start", type=float, help="only strips from this second on")
+parser.add_argument("--end", type=float, help="only strips up to this second")
+args = parser.parse_args(argv)
+try:
+    roles = parse_roles(args.roles)
+except ValueError as e:
+    parser.error(str(e))
+if args.font_size is None and args.color is None and args.box is None and not args.show and not args.hide:
+    parser.error("nothing to change, give --font-size, --color, --box, --show or --hide")
+
+scene = bpy.context.scene
+fps = scene.render.fps / scene.render.fps_base
+start_frame = None if args.start is None else int(args.start * fps)
+end_frame = None if args.end is None else int(args.end * fps)
+
+for strip in registered_strips(scene, roles, start_frame, end_frame):
+    if args.show or args.hide:
+        strip.mute = args.hide  # backgrounds too, when their role is given
+    if strip.type != 'TEXT':
+        continue
+    if args.font_size is not None:
+        strip.font_size = args.font_size
+    if args.color is not None:
+        strip.color = args.color
+    if args.box is not None:
+        strip.use_box = args.box == "on"
+bpy.ops.wm.save_mainfile()
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from core import is_video_file
+
+SEEN_NAME = "watched.json"  # kept in the output folder, which videos the watcher has handed on
+STABLE_SECONDS = 2.0  # a file counts as completely written when its size and mtime stay the same this long
+POLL_SECONDS = 1.0
+RESCAN_SECONDS = 60.0  # full rescan even with inotify: writes through network shares raise no events here
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class Inotify:
+    """Minimal inotify through libc, so no extra package is needed.
+
+    Raises OSError where inotify is not available (not Linux, or out of
+    watches); FolderWatcher then polls instead.
+    """
+
+    def __init__(self):
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init = self._libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}")
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # watch descriptor -> directory
+
+    def add(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.watches[wd] = directory
+
+    def read(self, timeout):
+        # [(path, is_dir)] of the events within timeout seconds; (None, False) when events were lost
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, False))
+            elif mask & IN_IGNORED:
+                self.watches.pop(wd, None)  # the directory is gone
+            elif wd in self.watches and name:
+                events.append((os.path.join(self.watches[wd], os.fsdecode(name)), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SeenRecord:
+    """Videos the watcher has handed on, stored in a JSON file so restarts do not repeat them.
+
+    A video counts as seen in the version (size and mtime) it had; a file
+    that is replaced by a different one with the same name is new again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.videos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.videos = {}
+
+    def is_seen(self, path, size, mtime_ns):
+        entry = self.videos.get(os.path.abspath(path))
+        return entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns
+
+    def record(self, path, size, mtime_ns, state):
+        with self._lock:
+            self.videos[os.path.abspath(path)] = {"size": size, "mtime_ns": mtime_ns, "state": state,
+                                                  "time": round(time.time())}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.videos, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+class FolderWatcher:
+    """Yields every video that appears in folders or their subfolders, once.
+
+    Videos already there when watching starts count as new too, unless the
+    SeenRecord has them. A video is only yielded once its size and mtime
+    stayed the same for stable_seconds, so files still being copied are
+    left alone. inotify wakes the watcher up as soon as something is
+    written; without it, the folders are scanned every poll_seconds.
+    """
+
+    def __init__(self, folders, seen, stable_seconds=STABLE_SECONDS, poll_seconds=POLL_SECONDS,
+                 use_inotify=True, ignore=()):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.seen = seen
+        self.stable_seconds = stable_seconds
+        self.poll_seconds = poll_seconds
+        self.ignore = [os.path.abspath(path) for path in ignore]  # e.g. the output folder inside a watched one
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except OSError:
+                self.inotify = None
+        self.candidates = {}  # path -> (size, mtime_ns, unchanged since)
+        self.handed_on = {}  # path -> (size, mtime_ns), yielded but not finished yet
+        self._lock = threading.Lock()
+
+    def _ignored(self, path):
+        return any(path == ignored or path.startswith(ignored + os.sep) for ignored in self.ignore)
+
+    def _watch_tree(self, folder):
+        # Watch folder and its subfolders, and look at the files already in them
+        for directory, subdirs, files in os.walk(folder):
+            if self._ignored(directory):
+                subdirs[:] = []
+                continue
+            if self.inotify is not None:
+                try:
+                    self.inotify.add(directory)
+                except OSError:
+                    self.inotify.close()
+                    self.inotify = None  # out of watches: fall back to polling
+            for name in files:
+                self._consider(os.path.join(directory, name))
+
+    def scan(self):
+        for folder in self.folders:
+            self._watch_tree(folder)
+
+    def _consider(self, path):
+        name = os.path.basename(path)
+        if name.startswith(".") or not is_video_file(name) or self._ignored(path):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.candidates.pop(path, None)
+            return
+        version = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if self.handed_on.get(path) == version or self.seen.is_seen(path, *version):
+                self.candidates.pop(path, None)
+                return
+        known = self.candidates.get(path)
+        if known is None or known[:2] != version:
+            self.candidates[path] = version + (time.monotonic(),)
+
+    def _ready(self):
+        # Candidates that stopped changing; they are checked once more so a finished copy is noticed without events
+        now = time.monotonic()
+        ready = []
+        for path in list(self.candidates):
+            self._consider(path)
+            candidate = self.candidates.get(path)
+            if candidate and candidate[0] > 0 and now - candidate[2] >= self.stable_seconds:
+                del self.candidates[path]
+                with self._lock:
+                    self.handed_on[path] = candidate[:2]
+                ready.append(path)
+        return sorted(ready)
+
+    def finished(self, path, state):
+        # Call when a yielded video is done or failed; it is then recorded as seen
+        with self._lock:
+            version = self.handed_on.pop(path, None)
+        if version is not None:
+            self.seen.record(path, *version, state)
+
+    def videos(self, stop):
+        """Generator of ready video paths until the threading.Event stop is set."""
+        self.scan()
+        last_scan = time.monotonic()
+        while not stop.is_set():
+            for path in self._ready():
+                yield path
+            wait = min(self.poll_seconds, self.stable_seconds / 2) if self.candidates else self.poll_seconds
+            if self.inotify is None:
+                stop.wait(wait)
+                self.scan()
+                continue
+            rescan = time.monotonic() - last_scan >= RESCAN_SECONDS
+            for path, is_dir in self.inotify.read(wait):
+                if path is None:
+                    rescan = True
+                elif is_dir:
+                    self._watch_tree(path)
+                else:
+                    self._consider(path)
+            if rescan:
+                self.scan()
+                last_scan = time.monotonic()
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None